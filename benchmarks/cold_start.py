@@ -0,0 +1,109 @@
+"""
+Cold start benchmark: time from container boot to the first answered request.
+
+Each run executes the boot step (``manage.py fastboot`` or, with
+``--legacy-boot``, the old unconditional ``migrate`` + ``collectstatic``),
+starts Gunicorn with ``gunicorn.conf.py`` and one worker, and polls the
+given URL until it answers 200.
+
+Usage (from the repository root, with the database from .env running):
+
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --runs 5 --legacy-boot
+"""
+
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEGACY_BOOT = [
+    [sys.executable, "manage.py", "migrate", "--noinput"],
+    [sys.executable, "manage.py", "collectstatic", "--noinput"],
+]
+FAST_BOOT = [[sys.executable, "manage.py", "fastboot"]]
+
+
+def wait_for(url, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.01)
+    raise TimeoutError(f"{url} did not answer within {timeout}s")
+
+
+def run_once(boot_steps, port, path, timeout):
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "GUNICORN_WORKERS": "1",
+    }
+    started = time.perf_counter()
+    for step in boot_steps:
+        subprocess.run(
+            step, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL
+        )
+    booted = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            "gunicorn.conf.py",
+            "pollpulse_backend.wsgi:application",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(f"http://127.0.0.1:{port}{path}", timeout)
+        first_request = time.perf_counter()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    return booted - started, first_request - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/api/v1/docs/?format=openapi")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--legacy-boot", action="store_true")
+    args = parser.parse_args()
+
+    boot_steps = LEGACY_BOOT if args.legacy_boot else FAST_BOOT
+    boot_times, ttfr = [], []
+    for _ in range(args.runs):
+        boot, first = run_once(boot_steps, args.port, args.path, args.timeout)
+        boot_times.append(boot)
+        ttfr.append(first)
+
+    label = "legacy" if args.legacy_boot else "fastboot"
+    print(f"boot path: {label}, runs: {args.runs}, url: {args.path}")
+    for name, values in (
+        ("boot steps", boot_times),
+        ("time to first request", ttfr),
+    ):
+        print(
+            f"{name:>22}: median {statistics.median(values):.3f}s "
+            f"min {min(values):.3f}s max {max(values):.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Poll list read path benchmark: PollSerializer vs the projected fast path.
+
+Creates a page of polls (default 1000, four options each) inside a
+transaction that is rolled back afterwards, then times building and
+rendering the list response three ways:
+
+  * serializer            PollSerializer(many=True) + JSONRenderer (the
+                          previous PollViewSet.list path, one options query
+                          per poll)
+  * serializer+prefetch   the same with prefetch_related("options")
+  * projection            projections.project_polls + FastJSONRenderer
+
+Usage (from the repository root, with the database from .env running):
+
+    python benchmarks/poll_read_path.py --polls 1000 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pollpulse_backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from polls.models import Option, Poll, User  # noqa: E402
+from polls.projections import project_polls  # noqa: E402
+from polls.renderers import FastJSONRenderer, orjson  # noqa: E402
+from polls.serializers import PollSerializer  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(count):
+    user = User.objects.create_user(
+        username="bench-read-path",
+        email="bench-read-path@example.com",
+        password="bench-password",
+    )
+    polls = Poll.objects.bulk_create(
+        Poll(
+            user=user,
+            title=f"Benchmark poll {i}",
+            description="A poll created by the read path benchmark.",
+            settings={"anonymous": bool(i % 2)},
+        )
+        for i in range(count)
+    )
+    Option.objects.bulk_create(
+        Option(poll=poll, option_text=f"Option {order}", option_order=order)
+        for poll in polls
+        for order in range(4)
+    )
+    return [poll.id for poll in polls]
+
+
+def timed(build, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = build()
+        timings.append(time.perf_counter() - started)
+    return timings, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--polls", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic():
+            ids = seed(args.polls)
+            queryset = Poll.objects.filter(id__in=ids)
+            paths = {
+                "serializer": lambda: JSONRenderer().render(
+                    PollSerializer(queryset, many=True).data
+                ),
+                "serializer+prefetch": lambda: JSONRenderer().render(
+                    PollSerializer(
+                        queryset.prefetch_related("options"), many=True
+                    ).data
+                ),
+                "projection": lambda: FastJSONRenderer().render(
+                    project_polls(queryset)
+                ),
+            }
+            results = {
+                name: timed(build, args.repeat)
+                for name, build in paths.items()
+            }
+            raise Rollback
+    except Rollback:
+        pass
+
+    baseline = statistics.median(results["serializer"][0])
+    renderer = "orjson" if orjson is not None else "stdlib json"
+    print(f"{args.polls} polls per page, {args.repeat} runs, {renderer}")
+    for name, (timings, body) in results.items():
+        median = statistics.median(timings)
+        print(
+            f"{name:>20}: median {median * 1000:8.1f} ms  "
+            f"speedup x{baseline / median:5.1f}  {len(body)} bytes"
+        )
+    same = results["serializer"][1] == results["projection"][1]
+    print(f"projection output byte-identical to serializer: {same}")
+
+
+if __name__ == "__main__":
+    main()
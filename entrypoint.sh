@@ -2,11 +2,8 @@
 
 set -e
 
-echo "Running database migrations..."
-python manage.py migrate --noinput
-
-echo "Collecting static files..."
-python manage.py collectstatic --noinput
+echo "Preparing runtime (pending migrations, changed static files)..."
+python manage.py fastboot
 
 echo "Starting Gunicorn server..."
-exec gunicorn --bind 0.0.0.0:8000 pollpulse_backend.wsgi:application
+exec gunicorn --config gunicorn.conf.py pollpulse_backend.wsgi:application
@@ -0,0 +1,60 @@
+"""
+Production Gunicorn profile for PollPulse.
+
+Workers and threads are sized from the CPU count and can be overridden with
+GUNICORN_WORKERS / GUNICORN_THREADS. Keep
+``workers * DB_POOL_MAX_SIZE`` (per database) below Postgres'
+``max_connections``; DB_POOL_MAX_SIZE should be at least the thread count so
+no thread waits on the pool under normal load.
+"""
+
+import multiprocessing
+import os
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "gthread"
+# An empty variable (as in .env.example) falls back to the default.
+workers = int(os.getenv("GUNICORN_WORKERS") or cpu_count + 1)
+threads = int(os.getenv("GUNICORN_THREADS") or 4)
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+accesslog = "-"
+
+
+def on_starting(server):
+    # Every worker must see the same poll versions and cached results.
+    from polls.checks import require_shared_cache
+
+    require_shared_cache(workers)
+
+
+def when_ready(server):
+    # Load the shared vote counts before the workers start serving.
+    from django.db import connections
+    from polls import tallies
+
+    if tallies.store_enabled():
+        server.log.info("Warmed %d polls.", tallies.warm())
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    # The app is imported once in the master; make sure no database
+    # connection opened there is shared with the forked workers.
+    from django.db import connections
+
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    # Flush the tail of this worker's vote log segment to disk and write its
+    # buffered trending votes.
+    from polls import trending, votelog
+
+    votelog.writer.close()
+    trending.pending.flush()
@@ -0,0 +1,52 @@
+"""
+API documentation views for PollPulse.
+
+The OpenAPI schema is generated once at image build time with
+``manage.py generate_swagger`` into OPENAPI_SCHEMA_PATH and served from
+disk. The drf_yasg view machinery is only imported on the first docs
+request, and a live-generated schema (used when no prebuilt file exists) is
+cached for OPENAPI_SCHEMA_CACHE_TIMEOUT seconds.
+"""
+
+import os
+from functools import cache
+
+from django.conf import settings
+from django.http import FileResponse
+from drf_yasg import openapi
+
+api_info = openapi.Info(
+    title="PollPulse API",
+    default_version="v1",
+    description="API documentation for the PollPulse Online Poll System Backend",
+    terms_of_service="https://www.example.com/terms/",
+    contact=openapi.Contact(email="contact@example.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+
+@cache
+def _swagger_ui_view():
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    schema_view = get_schema_view(
+        api_info,
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )
+    return schema_view.with_ui(
+        "swagger", cache_timeout=settings.OPENAPI_SCHEMA_CACHE_TIMEOUT
+    )
+
+
+def swagger_ui(request, *args, **kwargs):
+    """
+    Serves the Swagger UI and the OpenAPI schema it loads.
+    """
+    schema_path = settings.OPENAPI_SCHEMA_PATH
+    if request.GET.get("format") == "openapi" and os.path.exists(schema_path):
+        return FileResponse(
+            open(schema_path, "rb"), content_type="application/json"
+        )
+    return _swagger_ui_view()(request, *args, **kwargs)
@@ -72,13 +72,28 @@ REST_FRAMEWORK = {
         "anon": "20/minute",
         "user": "100/minute",
     },
+    "DEFAULT_RENDERER_CLASSES": [
+        "polls.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 SWAGGER_SETTINGS = {
     "USE_SESSION_AUTH": False,
     "VALIDATOR_URL": None,
+    "DEFAULT_INFO": "pollpulse_backend.docs.api_info",
 }
 
+# Prebuilt OpenAPI schema, written at image build time by
+# `manage.py generate_swagger`. Without it the schema is generated on the
+# first docs request and cached.
+OPENAPI_SCHEMA_PATH = os.getenv(
+    "OPENAPI_SCHEMA_PATH", os.path.join(BASE_DIR, "openapi.json")
+)
+OPENAPI_SCHEMA_CACHE_TIMEOUT = int(
+    os.getenv("OPENAPI_SCHEMA_CACHE_TIMEOUT", "86400")
+)
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -153,6 +168,184 @@ DATABASES = {
     }
 }
 
+# Connection pooling (psycopg 3). With DB_POOL_MAX_SIZE set, each worker
+# process keeps a pool of min..max connections and requests wait up to
+# DB_POOL_TIMEOUT seconds for a free one; persistent connections are then
+# replaced by the pool.
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE") or 0)
+if DB_POOL_MAX_SIZE:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE") or 2),
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT") or 10),
+        }
+    }
+
+# Read replicas, given as comma-separated "host[:port]" entries. Each one is
+# exposed as a "replica_<n>" alias and used for poll list/detail and results
+# reads by polls.routers.PrimaryReplicaRouter.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    host.strip()
+    for host in os.getenv("DB_REPLICA_HOSTS", "").split(",")
+    if host.strip()
+):
+    replica_host, _, replica_port = replica.partition(":")
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": replica_port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Poll shards. Polls, with their options and votes, are spread over
+# "default" plus one "shard_<n>" alias per DB_SHARD_HOSTS entry. Every shard
+# runs the full schema and needs the users table replicated into it.
+POLL_SHARDS = ["default"]
+for index, shard in enumerate(
+    host.strip()
+    for host in os.getenv("DB_SHARD_HOSTS", "").split(",")
+    if host.strip()
+):
+    shard_host, _, shard_port = shard.partition(":")
+    alias = f"shard_{index + 1}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": shard_host,
+        "PORT": shard_port or DATABASES["default"]["PORT"],
+    }
+    POLL_SHARDS.append(alias)
+
+SHARD_DIRECTORY_CACHE_TIMEOUT = int(
+    os.getenv("SHARD_DIRECTORY_CACHE_TIMEOUT", "3600")
+)
+
+DATABASE_ROUTERS = [
+    "polls.routers.PollShardRouter",
+    "polls.routers.PrimaryReplicaRouter",
+]
+
+# Seconds a user stays on the primary after a write, so they read their own
+# votes and edits.
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+# Replicas lagging further behind than this are skipped until they catch up.
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "2"))
+REPLICA_LAG_CHECK_INTERVAL = float(
+    os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5")
+)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Poll versions and derived results live here, so deployments with several
+# workers, shards or replicas must point this at a shared backend (e.g.
+# RedisCache); polls.checks refuses to start them with LocMemCache.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+RESULTS_CACHE_TIMEOUT = int(os.getenv("RESULTS_CACHE_TIMEOUT", "3600"))
+
+# Results up to this many seconds old may be served while a poll's results
+# are recomputed (never to users who just voted). 0 always waits.
+RESULTS_STALE_SECONDS = float(os.getenv("RESULTS_STALE_SECONDS", "2"))
+
+# Poll list pages: cache lifetime, and how long the previous page may be
+# served while the list is rebuilt after a poll change.
+POLL_LIST_CACHE_TIMEOUT = int(os.getenv("POLL_LIST_CACHE_TIMEOUT", "60"))
+POLL_LIST_STALE_SECONDS = float(os.getenv("POLL_LIST_STALE_SECONDS", "5"))
+
+# Concurrent cache misses for one key wait on a single computation: how long
+# a waiter waits before computing itself, and how long the computing
+# worker's lock lives if it dies.
+SINGLEFLIGHT_WAIT_SECONDS = float(os.getenv("SINGLEFLIGHT_WAIT_SECONDS", "5"))
+SINGLEFLIGHT_LOCK_SECONDS = int(os.getenv("SINGLEFLIGHT_LOCK_SECONDS", "30"))
+
+# Threads per worker refreshing stale cache entries in the background.
+CACHE_REFRESH_THREADS = int(os.getenv("CACHE_REFRESH_THREADS", "2"))
+
+# Maximum number of polls per batch results request.
+RESULTS_BATCH_MAX_IDS = int(os.getenv("RESULTS_BATCH_MAX_IDS", "50"))
+
+# Breakdown cells with fewer votes than this are suppressed for privacy.
+BREAKDOWN_MIN_CELL_SIZE = int(os.getenv("BREAKDOWN_MIN_CELL_SIZE", "5"))
+
+# Voters read per poll and round when cross-tabulating two polls.
+CROSSTAB_CHUNK_SIZE = int(os.getenv("CROSSTAB_CHUNK_SIZE", "200000"))
+
+# Append-only vote event log (see polls/votelog.py); empty disables it.
+# Records per segment file, and fsync after this many records or seconds.
+VOTE_LOG_DIR = os.getenv("VOTE_LOG_DIR", "")
+VOTE_LOG_SEGMENT_RECORDS = int(
+    os.getenv("VOTE_LOG_SEGMENT_RECORDS", "1000000")
+)
+VOTE_LOG_FSYNC_RECORDS = int(os.getenv("VOTE_LOG_FSYNC_RECORDS", "256"))
+VOTE_LOG_FSYNC_INTERVAL = float(os.getenv("VOTE_LOG_FSYNC_INTERVAL", "0.2"))
+
+# Vote counts shared by the workers of a single web host through a mapped
+# file, e.g. /dev/shm/pollpulse-tallies (see polls/tallies.py); empty
+# disables it. Slots (a power of two) hold one option or poll each.
+TALLY_STORE_PATH = os.getenv("TALLY_STORE_PATH", "")
+TALLY_STORE_SLOTS = int(os.getenv("TALLY_STORE_SLOTS", str(2**20)))
+
+# Per-poll Bloom filters of voters that let first votes skip the duplicate
+# check (see polls/voterfilter.py): memory per worker (0 disables), target
+# false-positive rate and the smallest filter allocated.
+VOTER_FILTER_MAX_BYTES = int(
+    os.getenv("VOTER_FILTER_MAX_BYTES", str(64 * 2**20))
+)
+VOTER_FILTER_ERROR_RATE = float(os.getenv("VOTER_FILTER_ERROR_RATE", "0.01"))
+VOTER_FILTER_MIN_CAPACITY = int(os.getenv("VOTER_FILTER_MIN_CAPACITY", "1024"))
+
+# Keyset-paginated endpoints (e.g. search): default and maximum page size.
+KEYSET_PAGE_SIZE = int(os.getenv("KEYSET_PAGE_SIZE", "20"))
+KEYSET_MAX_PAGE_SIZE = int(os.getenv("KEYSET_MAX_PAGE_SIZE", "100"))
+
+# PostgreSQL text search configuration used to build and query poll search
+# vectors.
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "english")
+
+# Trending polls: a vote's weight halves every TRENDING_HALF_LIFE_SECONDS.
+# Each worker buffers its votes' weights and writes them every
+# TRENDING_FLUSH_SECONDS, keeps the top TRENDING_TOP_K polls in memory and
+# reloads them at most every TRENDING_REFRESH_SECONDS.
+TRENDING_HALF_LIFE_SECONDS = float(
+    os.getenv("TRENDING_HALF_LIFE_SECONDS", "21600")
+)
+TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", "50"))
+TRENDING_REFRESH_SECONDS = float(os.getenv("TRENDING_REFRESH_SECONDS", "30"))
+TRENDING_FLUSH_SECONDS = float(os.getenv("TRENDING_FLUSH_SECONDS", "2"))
+
+# How long the first response to an Idempotency-Key is replayed to retries.
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+
+# Background jobs (manage.py runworker). Failed jobs are retried after
+# JOB_RETRY_BACKOFF_SECONDS, doubling per attempt up to the maximum; a
+# running job whose worker stops renewing its lease (every third of
+# JOB_LEASE_SECONDS) for JOB_LEASE_SECONDS is handed to another worker.
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+JOB_RETRY_BACKOFF_MAX_SECONDS = float(
+    os.getenv("JOB_RETRY_BACKOFF_MAX_SECONDS", "3600")
+)
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+# Rows deleted per transaction when polls and users are deleted with their
+# votes (see polls/deletion.py).
+DELETION_BATCH_SIZE = int(os.getenv("DELETION_BATCH_SIZE", "5000"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
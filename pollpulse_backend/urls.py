@@ -17,29 +17,11 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="PollPulse API",
-        default_version="v1",
-        description="API documentation for the PollPulse Online Poll System Backend",
-        terms_of_service="https://www.example.com/terms/",
-        contact=openapi.Contact(email="contact@example.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from .docs import swagger_ui
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/v1/", include("polls.urls")),
-    path(
-        "api/v1/docs/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
+    path("api/v1/docs/", swagger_ui, name="schema-swagger-ui"),
 ]
@@ -1,3 +1,345 @@
-from django.contrib import admin
+"""
+Admin for tables with tens of millions of rows.
 
-# Register your models here.
+* Change lists never run ``COUNT(*)`` over a big table: the paginator uses
+  PostgreSQL's row estimates (see ``estimated_count``) and the "show all"
+  total is disabled.
+* Foreign keys are edited with raw-id or autocomplete widgets instead of
+  select boxes listing every row, and listed objects are fetched with
+  their related rows in the same query.
+* Bulk actions run a few set-based queries per chunk of primary keys and
+  keep the read paths in sync (rendered JSON, cache versions, shared
+  tallies). Django's ``delete_selected`` is removed: its confirmation page
+  loads every selected row and its cascade.
+
+The admin works on the default database only.
+"""
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import jobs, tallies
+from .cache import (
+    bump_list_version,
+    bump_poll_version,
+    poll_cache_keys,
+    poll_latest_keys,
+)
+from .models import Job, Option, Poll, User, Vote
+from .projections import render_poll, store_rendered_polls
+from .results import compute_results, flight as results_flight
+from .search import index_poll
+
+# Below this estimate the exact count is cheap and estimates are noisy.
+ESTIMATED_COUNT_THRESHOLD = 10000
+# Polls updated per round by bulk actions.
+ACTION_CHUNK_SIZE = 1000
+
+
+def estimated_count(queryset):
+    """
+    Returns the planner's row estimate of a queryset on PostgreSQL (the
+    table's ``reltuples`` when unfiltered), or the exact count when the
+    estimate is small or unavailable.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class "
+                    "WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                estimate = cursor.fetchone()[0]
+            else:
+                sql, params = queryset.query.get_compiler(
+                    using=queryset.db
+                ).as_sql()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                estimate = plan[0]["Plan"]["Plan Rows"]
+        if estimate >= ESTIMATED_COUNT_THRESHOLD:
+            return int(estimate)
+    return queryset.count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginates with ``estimated_count`` instead of ``COUNT(*)``.
+    """
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
+
+
+class ScalableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ("-pk",)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+
+def id_chunks(queryset, size=ACTION_CHUNK_SIZE):
+    """
+    Yields the primary keys of a queryset in ascending chunks.
+    """
+    ids = queryset.order_by("pk").values_list("pk", flat=True)
+    after = None
+    while True:
+        chunk = list(
+            (ids if after is None else ids.filter(pk__gt=after))[:size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1]
+
+
+def enqueue_deletions(request, queryset, kind, key):
+    """
+    Queues one chunked-deletion job per selected object and returns how many
+    were queued.
+    """
+    queued = 0
+    for chunk in id_chunks(queryset):
+        for object_id in chunk:
+            jobs.enqueue(kind, {key: object_id}, user=request.user)
+        queued += len(chunk)
+    return queued
+
+
+def refresh_polls(poll_ids):
+    """
+    Brings the read paths of bulk-updated polls up to date.
+    """
+    store_rendered_polls(Poll.objects.filter(pk__in=poll_ids))
+    for poll_id in poll_ids:
+        bump_poll_version(poll_id)
+
+
+class OptionInline(admin.TabularInline):
+    """
+    A poll's options with their vote counts, from one grouped query.
+    """
+
+    model = Option
+    fields = ("option_text", "option_order", "vote_count")
+    readonly_fields = ("vote_count",)
+    extra = 0
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("poll")
+            .annotate(vote_count=Count("votes"))
+        )
+
+    @admin.display(description="Votes")
+    def vote_count(self, option):
+        return getattr(option, "vote_count", 0)
+
+    def has_delete_permission(self, request, obj=None):
+        # Deleting an option cascades to all of its votes.
+        return False
+
+
+@admin.register(Poll)
+class PollAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "id",
+        "title",
+        "user",
+        "created_at",
+        "expires_at",
+        "is_deleted",
+    )
+    list_select_related = ("user",)
+    list_filter = ("is_deleted",)
+    search_fields = ("^title",)
+    autocomplete_fields = ("user",)
+    readonly_fields = ("created_at", "deleted_at")
+    inlines = (OptionInline,)
+    actions = ("soft_delete", "close", "recount", "delete_in_background")
+
+    def has_delete_permission(self, request, obj=None):
+        # A poll's cascade can reach millions of votes; soft delete it or
+        # use the chunked deletion action.
+        return False
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        poll = form.instance
+        index_poll(poll)
+        render_poll(poll)
+        bump_poll_version(poll.id)
+        bump_list_version()
+        tallies.forget_polls([poll.id])
+
+    @admin.action(description="Soft delete selected polls")
+    def soft_delete(self, request, queryset):
+        now = timezone.now()
+        updated = 0
+        for chunk in id_chunks(queryset.filter(is_deleted=False)):
+            updated += Poll.objects.filter(pk__in=chunk).update(
+                is_deleted=True, deleted_at=now
+            )
+            refresh_polls(chunk)
+            tallies.forget_polls(chunk)
+        bump_list_version()
+        self.message_user(request, f"Soft deleted {updated} polls.")
+
+    @admin.action(description="Close selected polls now")
+    def close(self, request, queryset):
+        now = timezone.now()
+        open_polls = queryset.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+        )
+        updated = 0
+        for chunk in id_chunks(open_polls):
+            updated += Poll.objects.filter(pk__in=chunk).update(expires_at=now)
+            refresh_polls(chunk)
+        bump_list_version()
+        self.message_user(request, f"Closed {updated} polls.")
+
+    @admin.action(description="Recount results of selected polls")
+    def recount(self, request, queryset):
+        """
+        Recounts results with one grouped query per chunk and stores them
+        under fresh cache versions.
+        """
+        recounted = 0
+        for chunk in id_chunks(queryset):
+            for poll_id in chunk:
+                bump_poll_version(poll_id)
+            tallies.forget_polls(chunk)
+            results_flight.store(
+                compute_results(chunk),
+                poll_cache_keys("results", chunk),
+                settings.RESULTS_CACHE_TIMEOUT,
+                poll_latest_keys("results", chunk),
+            )
+            recounted += len(chunk)
+        self.message_user(
+            request, f"Recounted {recounted} polls.", messages.SUCCESS
+        )
+
+    @admin.action(description="Delete selected polls and their votes")
+    def delete_in_background(self, request, queryset):
+        queued = enqueue_deletions(request, queryset, "delete_poll", "poll_id")
+        self.message_user(
+            request,
+            f"Queued deletion of {queued} polls; see Jobs for progress.",
+        )
+
+
+@admin.register(Option)
+class OptionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "option_text", "poll", "option_order")
+    list_select_related = ("poll",)
+    autocomplete_fields = ("poll",)
+
+    def has_delete_permission(self, request, obj=None):
+        # Deleting an option cascades to all of its votes.
+        return False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        render_poll(obj.poll)
+        bump_poll_version(obj.poll_id)
+        bump_list_version()
+        tallies.forget_polls([obj.poll_id])
+
+
+@admin.register(Vote)
+class VoteAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "user", "poll", "option", "created_at")
+    list_select_related = ("user", "poll", "option__poll")
+    raw_id_fields = ("user", "poll", "option")
+    readonly_fields = ("created_at",)
+
+    def save_model(self, request, obj, form, change):
+        old_poll_id = form.initial.get("poll")
+        super().save_model(request, obj, form, change)
+        self.votes_changed({obj.poll_id, old_poll_id} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.votes_changed([obj.poll_id])
+
+    def votes_changed(self, poll_ids):
+        for poll_id in poll_ids:
+            bump_poll_version(poll_id)
+        tallies.forget_polls(list(poll_ids))
+
+
+@admin.register(User)
+class UserAdmin(ScalableAdminMixin, BaseUserAdmin):
+    list_display = (
+        "id",
+        "username",
+        "email",
+        "segment",
+        "is_staff",
+        "date_joined",
+    )
+    list_filter = ("is_staff", "is_superuser", "is_active")
+    search_fields = ("^username", "=email")
+    readonly_fields = ("created_at",)
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ("PollPulse", {"fields": ("segment", "created_at")}),
+    )
+    actions = ("delete_in_background",)
+
+    def has_delete_permission(self, request, obj=None):
+        # A user's cascade reaches all of their polls and votes; use the
+        # chunked deletion action.
+        return False
+
+    @admin.action(description="Delete selected users, their polls and votes")
+    def delete_in_background(self, request, queryset):
+        queued = enqueue_deletions(request, queryset, "delete_user", "user_id")
+        self.message_user(
+            request,
+            f"Queued deletion of {queued} users; see Jobs for progress.",
+        )
+
+
+@admin.register(Job)
+class JobAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    """
+    Read-only view of background jobs, e.g. to follow chunked deletions.
+    """
+
+    list_display = (
+        "id",
+        "kind",
+        "status",
+        "progress",
+        "progress_message",
+        "attempts",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status", "kind")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
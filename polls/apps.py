@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def reserve_shard_id_blocks(sender, using, **kwargs):
+    from django.conf import settings
+    from .sharding import reserve_id_block
+
+    if using in settings.POLL_SHARDS:
+        reserve_id_block(using)
 
 
 class PollsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'polls'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+
+        post_migrate.connect(reserve_shard_id_blocks, sender=self)
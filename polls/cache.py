@@ -0,0 +1,140 @@
+"""
+Versioned cache helpers for poll read paths.
+
+Every poll has a version counter stored in the cache. Derived data such as
+results and breakdowns is cached under keys that embed that version, so a
+single bump (on a new vote or an option change) invalidates all of it.
+Poll list pages work the same way with one version shared by all polls,
+bumped whenever a poll is created, edited or deleted.
+"""
+
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = "pollpulse:poll:{poll_id}:version"
+LIST_VERSION_KEY = "pollpulse:poll-list:version"
+
+
+def _initial_version():
+    # Seed from the clock so a version key that was evicted never restarts
+    # at a number whose derived entries may still be in the cache.
+    return int(time.time() * 1000)
+
+
+def get_poll_version(poll_id):
+    """
+    Returns the current cache version of a poll, initialising it if needed.
+    """
+    key = VERSION_KEY.format(poll_id=poll_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_poll_versions(poll_ids):
+    """
+    Returns ``{poll_id: version}`` for many polls in one cache round trip,
+    initialising missing versions.
+    """
+    keys = {
+        VERSION_KEY.format(poll_id=poll_id): poll_id for poll_id in poll_ids
+    }
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        version = _initial_version()
+        for key in missing:
+            cache.add(key, version, timeout=None)
+        found.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump_poll_version(poll_id):
+    """
+    Invalidates every versioned cache entry of a poll.
+    """
+    key = VERSION_KEY.format(poll_id=poll_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def get_list_version():
+    """
+    Returns the current cache version of poll list pages.
+    """
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        cache.add(LIST_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(LIST_VERSION_KEY)
+    return version
+
+
+def bump_list_version():
+    """
+    Invalidates every cached poll list page.
+    """
+    try:
+        return cache.incr(LIST_VERSION_KEY)
+    except ValueError:
+        version = _initial_version()
+        cache.set(LIST_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def list_cache_key(*parts):
+    """
+    Builds a cache key for a poll list page bound to the list version.
+    """
+    suffix = ":".join(str(part) for part in parts)
+    return f"pollpulse:poll-list:v{get_list_version()}:{suffix}"
+
+
+def list_latest_key(*parts):
+    """
+    Builds the unversioned key under which the latest copy of a poll list
+    page is kept for stale-while-revalidate.
+    """
+    suffix = ":".join(str(part) for part in parts)
+    return f"pollpulse:poll-list:latest:{suffix}"
+
+
+def poll_cache_key(kind, poll_id, *parts):
+    """
+    Builds a cache key for derived poll data bound to the poll's version.
+    """
+    return _versioned_key(kind, poll_id, get_poll_version(poll_id), parts)
+
+
+def poll_cache_keys(kind, poll_ids, *parts):
+    """
+    Builds ``{poll_id: key}`` cache keys for many polls at once.
+    """
+    versions = get_poll_versions(poll_ids)
+    return {
+        poll_id: _versioned_key(kind, poll_id, version, parts)
+        for poll_id, version in versions.items()
+    }
+
+
+def poll_latest_keys(kind, poll_ids, *parts):
+    """
+    Builds ``{poll_id: key}`` unversioned keys under which the latest copy
+    of derived poll data is kept for stale-while-revalidate.
+    """
+    suffix = ":".join(str(part) for part in parts)
+    return {
+        poll_id: f"pollpulse:{kind}:{poll_id}:latest:{suffix}"
+        for poll_id in poll_ids
+    }
+
+
+def _versioned_key(kind, poll_id, version, parts):
+    suffix = ":".join(str(part) for part in parts)
+    return f"pollpulse:{kind}:{poll_id}:v{version}:{suffix}"
@@ -0,0 +1,154 @@
+"""
+Change feed of the poll catalog, for incremental sync.
+
+Whenever a poll's public JSON is (re)rendered the poll is stamped with the
+next number of its database's change sequence (``Poll.change_seq``), so
+creates, updates, option edits and soft deletes all move it to the head of
+the feed. Hard-deleted polls leave a ``PollTombstone`` stamped from the
+same sequence. A client that remembers the last number it has seen reads
+everything above it with one indexed range query per database.
+
+On PostgreSQL stamps come from the ``polls_poll_change_seq`` sequence under
+a transaction-level advisory lock, so they commit in sequence order and a
+reader never moves past a stamp that commits later. Other databases (SQLite
+in tests) serialise writers and take the next number after the largest one
+in use.
+
+Polls bulk-loaded by ``seed_pollpulse`` and those that existed before the
+feed start at ``change_seq`` 0, outside the feed; ``stamp_new_polls``
+(run by the seed command and migration 0014) enters them. Polls whose JSON
+was never stored are rendered when the feed is read.
+"""
+
+import json
+
+from django.db import connections, transaction
+from django.db.models import BooleanField, Case, F, Max, Min, Value, When
+
+from .models import Poll, PollTombstone
+
+SEQUENCE = "polls_poll_change_seq"
+# Advisory lock serialising stamps (the sequence's name as a number).
+LOCK_KEY = int.from_bytes(SEQUENCE.encode()[:8], "big") >> 1
+
+
+def next_changes(alias, count):
+    """
+    Returns the next ``count`` change numbers of a database, ascending.
+    Must run inside a transaction, which then holds the stamping lock.
+    """
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [LOCK_KEY])
+            cursor.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                [SEQUENCE, count],
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+    last = 0
+    for model in (Poll, PollTombstone):
+        stamped = model.objects.using(alias).aggregate(last=Max("change_seq"))
+        last = max(last, stamped["last"] or 0)
+    return list(range(last + 1, last + 1 + count))
+
+
+def stamp_polls(poll_ids, using):
+    """
+    Moves polls to the head of the change feed.
+    """
+    poll_ids = sorted(set(poll_ids))
+    if not poll_ids:
+        return
+    with transaction.atomic(using=using):
+        changes = next_changes(using, len(poll_ids))
+        Poll.objects.using(using).filter(pk__in=poll_ids).update(
+            change_seq=Case(
+                *[
+                    When(pk=poll_id, then=Value(change))
+                    for poll_id, change in zip(poll_ids, changes)
+                ]
+            )
+        )
+
+
+def stamp_new_polls(using):
+    """
+    Enters every poll that was never stamped into the change feed, in id
+    order, with one ``UPDATE``. Returns the number of polls stamped.
+    """
+    unstamped = Poll.objects.using(using).filter(change_seq=0)
+    with transaction.atomic(using=using):
+        first = unstamped.aggregate(first=Min("id"))["first"]
+        if first is None:
+            return 0
+        # Numbers from the next free one on, offset by id; the gaps are
+        # never handed out.
+        (change,) = next_changes(using, 1)
+        stamped = unstamped.update(change_seq=F("id") + (change - first))
+        connection = connections[using]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT setval(%s, (SELECT MAX(change_seq) FROM "
+                    f"{Poll._meta.db_table}))",
+                    [SEQUENCE],
+                )
+        return stamped
+
+
+def record_tombstone(poll_id, using):
+    """
+    Adds a hard-deleted poll to the change feed.
+    """
+    with transaction.atomic(using=using):
+        (change,) = next_changes(using, 1)
+        PollTombstone.objects.using(using).update_or_create(
+            poll_id=poll_id, defaults={"change_seq": change}
+        )
+
+
+def changes_since(after, limit, using=None):
+    """
+    Returns up to ``limit`` ``(change_seq, poll_id, deleted)`` entries of a
+    database's feed above ``after``, in feed order.
+
+    Soft-deleted polls are reported as deleted.
+    """
+    polls = (
+        Poll.objects.using(using)
+        .filter(change_seq__gt=after)
+        .values_list("change_seq", "id", "is_deleted")
+    )
+    tombstones = (
+        PollTombstone.objects.using(using)
+        .filter(change_seq__gt=after)
+        .values_list("change_seq", "poll_id", Value(True, BooleanField()))
+    )
+    return list(
+        polls.union(tombstones, all=True).order_by("change_seq")[:limit]
+    )
+
+
+def render_changes(changes, using=None):
+    """
+    Renders feed entries as JSON texts, splicing in the stored JSON of the
+    polls that were created or updated.
+    """
+    # Imported here: projections stamps polls with this module.
+    from .projections import rendered_polls
+
+    live = Poll.objects.using(using).filter(
+        pk__in=[poll_id for _, poll_id, deleted in changes if not deleted]
+    )
+    rendered = {row["id"]: row["json"] for row in rendered_polls(live)}
+    entries = []
+    for change, poll_id, deleted in changes:
+        entry = json.dumps(
+            {"seq": change, "id": poll_id, "deleted": deleted},
+            separators=(",", ":"),
+        )
+        if not deleted:
+            entry = f'{entry[:-1]},"poll":{rendered.get(poll_id) or "null"}}}'
+        entries.append(entry)
+    return entries
@@ -0,0 +1,60 @@
+"""
+System checks of the deployment settings.
+
+Poll versions, single-flight locks and cached results live in the default
+cache. With ``LocMemCache`` each process has its own copy, so a vote
+handled by one Gunicorn worker does not invalidate the results the others
+cached. Deployments with several processes or databases refuse to start
+with it.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, register
+from django.core.exceptions import ImproperlyConfigured
+
+PROCESS_LOCAL_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+def shared_cache_problems(workers=1):
+    """
+    Returns why the deployment needs a shared cache that it does not have.
+    """
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+    problems = []
+    if workers > 1:
+        problems.append(f"{workers} web workers")
+    if len(settings.POLL_SHARDS) > 1:
+        problems.append("poll shards (DB_SHARD_HOSTS)")
+    if settings.DATABASE_REPLICAS:
+        problems.append("read replicas (DB_REPLICA_HOSTS)")
+    return problems
+
+
+def require_shared_cache(workers):
+    """
+    Raises ``ImproperlyConfigured`` when ``workers`` processes would each
+    keep their own cache. Called by the Gunicorn profile before forking.
+    """
+    problems = shared_cache_problems(workers)
+    if problems:
+        raise ImproperlyConfigured(
+            f"The process-local cache cannot serve {', '.join(problems)}. "
+            "Set CACHE_BACKEND and CACHE_LOCATION to a shared cache such as "
+            "django.core.cache.backends.redis.RedisCache."
+        )
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    problems = shared_cache_problems()
+    if not problems:
+        return []
+    return [
+        Error(
+            f"The process-local cache cannot serve {', '.join(problems)}.",
+            hint="Set CACHE_BACKEND and CACHE_LOCATION to a shared cache "
+            "such as django.core.cache.backends.redis.RedisCache.",
+            id="polls.E001",
+        )
+    ]
@@ -0,0 +1,261 @@
+"""
+Columnar snapshot of the poll, option and vote tables for analytics.
+
+Every column is a raw little-endian array file, ``<table>/<column>.bin``,
+that can be mapped without parsing::
+
+    votes = numpy.memmap("export/votes/option_id.bin", dtype="<i8", mode="r")
+
+Ids and timestamps are int64 (timestamps in microseconds since the Unix
+epoch, NULL as ``NULL_TIMESTAMP``), flags are int8 and option texts are
+dictionary-encoded: ``options/option_text.bin`` holds int32 codes into the
+JSON list in ``options/option_text.dict.json``, written at the end of each
+run. While exporting, each chunk's new values are appended to
+``options/option_text.dict.jsonl`` (one JSON value per line, in code
+order) instead, so the dictionary is never rewritten per chunk.
+
+``manifest.json`` records each table's row count, column dtypes, the size
+of its dictionary logs and, per source database, the highest primary key
+exported (the watermark). Later runs append only rows above the watermark.
+Columns are appended first and the manifest is replaced afterwards, so
+bytes past the manifest's row count (or dictionary log size) are leftovers
+of an interrupted run and are truncated by the next one.
+"""
+
+import json
+import os
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from .models import Option, Poll, Vote
+
+FORMAT_VERSION = 1
+NULL_TIMESTAMP = -(2**63)
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Array typecodes of the column dtypes.
+TYPECODES = {"<i8": "q", "<i4": "i", "<i1": "b"}
+
+
+def timestamp(value):
+    """
+    Converts a datetime into microseconds since the Unix epoch.
+    """
+    if value is None:
+        return NULL_TIMESTAMP
+    return (value - UNIX_EPOCH) // timedelta(microseconds=1)
+
+
+def flag(value):
+    return int(bool(value))
+
+
+def identity(value):
+    return value
+
+
+class Table:
+    """
+    Describes how one model is exported: ``(column, field, dtype,
+    converter)`` per column, and the timestamp used to hold back rows that
+    may still have uncommitted neighbours.
+    """
+
+    def __init__(self, name, model, columns, settled_field):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.settled_field = settled_field
+
+
+TABLES = [
+    Table(
+        "polls",
+        Poll,
+        [
+            ("id", "id", "<i8", identity),
+            ("user_id", "user_id", "<i8", identity),
+            ("created_at", "created_at", "<i8", timestamp),
+            ("expires_at", "expires_at", "<i8", timestamp),
+            ("is_deleted", "is_deleted", "<i1", flag),
+        ],
+        "created_at",
+    ),
+    Table(
+        "options",
+        Option,
+        [
+            ("id", "id", "<i8", identity),
+            ("poll_id", "poll_id", "<i8", identity),
+            ("option_order", "option_order", "<i8", identity),
+            ("option_text", "option_text", "<i4", None),
+        ],
+        "poll__created_at",
+    ),
+    Table(
+        "votes",
+        Vote,
+        [
+            ("id", "id", "<i8", identity),
+            ("poll_id", "poll_id", "<i8", identity),
+            ("option_id", "option_id", "<i8", identity),
+            ("user_id", "user_id", "<i8", identity),
+            ("created_at", "created_at", "<i8", timestamp),
+        ],
+        "created_at",
+    ),
+]
+
+# Dictionary-encoded columns: (table, column).
+DICTIONARY_COLUMNS = {("options", "option_text")}
+
+
+class ColumnarExport:
+    """
+    An export directory: its manifest, dictionaries and column files.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as manifest:
+                self.manifest = json.load(manifest)
+        else:
+            self.manifest = {"format": FORMAT_VERSION, "tables": {}}
+        self.dictionaries = {}
+
+    def column_path(self, table, column):
+        return os.path.join(self.directory, table, f"{column}.bin")
+
+    def dictionary_path(self, table, column):
+        return os.path.join(self.directory, table, f"{column}.dict.json")
+
+    def dictionary_log_path(self, table, column):
+        return os.path.join(self.directory, table, f"{column}.dict.jsonl")
+
+    def table_state(self, table):
+        return self.manifest["tables"].setdefault(
+            table.name,
+            {
+                "rows": 0,
+                "watermarks": {},
+                "columns": {
+                    column: dtype for column, _, dtype, _ in table.columns
+                },
+            },
+        )
+
+    def dictionary(self, table, column):
+        """
+        Returns ``(values, codes)`` of a dictionary-encoded column.
+
+        Values are read from the dictionary log up to the size committed
+        in the manifest, or from the final dictionary of exports without a
+        log, which then starts one.
+        """
+        key = (table.name, column)
+        if key not in self.dictionaries:
+            sizes = self.table_state(table).setdefault("dictionaries", {})
+            log_path = self.dictionary_log_path(table.name, column)
+            values = []
+            if column in sizes:
+                with open(log_path, "r+b") as log:
+                    log.truncate(sizes[column])
+                    values = [json.loads(line) for line in log]
+            else:
+                path = self.dictionary_path(table.name, column)
+                if os.path.exists(path):
+                    with open(path) as dictionary:
+                        values = json.load(dictionary)
+                with open(log_path, "wb") as log:
+                    sizes[column] = self.append_log(log, values)
+            self.dictionaries[key] = (
+                values,
+                {value: code for code, value in enumerate(values)},
+            )
+        return self.dictionaries[key]
+
+    def append_log(self, log, values):
+        """
+        Appends values to an open dictionary log, syncs it and returns its
+        new size.
+        """
+        log.write(
+            b"".join(json.dumps(value).encode() + b"\n" for value in values)
+        )
+        log.flush()
+        os.fsync(log.fileno())
+        return log.tell()
+
+    def prepare(self, table):
+        """
+        Creates the table's directory and truncates its column files to the
+        row count in the manifest.
+        """
+        state = self.table_state(table)
+        os.makedirs(os.path.join(self.directory, table.name), exist_ok=True)
+        for column, _, dtype, _ in table.columns:
+            path = self.column_path(table.name, column)
+            size = state["rows"] * array(TYPECODES[dtype]).itemsize
+            with open(path, "ab") as column_file:
+                column_file.truncate(size)
+
+    def append(self, table, rows, alias, watermark):
+        """
+        Appends a chunk of ``values_list`` rows (in ``table.columns`` order)
+        and commits it to the manifest.
+        """
+        state = self.table_state(table)
+        for index, (column, _, dtype, convert) in enumerate(table.columns):
+            if (table.name, column) in DICTIONARY_COLUMNS:
+                values, codes = self.dictionary(table, column)
+                known = len(values)
+                data = array(TYPECODES[dtype])
+                for row in rows:
+                    value = row[index]
+                    if value not in codes:
+                        codes[value] = len(values)
+                        values.append(value)
+                    data.append(codes[value])
+                if len(values) > known:
+                    with open(
+                        self.dictionary_log_path(table.name, column), "ab"
+                    ) as log:
+                        state["dictionaries"][column] = self.append_log(
+                            log, values[known:]
+                        )
+            else:
+                data = array(
+                    TYPECODES[dtype], (convert(row[index]) for row in rows)
+                )
+            if sys.byteorder != "little":
+                data.byteswap()
+            with open(
+                self.column_path(table.name, column), "ab"
+            ) as column_file:
+                data.tofile(column_file)
+                column_file.flush()
+                os.fsync(column_file.fileno())
+        state["rows"] += len(rows)
+        state["watermarks"][alias] = watermark
+        self.write_json(self.manifest_path, self.manifest)
+
+    def finish(self):
+        """
+        Writes the final dictionary of every dictionary-encoded column.
+        """
+        for table in TABLES:
+            for column, _, _, _ in table.columns:
+                if (table.name, column) in DICTIONARY_COLUMNS:
+                    values, _ = self.dictionary(table, column)
+                    self.write_json(
+                        self.dictionary_path(table.name, column), values
+                    )
+
+    def write_json(self, path, data):
+        partial = f"{path}.tmp"
+        with open(partial, "w") as output:
+            json.dump(data, output)
+        os.replace(partial, path)
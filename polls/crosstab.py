@@ -0,0 +1,168 @@
+"""
+Cross-poll tabulation: how the voters of one poll voted on another.
+
+A voter votes at most once per poll, so each poll is a sorted array of
+``(user_id, option)`` pairs when read in user order (index-only, from
+``polls_vote_poll_user_idx``). The crosstab is a merge join of the two
+arrays, done a chunk at a time so memory stays bounded by
+``CROSSTAB_CHUNK_SIZE`` rows per poll however many voters the polls have:
+
+* read the next chunk of both polls after the last user joined;
+* join the users both chunks fully cover (up to the smaller of the two
+  last user ids) with ``np.intersect1d``;
+* count the matched ``(option A, option B)`` pairs with one ``bincount``.
+
+Rows past the joined range are read again with the next chunk, so every
+round consumes at least one full chunk of one poll.
+
+On PostgreSQL chunks are streamed with ``COPY ... (FORMAT binary)`` and
+decoded by numpy in one pass instead of building a Python tuple per vote.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.db.models import BigIntegerField
+from django.db.models.functions import Cast
+
+from .models import Option, Vote
+
+# A binary COPY row of two bigint columns: field count, then length and
+# value of each field, all big-endian.
+COPY_ROW = np.dtype(
+    [
+        ("fields", ">i2"),
+        ("user_length", ">i4"),
+        ("user_id", ">i8"),
+        ("option_length", ">i4"),
+        ("option_id", ">i8"),
+    ]
+)
+# Signature and flags precede the header extension length.
+COPY_HEADER_SIZE = 15
+COPY_TRAILER_SIZE = 2
+
+
+class PollOptions:
+    """
+    A poll's options in display order and a vectorised id -> row lookup.
+    """
+
+    def __init__(self, poll_id, using):
+        self.options = list(
+            Option.objects.using(using)
+            .filter(poll_id=poll_id)
+            .order_by("option_order", "id")
+            .values("id", "option_text")
+        )
+        ids = np.array([option["id"] for option in self.options], np.int64)
+        self.order = np.argsort(ids)
+        self.sorted_ids = ids[self.order]
+
+    def __len__(self):
+        return len(self.options)
+
+    def codes(self, option_ids):
+        """
+        Returns the display row of each option id, or -1 for ids that are
+        not options of the poll.
+        """
+        if not len(self.options):
+            return np.full(len(option_ids), -1, np.int64)
+        positions = np.searchsorted(self.sorted_ids, option_ids)
+        positions = np.minimum(positions, len(self.sorted_ids) - 1)
+        found = self.sorted_ids[positions] == option_ids
+        return np.where(found, self.order[positions], -1)
+
+
+def voter_chunk(poll_id, using, after, limit):
+    """
+    Returns ``(user_ids, option_ids)`` arrays of the next ``limit`` voters
+    of a poll with a user id above ``after``, in user order.
+    """
+    rows = (
+        Vote.objects.using(using)
+        .filter(poll_id=poll_id, user_id__gt=after)
+        .order_by("user_id")
+        .values_list(
+            Cast("user_id", BigIntegerField()),
+            Cast("option_id", BigIntegerField()),
+        )[:limit]
+    )
+    if connections[using].vendor == "postgresql":
+        return copy_pairs(rows, using)
+    pairs = np.array(list(rows), np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def copy_pairs(rows, using):
+    """
+    Streams a two-bigint-column queryset with a binary COPY.
+    """
+    connection = connections[using]
+    sql, params = rows.query.get_compiler(using).as_sql()
+    with connection.cursor() as cursor:
+        with cursor.copy(
+            f"COPY ({sql}) TO STDOUT (FORMAT binary)", params
+        ) as copy:
+            data = b"".join(copy)
+    extension = int.from_bytes(
+        data[COPY_HEADER_SIZE : COPY_HEADER_SIZE + 4], "big"
+    )
+    offset = COPY_HEADER_SIZE + 4 + extension
+    count = (len(data) - offset - COPY_TRAILER_SIZE) // COPY_ROW.itemsize
+    decoded = np.frombuffer(data, COPY_ROW, count=count, offset=offset)
+    return (
+        decoded["user_id"].astype(np.int64),
+        decoded["option_id"].astype(np.int64),
+    )
+
+
+def compute_crosstab(poll_id, using, other_poll_id, other_using):
+    """
+    Counts, for every option of one poll and every option of another, the
+    voters who chose both.
+
+    Returns ``{"options", "other_options", "counts", "voters"}`` where
+    ``counts[i][j]`` pairs row ``i`` of ``options`` with column ``j`` of
+    ``other_options`` and ``voters`` is the number of voters of both polls.
+    """
+    rows = PollOptions(poll_id, using)
+    columns = PollOptions(other_poll_id, other_using)
+    counts = np.zeros(len(rows) * len(columns), np.int64)
+    chunk_size = settings.CROSSTAB_CHUNK_SIZE
+
+    after = 0
+    while len(rows) and len(columns):
+        users, options = voter_chunk(poll_id, using, after, chunk_size)
+        other_users, other_options = voter_chunk(
+            other_poll_id, other_using, after, chunk_size
+        )
+        if not len(users) or not len(other_users):
+            break
+        # Both chunks hold every voter up to the smaller last user id.
+        high = min(users[-1], other_users[-1])
+        end = np.searchsorted(users, high, side="right")
+        other_end = np.searchsorted(other_users, high, side="right")
+        _, matched, other_matched = np.intersect1d(
+            users[:end],
+            other_users[:other_end],
+            assume_unique=True,
+            return_indices=True,
+        )
+        row_codes = rows.codes(options[matched])
+        column_codes = columns.codes(other_options[other_matched])
+        valid = (row_codes >= 0) & (column_codes >= 0)
+        counts += np.bincount(
+            row_codes[valid] * len(columns) + column_codes[valid],
+            minlength=counts.size,
+        )
+        after = int(high)
+
+    matrix = counts.reshape(len(rows), len(columns))
+    return {
+        "options": rows.options,
+        "other_options": columns.options,
+        "counts": matrix.tolist(),
+        "voters": int(counts.sum()),
+    }
@@ -0,0 +1,217 @@
+"""
+Chunked deletion of polls and users.
+
+Deleting a poll or a user through the ORM makes Django's collector load
+every dependent vote into memory and delete everything in one transaction,
+which holds locks for minutes on big polls. Here the dependent rows are
+deleted in primary-key batches of ``DELETION_BATCH_SIZE``, one short
+transaction per batch, with plain ``DELETE`` statements that never build
+model instances:
+
+1. the poll is soft deleted (the user deactivated and their auth tokens
+   deleted), so it stops taking votes and leaves the read paths;
+2. votes, then options and the other per-poll rows, are deleted batch by
+   batch, reporting progress after each batch;
+3. the poll row is deleted together with anything added meanwhile, under a
+   row lock that keeps new votes out, and leaves a tombstone in the catalog
+   change feed (polls.changes).
+
+An interrupted deletion leaves a soft-deleted poll (an inactive user) with
+part of its rows and is finished by running it again.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import tallies
+from .cache import bump_list_version, bump_poll_version
+from .changes import record_tombstone, stamp_polls
+from .models import (
+    IdempotencyKey,
+    Option,
+    Poll,
+    PollSearchToken,
+    PollTrend,
+    User,
+    Vote,
+)
+from .sharding import shard_for_poll
+
+# Rows that reference a poll, deleted in this order before the poll.
+POLL_RELATIONS = (Vote, PollSearchToken, PollTrend, Option)
+
+
+class Progress:
+    """
+    Counts deleted votes, the bulk of any deletion, against the expected
+    total and passes them on to a ``report(done, total, message)`` callback.
+    """
+
+    def __init__(self, report=None):
+        self.report = report
+        self.total = 0
+        self.done = 0
+
+    def __call__(self, rows, message):
+        self.done += rows
+        if self.report is not None:
+            self.report(self.done, max(self.total, self.done), message)
+
+
+def raw_delete(queryset):
+    """
+    Deletes the rows of a queryset with a single ``DELETE``, bypassing the
+    collector, and returns how many were deleted.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_batches(queryset, batch_size, progress=None, poll_ids=None):
+    """
+    Deletes the rows of a queryset in ascending primary-key batches, each in
+    its own transaction, and returns how many were deleted.
+
+    If ``poll_ids`` is a set, the poll ids of the deleted rows are added to
+    it batch by batch, including rows added while the deletion runs.
+    """
+    ids = queryset.order_by("pk")
+    if poll_ids is None:
+        ids = ids.values_list("pk", flat=True)
+    else:
+        ids = ids.values_list("pk", "poll_id")
+    label = queryset.model._meta.verbose_name_plural
+    deleted = 0
+    after = None
+    while True:
+        batch = list(
+            (ids if after is None else ids.filter(pk__gt=after))[:batch_size]
+        )
+        if not batch:
+            return deleted
+        if poll_ids is not None:
+            poll_ids.update(poll_id for _, poll_id in batch)
+            batch = [pk for pk, _ in batch]
+        with transaction.atomic(using=queryset.db):
+            count = raw_delete(
+                queryset.model._base_manager.using(queryset.db).filter(
+                    pk__in=batch
+                )
+            )
+        deleted += count
+        after = batch[-1]
+        if progress is not None:
+            progress(count, f"Deleted {deleted} {label}")
+
+
+def _delete_poll(poll_id, alias, batch_size, progress):
+    polls = Poll.objects.using(alias).filter(pk=poll_id)
+    if polls.filter(is_deleted=False).update(
+        is_deleted=True, deleted_at=timezone.now()
+    ):
+        stamp_polls([poll_id], using=alias)
+    bump_poll_version(poll_id)
+    bump_list_version()
+    tallies.forget_polls([poll_id])
+
+    deleted = {}
+    for model in POLL_RELATIONS:
+        deleted[model.__name__] = delete_batches(
+            model.objects.using(alias).filter(poll_id=poll_id),
+            batch_size,
+            progress if model is Vote else None,
+        )
+
+    with transaction.atomic(using=alias):
+        # Votes need a share lock on the poll row for their foreign key
+        # check, so this lock keeps new ones out until the poll is gone.
+        list(polls.select_for_update().values_list("pk", flat=True))
+        for model in POLL_RELATIONS:
+            deleted[model.__name__] += raw_delete(
+                model.objects.using(alias).filter(poll_id=poll_id)
+            )
+        deleted["Poll"] = raw_delete(polls)
+        record_tombstone(poll_id, using=alias)
+
+    bump_poll_version(poll_id)
+    bump_list_version()
+    tallies.forget_polls([poll_id])
+    return deleted
+
+
+def delete_poll(poll_id, batch_size=None, report=None):
+    """
+    Deletes a poll with its votes, options and other per-poll rows and
+    returns the number of rows deleted per model.
+
+    Raises ``Poll.DoesNotExist`` when there is no such poll.
+    """
+    alias = shard_for_poll(poll_id)
+    if not Poll.objects.using(alias).filter(pk=poll_id).exists():
+        raise Poll.DoesNotExist(f"Poll {poll_id} does not exist.")
+    progress = Progress(report)
+    progress.total = Vote.objects.using(alias).filter(poll_id=poll_id).count()
+    return _delete_poll(
+        poll_id, alias, batch_size or settings.DELETION_BATCH_SIZE, progress
+    )
+
+
+def delete_user(user_id, batch_size=None, report=None):
+    """
+    Deletes a user with their polls (and every vote in them), their votes
+    in other polls and their idempotency keys, and returns the number of
+    rows deleted per model.
+
+    Raises ``User.DoesNotExist`` when there is no such user.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    users = User.objects.filter(pk=user_id)
+    # Inactive users fail authentication, so they stop voting and polling;
+    # their tokens are deleted now rather than with the user row.
+    if not users.update(is_active=False):
+        raise User.DoesNotExist(f"User {user_id} does not exist.")
+    Token.objects.filter(user_id=user_id).delete()
+
+    progress = Progress(report)
+    for alias in settings.POLL_SHARDS:
+        progress.total += (
+            Vote.objects.using(alias)
+            .filter(Q(user_id=user_id) | Q(poll__user_id=user_id))
+            .count()
+        )
+
+    deleted = {}
+    for alias in settings.POLL_SHARDS:
+        poll_ids = list(
+            Poll.objects.using(alias)
+            .filter(user_id=user_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        for poll_id in poll_ids:
+            counts = _delete_poll(poll_id, alias, batch_size, progress)
+            for model, count in counts.items():
+                deleted[model] = deleted.get(model, 0) + count
+
+        voted_polls = set()
+        deleted["Vote"] = deleted.get("Vote", 0) + delete_batches(
+            Vote.objects.using(alias).filter(user_id=user_id),
+            batch_size,
+            progress,
+            voted_polls,
+        )
+        for poll_id in voted_polls:
+            bump_poll_version(poll_id)
+        tallies.forget_polls(list(voted_polls))
+
+    deleted["IdempotencyKey"] = delete_batches(
+        IdempotencyKey.objects.filter(user_id=user_id), batch_size
+    )
+    # What is left (group memberships, admin log entries, jobs) is
+    # small, so the collector handles the user row and its cascade.
+    with transaction.atomic():
+        list(users.select_for_update().values_list("pk", flat=True))
+        deleted["User"] = users.delete()[1].get(User._meta.label, 0)
+    return deleted
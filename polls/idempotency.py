@@ -0,0 +1,122 @@
+"""
+``Idempotency-Key`` support for retried writes.
+
+The first request with a given key (per user) runs the view inside a
+transaction that holds the key's row; its response is stored on that row
+and committed together with the view's own writes on the default database.
+Retries with the same key and the same request get the stored response
+without running the view again. A retry that arrives while the first
+request is still running blocks on the row lock and then replays.
+
+Writes to another database are not part of that transaction. A vote on a
+poll shard other than default commits on its shard before the key row
+commits; if the request fails in between, the vote stays but the key
+stores no response, and a retry runs the view again (and is told the
+user already voted).
+
+Keys expire after ``IDEMPOTENCY_KEY_TTL`` seconds; ``purge_idempotency_keys``
+removes expired rows.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field("key").max_length
+
+
+def request_fingerprint(request):
+    """
+    Hashes what makes two requests "the same": method, path and body.
+    """
+    payload = json.dumps(
+        [request.method, request.path, request.data],
+        sort_keys=True,
+        cls=DjangoJSONEncoder,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def replay(record):
+    return Response(
+        record.response_body,
+        status=record.status_code,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def idempotent(method):
+    """
+    Makes a view method honour the ``Idempotency-Key`` request header.
+
+    Requests without the header run unchanged. Responses with a 5xx status
+    are not stored, so the request can be retried with the same key.
+    """
+
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return method(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {
+                    "error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = request_fingerprint(request)
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        fingerprint=fingerprint,
+                        expires_at=expires_at,
+                    )
+            except IntegrityError:
+                # Waits here while another request with this key runs.
+                record = IdempotencyKey.objects.select_for_update().get(
+                    user=request.user, key=key
+                )
+                if record.expires_at <= now:
+                    record.fingerprint = fingerprint
+                    record.status_code = None
+                    record.response_body = None
+                    record.expires_at = expires_at
+                elif record.fingerprint != fingerprint:
+                    return Response(
+                        {
+                            "error": f"{HEADER} was already used for a "
+                            "different request."
+                        },
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                elif record.status_code is not None:
+                    return replay(record)
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code >= 500:
+                record.delete()
+                return response
+            record.status_code = response.status_code
+            record.response_body = response.data
+            record.save()
+            return response
+
+    return wrapper
@@ -0,0 +1,265 @@
+"""
+Database-backed background jobs.
+
+Jobs are rows in the ``Job`` table on the default database. Workers
+(``manage.py runworker``) claim the oldest runnable job with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of worker processes
+can poll the table without handing out a job twice and without a broker.
+
+A claimed job holds a lease of ``JOB_LEASE_SECONDS``, which a heartbeat
+thread renews while the handler runs, whether or not it reports progress;
+a job whose worker died is claimed again once its lease runs out, unless
+that was its last attempt: a job that keeps killing its worker is failed
+rather than retried forever. Failed attempts are retried with exponential
+backoff until ``max_attempts`` is reached.
+
+A worker that loses its lease anyway (e.g. it stalled past the lease and
+another worker took the job) is told so by ``report_progress``, which
+raises ``LeaseLost``; the outcome of a handler that finishes without its
+lease is not recorded.
+
+Handlers are plain functions registered for a job kind::
+
+    @job_handler("recount_poll")
+    def recount_poll(job):
+        ...
+        report_progress(job, 0.5, "Half way")
+        return {"counted": 42}  # stored as the job's result
+"""
+
+import logging
+import random
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+HANDLERS = {}
+HEARTBEATS_PER_LEASE = 3
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    """
+    Raised by a handler to fail a job without further retries.
+    """
+
+
+class LeaseLost(Exception):
+    """
+    Raised when a worker no longer holds the lease of the job it runs.
+    """
+
+
+def job_handler(kind):
+    """
+    Registers the decorated function as the handler of a job kind.
+    """
+
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(kind, payload=None, user=None, run_after=None, max_attempts=None):
+    """
+    Queues a job and returns it.
+    """
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        created_by=user,
+        run_after=run_after or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def claim_job(worker_id):
+    """
+    Claims the next runnable job for a worker, or returns None.
+
+    Runnable jobs are queued jobs that are due and running jobs whose lease
+    has expired. Expired jobs that used up their attempts are failed.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    abandoned = Q(status=Job.RUNNING, locked_at__lt=lease_expired)
+    with transaction.atomic():
+        Job.objects.filter(abandoned, attempts__gte=F("max_attempts")).update(
+            status=Job.FAILED,
+            error="The job's lease expired on its last attempt.",
+            locked_by="",
+            locked_at=None,
+            updated_at=now,
+            finished_at=now,
+        )
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.QUEUED, run_after__lte=now) | abandoned)
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.save(
+            update_fields=[
+                "status",
+                "attempts",
+                "locked_by",
+                "locked_at",
+                "updated_at",
+            ]
+        )
+    return job
+
+
+def renew_lease(job):
+    """
+    Extends the lease of a running job. Returns False when the worker no
+    longer holds it.
+    """
+    now = timezone.now()
+    return bool(
+        Job.objects.filter(
+            pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by
+        ).update(locked_at=now, updated_at=now)
+    )
+
+
+@contextmanager
+def heartbeat(job):
+    """
+    Renews a job's lease from a background thread while the block runs.
+
+    A renewal that finds the lease taken sets ``job.lease_lost``.
+    """
+    job.lease_lost = False
+    stop = threading.Event()
+
+    def beat():
+        try:
+            interval = settings.JOB_LEASE_SECONDS / HEARTBEATS_PER_LEASE
+            while not stop.wait(interval):
+                try:
+                    if not renew_lease(job):
+                        job.lease_lost = True
+                        return
+                except DatabaseError:
+                    # Try again on the next beat, well within the lease.
+                    logger.exception("Could not renew job %s", job.pk)
+                    connections["default"].close()
+        finally:
+            connections["default"].close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def report_progress(job, fraction, message=""):
+    """
+    Records a handler's progress (0 to 1) and renews the job's lease.
+
+    Raises ``LeaseLost`` when another worker has taken the job over.
+    """
+    job.progress = max(0.0, min(1.0, fraction))
+    job.progress_message = message[:255]
+    now = timezone.now()
+    renewed = not getattr(job, "lease_lost", False) and Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by
+    ).update(
+        progress=job.progress,
+        progress_message=job.progress_message,
+        locked_at=now,
+        updated_at=now,
+    )
+    if not renewed:
+        job.lease_lost = True
+        raise LeaseLost(f"Job {job.pk} is no longer held by {job.locked_by}.")
+
+
+def retry_delay(attempts):
+    """
+    Returns the backoff before retry number ``attempts``, with jitter.
+    """
+    delay = min(
+        settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1),
+        settings.JOB_RETRY_BACKOFF_MAX_SECONDS,
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run_job(job):
+    """
+    Runs a claimed job's handler and records the outcome.
+
+    Returns whether the job succeeded; False too when the worker lost the
+    job's lease, whose new holder records the outcome instead.
+    """
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler for job kind '{job.kind}'.")
+        with heartbeat(job):
+            result = handler(job)
+    except LeaseLost:
+        logger.warning("Job %s lost its lease; dropping its outcome", job.pk)
+        return False
+    except Exception as exc:
+        now = timezone.now()
+        retry = (
+            not isinstance(exc, PermanentJobError)
+            and job.attempts < job.max_attempts
+        )
+        updates = {
+            "error": traceback.format_exc(),
+            "locked_by": "",
+            "locked_at": None,
+            "updated_at": now,
+        }
+        if retry:
+            updates["status"] = Job.QUEUED
+            updates["run_after"] = now + timedelta(
+                seconds=retry_delay(job.attempts)
+            )
+        else:
+            updates["status"] = Job.FAILED
+            updates["finished_at"] = now
+        Job.objects.filter(
+            pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by
+        ).update(**updates)
+        return False
+
+    now = timezone.now()
+    return bool(
+        Job.objects.filter(
+            pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by
+        ).update(
+            status=Job.SUCCEEDED,
+            progress=1.0,
+            result=result,
+            error="",
+            locked_by="",
+            locked_at=None,
+            updated_at=now,
+            finished_at=now,
+        )
+    )
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from polls import jobs
+from polls.deletion import delete_poll, delete_user
+from polls.models import Poll, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes polls or users with all their options and votes in short "
+        "primary-key batches instead of one long cascading transaction. "
+        "Re-run it to finish an interrupted deletion, or pass --background "
+        "to queue one job per object for runworker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=["poll", "user"])
+        parser.add_argument("ids", type=int, nargs="+")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Rows deleted per transaction. Defaults to "
+            "DELETION_BATCH_SIZE.",
+        )
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Queue deletion jobs instead of deleting in this process.",
+        )
+
+    def handle(self, *args, **options):
+        model = options["model"]
+        if options["batch_size"] is not None and options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        if options["background"]:
+            for object_id in options["ids"]:
+                job = jobs.enqueue(
+                    f"delete_{model}", {f"{model}_id": object_id}
+                )
+                self.stdout.write(
+                    f"Queued job {job.pk} for {model} {object_id}."
+                )
+            return
+
+        delete = delete_poll if model == "poll" else delete_user
+        for object_id in options["ids"]:
+            started = time.perf_counter()
+            try:
+                deleted = delete(
+                    object_id, options["batch_size"], report=self.report
+                )
+            except (Poll.DoesNotExist, User.DoesNotExist) as exc:
+                raise CommandError(str(exc))
+            summary = ", ".join(
+                f"{count} {name}" for name, count in sorted(deleted.items())
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Deleted {model} {object_id} in "
+                    f"{time.perf_counter() - started:.1f}s: {summary}."
+                )
+            )
+
+    def report(self, done, total, message):
+        self.stdout.write(f"{message} ({done}/{total} votes).")
@@ -0,0 +1,121 @@
+import shutil
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router
+from django.db.models import Max
+from django.utils import timezone
+
+from polls.columnar import TABLES, ColumnarExport
+from polls.routers import replica_reads
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports polls, options and votes as typed column files readable "
+        "with numpy.memmap. Rows are streamed in primary-key chunks and "
+        "later runs append only rows above the previous run's watermark; "
+        "use --full to rebuild and pick up edits to exported rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Export directory.")
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="databases",
+            help="Poll database alias to export (repeatable). Defaults to "
+            "every poll shard.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50000,
+            help="Rows fetched per query.",
+        )
+        parser.add_argument(
+            "--settle-seconds",
+            type=int,
+            default=300,
+            help="Leave rows newer than this for the next run, so rows of "
+            "transactions still in flight are not skipped by the watermark.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Discard the existing export and start from scratch.",
+        )
+
+    def handle(self, *args, **options):
+        databases = options["databases"] or settings.POLL_SHARDS
+        unknown = set(databases) - set(settings.POLL_SHARDS)
+        if unknown:
+            raise CommandError(f"Unknown poll database(s): {sorted(unknown)}")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        if options["full"]:
+            shutil.rmtree(options["output"], ignore_errors=True)
+
+        export = ColumnarExport(options["output"])
+        cutoff = timezone.now() - timedelta(seconds=options["settle_seconds"])
+        for table in TABLES:
+            export.prepare(table)
+            for alias in databases:
+                self.export_table(
+                    export, table, alias, cutoff, options["chunk_size"]
+                )
+        export.finish()
+
+        tables = export.manifest["tables"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Export complete: "
+                + ", ".join(
+                    f"{state['rows']} {name}" for name, state in tables.items()
+                )
+                + "."
+            )
+        )
+
+    def source(self, alias, model):
+        """
+        Reads the primary's rows from a healthy replica when there is one.
+        """
+        if alias != "default":
+            return alias
+        with replica_reads():
+            return router.db_for_read(model) or alias
+
+    def export_table(self, export, table, alias, cutoff, chunk_size):
+        state = export.table_state(table)
+        watermark = state["watermarks"].get(alias, 0)
+        rows = table.model.objects.using(self.source(alias, table.model))
+        high = rows.filter(
+            pk__gt=watermark, **{f"{table.settled_field}__lte": cutoff}
+        ).aggregate(high=Max("pk"))["high"]
+        if high is None:
+            self.stdout.write(f"{table.name} on '{alias}': up to date.")
+            return
+
+        fields = [field for _, field, _, _ in table.columns]
+        started = time.perf_counter()
+        exported = 0
+        while watermark < high:
+            chunk = list(
+                rows.filter(pk__gt=watermark, pk__lte=high)
+                .order_by("pk")
+                .values_list(*fields)[:chunk_size]
+            )
+            if not chunk:
+                break
+            # The primary key is the first column of every table.
+            watermark = chunk[-1][0]
+            export.append(table, chunk, alias, watermark)
+            exported += len(chunk)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{table.name} on '{alias}': {exported} rows in {elapsed:.1f}s "
+            f"({exported / max(elapsed, 1e-9):,.0f} rows/s)"
+        )
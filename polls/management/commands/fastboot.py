@@ -0,0 +1,66 @@
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+STATIC_IGNORE_PATTERNS = ["CVS", ".*", "*~"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepares a container for serving: applies pending migrations and "
+        "collects static files, skipping each step when nothing changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--skip-migrations",
+            action="store_true",
+            help="Only collect static files (e.g. at image build time).",
+        )
+
+    def handle(self, *args, **options):
+        if not options["skip_migrations"]:
+            for alias in settings.POLL_SHARDS:
+                if self.has_pending_migrations(alias):
+                    self.stdout.write(f"Applying migrations on '{alias}'...")
+                    call_command("migrate", database=alias, interactive=False)
+                else:
+                    self.stdout.write(f"No pending migrations on '{alias}'.")
+
+        stamp = Path(settings.STATIC_ROOT) / ".fingerprint"
+        fingerprint = self.static_fingerprint()
+        if stamp.exists() and stamp.read_text() == fingerprint:
+            self.stdout.write("Static files are up to date.")
+            return
+        self.stdout.write("Collecting static files...")
+        call_command("collectstatic", interactive=False, verbosity=0)
+        stamp.write_text(fingerprint)
+
+    def has_pending_migrations(self, alias):
+        """
+        Returns True if the database is behind the migration files on disk.
+        """
+        executor = MigrationExecutor(connections[alias])
+        targets = executor.loader.graph.leaf_nodes()
+        return bool(executor.migration_plan(targets))
+
+    def static_fingerprint(self):
+        """
+        Hashes the path, size and mtime of every collectable static file.
+        """
+        entries = []
+        for finder in finders.get_finders():
+            for path, storage in finder.list(STATIC_IGNORE_PATTERNS):
+                stat = os.stat(storage.path(path))
+                entries.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        digest = hashlib.sha256()
+        for entry in sorted(entries):
+            digest.update(entry.encode())
+        return digest.hexdigest()
@@ -0,0 +1,174 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from polls.changes import stamp_polls
+from polls.models import Option, Poll, PollTrend, Vote
+from polls.search import index_poll
+from polls.sharding import set_poll_shard, shard_for_poll
+from polls.trending import add_weight
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves a poll with its options and votes to another shard while it "
+        "keeps taking votes. Votes that conflict with rows on the target "
+        "are reported, and the poll's rows on the source are then kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("poll_id", type=int)
+        parser.add_argument("target", help="Database alias to move to.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Votes copied per batch.",
+        )
+        parser.add_argument(
+            "--drain-seconds",
+            type=float,
+            default=5.0,
+            help="Time to let in-flight requests on the old shard finish "
+            "before its rows are removed.",
+        )
+
+    def handle(self, *args, **options):
+        poll_id = options["poll_id"]
+        target = options["target"]
+        batch_size = options["batch_size"]
+        if target not in settings.POLL_SHARDS:
+            raise CommandError(f"'{target}' is not one of POLL_SHARDS.")
+        source = shard_for_poll(poll_id)
+        if source == target:
+            raise CommandError(f"Poll {poll_id} is already on '{target}'.")
+        if not Poll.objects.using(source).filter(pk=poll_id).exists():
+            raise CommandError(f"Poll {poll_id} not found on '{source}'.")
+        self.conflicts = []
+
+        # Bulk copy while the poll stays writable on the source.
+        last_vote_id = self.copy_votes(poll_id, source, target, 0, batch_size)
+
+        # Locking the poll row blocks new votes (their foreign key check
+        # needs a share lock on it) for the short final catch-up.
+        with transaction.atomic(using=source):
+            Poll.objects.using(source).select_for_update().get(pk=poll_id)
+            last_vote_id = self.copy_votes(
+                poll_id, source, target, last_vote_id, batch_size
+            )
+            set_poll_shard(poll_id, target)
+        self.stdout.write(f"Poll {poll_id} now served from '{target}'.")
+
+        # Requests that resolved the old shard just before the switch may
+        # still write there; pick those up before deleting.
+        time.sleep(options["drain_seconds"])
+        self.copy_votes(poll_id, source, target, last_vote_id, batch_size)
+        self.copy_trend(poll_id, source, target)
+        if self.conflicts:
+            # e.g. a voter whose vote reached the old shard just before the
+            # switch and who voted again on the new one.
+            ids = ", ".join(map(str, self.conflicts[:20]))
+            raise CommandError(
+                f"{len(self.conflicts)} votes of poll {poll_id} on "
+                f"'{source}' conflict with votes on '{target}' and were not "
+                f"copied (ids {ids}). The poll is served from '{target}'; "
+                f"its rows on '{source}' were kept for review."
+            )
+        self.delete_source(poll_id, source, batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Moved poll {poll_id} from '{source}' to '{target}'."
+            )
+        )
+
+    def copy_poll(self, poll_id, source, target):
+        """
+        Upserts the poll row and its options on the target shard.
+        """
+        poll = Poll.objects.using(source).get(pk=poll_id)
+        poll.save(using=target)
+        source_options = list(Option.objects.using(source).filter(poll=poll))
+        for option in source_options:
+            option.save(using=target)
+        Option.objects.using(target).filter(poll_id=poll_id).exclude(
+            pk__in=[option.pk for option in source_options]
+        ).delete()
+        index_poll(poll)
+        # The target's change feed has its own numbering.
+        stamp_polls([poll_id], using=target)
+
+    def copy_trend(self, poll_id, source, target):
+        """
+        Adds the poll's trending score on the source to the one votes have
+        built up on the target since the switch.
+        """
+        score = (
+            PollTrend.objects.using(source)
+            .filter(poll_id=poll_id)
+            .values_list("score", flat=True)
+            .first()
+        )
+        if score is not None:
+            add_weight(poll_id, score, target)
+
+    def copy_votes(self, poll_id, source, target, after_id, batch_size):
+        """
+        Copies votes with ids above ``after_id`` and returns the last id.
+
+        Votes already on the target (from an interrupted run) are skipped;
+        votes that conflict with other rows there are recorded in
+        ``self.conflicts`` instead of being dropped.
+        """
+        self.copy_poll(poll_id, source, target)
+        while True:
+            votes = list(
+                Vote.objects.using(source)
+                .filter(poll_id=poll_id, pk__gt=after_id)
+                .order_by("pk")[:batch_size]
+            )
+            if not votes:
+                return after_id
+            present = set(
+                Vote.objects.using(target)
+                .filter(pk__in=[vote.pk for vote in votes])
+                .values_list("pk", flat=True)
+            )
+            self.insert_votes(
+                [vote for vote in votes if vote.pk not in present], target
+            )
+            after_id = votes[-1].pk
+            self.stdout.write(f"Copied votes up to id {after_id}.")
+
+    def insert_votes(self, votes, target):
+        """
+        Inserts votes on the target, one by one when the batch conflicts,
+        to find the conflicting ones.
+        """
+        try:
+            with transaction.atomic(using=target):
+                Vote.objects.using(target).bulk_create(votes)
+            return
+        except IntegrityError:
+            pass
+        for vote in votes:
+            try:
+                with transaction.atomic(using=target):
+                    Vote.objects.using(target).bulk_create([vote])
+            except IntegrityError:
+                self.conflicts.append(vote.pk)
+
+    def delete_source(self, poll_id, source, batch_size):
+        """
+        Removes the poll from the source shard in bounded batches; its
+        ``PollTrend`` row goes with the poll.
+        """
+        votes = Vote.objects.using(source).filter(poll_id=poll_id)
+        while True:
+            ids = list(votes.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            Vote.objects.using(source).filter(pk__in=ids).delete()
+        Option.objects.using(source).filter(poll_id=poll_id).delete()
+        Poll.objects.using(source).filter(pk=poll_id).delete()
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from polls.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Deletes expired idempotency keys in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Keys deleted per batch.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = IdempotencyKey.objects.filter(expires_at__lte=now)
+        deleted = 0
+        while True:
+            ids = list(
+                expired.values_list("pk", flat=True)[: options["batch_size"]]
+            )
+            if not ids:
+                break
+            IdempotencyKey.objects.filter(pk__in=ids).delete()
+            deleted += len(ids)
+        self.stdout.write(f"Deleted {deleted} expired idempotency keys.")
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from polls.models import Poll
+from polls.projections import store_rendered_polls
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-renders the stored public JSON of every poll, e.g. after "
+        "upgrading, a bulk import or a change to the poll representation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Polls rendered per batch.",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only render polls that have never been rendered.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for alias in settings.POLL_SHARDS:
+            polls = Poll.objects.using(alias)
+            if options["missing"]:
+                polls = polls.filter(rendered_json__isnull=True)
+            rendered = 0
+            after_id = 0
+            while True:
+                ids = list(
+                    polls.filter(pk__gt=after_id)
+                    .order_by("pk")
+                    .values_list("pk", flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                rendered += store_rendered_polls(
+                    Poll.objects.using(alias).filter(pk__in=ids).order_by("pk")
+                )
+                after_id = ids[-1]
+            self.stdout.write(f"Rendered {rendered} polls on '{alias}'.")
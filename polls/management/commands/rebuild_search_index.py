@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from polls.models import Poll
+from polls.search import index_poll
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the poll search index (search vectors on PostgreSQL, "
+        "search tokens elsewhere), e.g. after upgrading or a bulk import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Polls read per batch.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for alias in settings.POLL_SHARDS:
+            indexed = 0
+            after_id = 0
+            while True:
+                polls = list(
+                    Poll.objects.using(alias)
+                    .filter(pk__gt=after_id)
+                    .only("id", "title", "description")
+                    .order_by("pk")[:batch_size]
+                )
+                if not polls:
+                    break
+                for poll in polls:
+                    index_poll(poll)
+                indexed += len(polls)
+                after_id = polls[-1].pk
+            self.stdout.write(f"Indexed {indexed} polls on '{alias}'.")
@@ -0,0 +1,181 @@
+import json
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from polls.reconcile import poll_id_chunks, reconcile_chunk
+
+
+def run_chunk(args):
+    return reconcile_chunk(*args)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts poll results from votes in parallel poll-id chunks and "
+        "reports (or fixes) cached results and tally store counts that "
+        "drifted. Cached results are only comparable with a shared cache "
+        "backend, the tally store only on its web host."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="databases",
+            help="Database alias to check (repeatable). Defaults to every "
+            "poll shard.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Polls per chunk.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes (1 checks chunks in this process).",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Replace drifted cached results with the recount and "
+            "reload drifted polls into the tally store.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording how far each database was checked; an "
+            "interrupted run resumes from it.",
+        )
+
+    def handle(self, *args, **options):
+        databases = options["databases"] or settings.POLL_SHARDS
+        unknown = set(databases) - set(settings.POLL_SHARDS)
+        if unknown:
+            raise CommandError(f"Unknown poll database(s): {sorted(unknown)}")
+        chunk_size = options["chunk_size"]
+        self.fix = options["fix"]
+
+        state = self.load_checkpoint(options["checkpoint"], chunk_size)
+        cursor = state["cursor"]
+        chunks = []
+        done = 0
+        for alias in databases:
+            for low, high in poll_id_chunks(alias, chunk_size):
+                if high <= cursor.get(alias, 0):
+                    done += 1
+                else:
+                    chunks.append((alias, low, high, options["fix"]))
+        if done:
+            self.stdout.write(
+                f"Resuming: {done} chunks done, {len(chunks)} left. Drift in "
+                "those chunks was reported by the earlier run."
+            )
+
+        started = time.perf_counter()
+        processes = min(options["processes"], len(chunks)) or 1
+        if processes == 1:
+            reports = map(run_chunk, chunks)
+            totals = self.collect(
+                reports, state, options["checkpoint"], started
+            )
+        else:
+            # Workers must open their own database connections.
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            with context.Pool(processes) as pool:
+                # In order, so the checkpoint can keep a single cursor per
+                # database.
+                reports = pool.imap(run_chunk, chunks)
+                totals = self.collect(
+                    reports, state, options["checkpoint"], started
+                )
+
+        if options["checkpoint"] and os.path.exists(options["checkpoint"]):
+            # The run is complete; the next one starts from scratch.
+            os.remove(options["checkpoint"])
+
+        message = (
+            f"Checked {totals['polls']} polls and {totals['votes']} votes: "
+            f"{len(totals['drifted'])} drifted, "
+            f"{len(totals['stale_tallies'])} drifted in the tally store, "
+            f"{len(totals['misplaced'])} misplaced vote groups."
+        )
+        drifted = totals["drifted"] or totals["stale_tallies"]
+        if drifted and not options["fix"]:
+            raise CommandError(message + " Re-run with --fix to repair.")
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def collect(self, reports, state, checkpoint, started):
+        """
+        Folds chunk reports into this run's totals as they arrive, moving
+        the checkpoint's cursor past each chunk. Returns the totals.
+        """
+        totals = {
+            "polls": 0,
+            "votes": 0,
+            "drifted": [],
+            "stale_tallies": [],
+            "misplaced": [],
+        }
+        counted = 0
+        for report in reports:
+            alias = report["alias"]
+            totals["polls"] += report["polls"]
+            totals["votes"] += report["votes"]
+            counted += report["votes"]
+            for poll_id in report["drifted"]:
+                totals["drifted"].append([alias, poll_id])
+                self.stdout.write(
+                    f"Drift: poll {poll_id} on '{alias}'"
+                    + (" (fixed)" if self.fix else "")
+                )
+            for poll_id in report["stale_tallies"]:
+                totals["stale_tallies"].append([alias, poll_id])
+                self.stdout.write(
+                    f"Tally store drift: poll {poll_id} on '{alias}'"
+                    + (" (fixed)" if self.fix else "")
+                )
+            for poll_id, option_id, votes in report["misplaced"]:
+                totals["misplaced"].append([alias, poll_id, option_id, votes])
+                self.stdout.write(
+                    f"Misplaced: {votes} votes of poll {poll_id} on '{alias}' "
+                    f"reference option {option_id} of another poll"
+                )
+            state["cursor"][alias] = report["high"]
+            self.save_checkpoint(checkpoint, state)
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"Chunk {report['low']}-{report['high'] - 1} on '{alias}': "
+                f"{report['votes']} votes "
+                f"({counted / max(elapsed, 1e-9):,.0f} votes/s overall)"
+            )
+        return totals
+
+    def load_checkpoint(self, path, chunk_size):
+        state = {"chunk_size": chunk_size, "cursor": {}}
+        if not path or not os.path.exists(path):
+            return state
+        with open(path) as checkpoint:
+            saved = json.load(checkpoint)
+        if saved.get("chunk_size") != chunk_size:
+            raise CommandError(
+                f"Checkpoint {path} was written with --chunk-size "
+                f"{saved.get('chunk_size')}; use it or remove the file."
+            )
+        return saved
+
+    def save_checkpoint(self, path, state):
+        if not path:
+            return
+        partial = f"{path}.tmp"
+        with open(partial, "w") as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(partial, path)
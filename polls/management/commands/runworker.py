@@ -0,0 +1,107 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+import polls.tasks  # noqa: F401 - registers the job handlers
+from polls.jobs import claim_job, run_job
+
+logger = logging.getLogger(__name__)
+
+
+def work(stop, poll_interval, burst):
+    """
+    Claims and runs jobs until ``stop`` is set (or, in burst mode, until no
+    job is runnable).
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    while not stop.is_set():
+        try:
+            job = claim_job(worker_id)
+        except DatabaseError:
+            # E.g. a dropped connection or lock contention; retry shortly.
+            logger.exception("Worker %s could not claim a job", worker_id)
+            connections.close_all()
+            stop.wait(poll_interval)
+            continue
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        run_job(job)
+
+
+def child(stop, poll_interval, burst):
+    # The parent handles Ctrl-C; a child finishes its current job first.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    work(stop, poll_interval, burst)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued background jobs with a pool of worker processes until "
+        "interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.JOB_WORKER_PROCESSES,
+            help="Worker processes to run (1 runs jobs in this process).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is runnable instead of waiting for more.",
+        )
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        context = multiprocessing.get_context("fork")
+        stop = context.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping after the current jobs finish...")
+            stop.set()
+
+        previous = {
+            signum: signal.signal(signum, shutdown)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            if processes <= 1:
+                work(stop, options["poll_interval"], options["burst"])
+                return
+            # Children must not share the parent's database connections.
+            connections.close_all()
+            workers = [
+                context.Process(
+                    target=child,
+                    args=(stop, options["poll_interval"], options["burst"]),
+                    daemon=True,
+                )
+                for _ in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            self.stdout.write(f"Started {processes} job worker processes.")
+            for worker in workers:
+                worker.join()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
@@ -0,0 +1,309 @@
+import itertools
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections
+from django.utils import timezone
+
+from polls.changes import stamp_new_polls
+from polls.models import Option, Poll, User, Vote
+from polls.sharding import sharding_enabled
+
+# Columns written per model; every other column is nullable.
+COLUMNS = {
+    User: [
+        "id",
+        "password",
+        "is_superuser",
+        "username",
+        "first_name",
+        "last_name",
+        "email",
+        "is_staff",
+        "is_active",
+        "date_joined",
+        "created_at",
+        "segment",
+    ],
+    Poll: [
+        "id",
+        "user_id",
+        "title",
+        "description",
+        "created_at",
+        "poll_type",
+        "settings",
+        "is_deleted",
+        "change_seq",
+    ],
+    Option: ["id", "poll_id", "option_text", "option_order"],
+    Vote: ["id", "user_id", "poll_id", "option_id", "created_at"],
+}
+SEGMENTS = ["", "free", "pro", "team", "enterprise"]
+
+
+def skewed_weights(count, skew, rng):
+    """
+    Returns one weight per item: equal for ``uniform``, ``1 / rank`` over a
+    shuffled ranking for ``zipf``.
+    """
+    if skew == "uniform":
+        return [1.0] * count
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    return [1.0 / rank for rank in ranks]
+
+
+def allocate(total, weights, cap):
+    """
+    Splits ``total`` into per-item counts proportional to ``weights``, with
+    no count above ``cap``.
+    """
+    scale = total / sum(weights)
+    counts = [min(cap, int(weight * scale)) for weight in weights]
+    left = total - sum(counts)
+    by_weight = sorted(range(len(weights)), key=weights.__getitem__)[::-1]
+    while left:
+        for index in by_weight:
+            extra = min(
+                left, cap - counts[index], max(1, left // len(weights))
+            )
+            counts[index] += extra
+            left -= extra
+            if not left:
+                break
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic users, polls, options and votes for "
+        "benchmarking, streamed with COPY on PostgreSQL (bulk_create "
+        "elsewhere). The same --seed produces the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, required=True)
+        parser.add_argument("--polls", type=int, required=True)
+        parser.add_argument("--votes", type=int, required=True)
+        parser.add_argument(
+            "--options", type=int, default=4, help="Options per poll."
+        )
+        parser.add_argument(
+            "--skew",
+            choices=["uniform", "zipf"],
+            default="zipf",
+            help="How votes spread over polls and options.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Rows per bulk_create batch when COPY is not available.",
+        )
+
+    def handle(self, *args, **options):
+        users, polls = options["users"], options["polls"]
+        votes, per_poll = options["votes"], options["options"]
+        if min(users, polls, per_poll) < 1 or votes < 0:
+            raise CommandError("Users, polls and options must be positive.")
+        if votes > users * polls:
+            raise CommandError(
+                f"{votes} votes do not fit: each of the {users} users can "
+                f"vote once in each of the {polls} polls."
+            )
+        if sharding_enabled():
+            raise CommandError(
+                "Seeding is only supported without sharding (DB_SHARD_HOSTS)."
+            )
+        self.connection = connections[options["database"]]
+        self.batch_size = options["batch_size"]
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now()
+
+        base = {
+            model: (
+                model.objects.using(self.connection.alias)
+                .order_by("-id")
+                .values_list("id", flat=True)
+                .first()
+                or 0
+            )
+            + 1
+            for model in COLUMNS
+        }
+        user_ids = range(base[User], base[User] + users)
+        poll_ids = range(base[Poll], base[Poll] + polls)
+
+        self.load(User, self.user_rows(user_ids))
+        self.load(Poll, self.poll_rows(poll_ids, user_ids))
+        self.load(Option, self.option_rows(poll_ids, base[Option], per_poll))
+        self.load(
+            Vote,
+            self.vote_rows(
+                poll_ids,
+                user_ids,
+                base[Option],
+                base[Vote],
+                per_poll,
+                votes,
+                options["skew"],
+            ),
+        )
+
+        with self.connection.cursor() as cursor:
+            for sql in self.connection.ops.sequence_reset_sql(
+                no_style(), list(COLUMNS)
+            ):
+                cursor.execute(sql)
+        stamp_new_polls(self.connection.alias)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {users} users, {polls} polls and {votes} votes. Run "
+                "rebuild_search_index to make the new polls searchable and "
+                "rebuild_poll_json --missing to pre-render them."
+            )
+        )
+
+    def user_rows(self, user_ids):
+        joined = self.now - timedelta(days=365)
+        for user_id in user_ids:
+            created_at = joined + timedelta(
+                seconds=self.rng.randrange(365 * 86400)
+            )
+            yield (
+                user_id,
+                "!",  # unusable password
+                False,
+                f"seed-user-{user_id}",
+                "",
+                "",
+                f"seed-user-{user_id}@example.com",
+                False,
+                True,
+                created_at,
+                created_at,
+                self.rng.choice(SEGMENTS),
+            )
+
+    def poll_rows(self, poll_ids, user_ids):
+        for poll_id in poll_ids:
+            yield (
+                poll_id,
+                self.rng.choice(user_ids),
+                f"Seed poll {poll_id}",
+                f"Synthetic poll {poll_id} for benchmarking.",
+                self.now - timedelta(seconds=self.rng.randrange(30 * 86400)),
+                "single_choice",
+                {},
+                False,
+                # Stamped into the change feed once the seed is loaded.
+                0,
+            )
+
+    def option_rows(self, poll_ids, first_option_id, per_poll):
+        option_id = first_option_id
+        for poll_id in poll_ids:
+            for order in range(per_poll):
+                yield (option_id, poll_id, f"Option {order + 1}", order)
+                option_id += 1
+
+    def vote_rows(
+        self,
+        poll_ids,
+        user_ids,
+        first_option_id,
+        first_vote_id,
+        per_poll,
+        votes,
+        skew,
+    ):
+        counts = allocate(
+            votes, skewed_weights(len(poll_ids), skew, self.rng), len(user_ids)
+        )
+        option_weights = list(
+            itertools.accumulate(skewed_weights(per_poll, skew, self.rng))
+        )
+        # Building a datetime per vote dominates the generation cost, so
+        # votes draw their timestamp from a pool spread over the last week.
+        stamps = [
+            self.now - timedelta(seconds=self.rng.randrange(7 * 86400))
+            for _ in range(4096)
+        ]
+        vote_id = first_vote_id
+        for index, (poll_id, count) in enumerate(zip(poll_ids, counts)):
+            first_option = first_option_id + index * per_poll
+            voters = self.rng.sample(user_ids, count)
+            choices = self.rng.choices(
+                range(first_option, first_option + per_poll),
+                cum_weights=option_weights,
+                k=count,
+            )
+            created = self.rng.choices(stamps, k=count)
+            for offset, row in enumerate(zip(voters, choices, created)):
+                user_id, option_id, created_at = row
+                yield (
+                    vote_id + offset,
+                    user_id,
+                    poll_id,
+                    option_id,
+                    created_at,
+                )
+            vote_id += count
+
+    def load(self, model, rows):
+        """
+        Streams rows into a model's table and reports the rate.
+        """
+        started = time.perf_counter()
+        if self.connection.vendor == "postgresql":
+            count = self.copy(model, rows)
+        else:
+            count = self.bulk_create(model, rows)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{model._meta.verbose_name_plural}: {count} rows in "
+            f"{elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)"
+        )
+
+    def copy(self, model, rows):
+        columns = ", ".join(
+            self.connection.ops.quote_name(column) for column in COLUMNS[model]
+        )
+        table = self.connection.ops.quote_name(model._meta.db_table)
+        count = 0
+        with self.connection.cursor() as cursor:
+            with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(
+                        [
+                            (
+                                json.dumps(value)
+                                if isinstance(value, dict)
+                                else value
+                            )
+                            for value in row
+                        ]
+                    )
+                    count += 1
+        return count
+
+    def bulk_create(self, model, rows):
+        # Note: auto_now_add columns get the load time on this path.
+        manager = model.objects.using(self.connection.alias)
+        count = 0
+        while True:
+            batch = [
+                model(**dict(zip(COLUMNS[model], row)))
+                for row in itertools.islice(rows, self.batch_size)
+            ]
+            if not batch:
+                return count
+            manager.bulk_create(batch)
+            count += len(batch)
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from polls import tallies
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintains this host's shared tally store (TALLY_STORE_PATH). "
+        "'warm' reloads every live poll's counts from the database, "
+        "'compact' frees the slots of deleted polls and 'stats' prints the "
+        "store's occupancy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["warm", "compact", "stats"])
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="databases",
+            help="Poll database alias to read (repeatable). Defaults to "
+            "every poll shard.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Polls per query.",
+        )
+
+    def handle(self, *args, **options):
+        if not tallies.store_enabled():
+            raise CommandError("Set TALLY_STORE_PATH to use the tally store.")
+        unknown = set(options["databases"] or []) - set(settings.POLL_SHARDS)
+        if unknown:
+            raise CommandError(f"Unknown poll database(s): {sorted(unknown)}")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        if options["action"] == "warm":
+            loaded = tallies.warm(options["databases"], options["chunk_size"])
+            self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} polls."))
+        elif options["action"] == "compact":
+            freed = tallies.compact(
+                options["databases"], options["chunk_size"]
+            )
+            self.stdout.write(self.style.SUCCESS(f"Freed {freed} slots."))
+        stats = tallies.get_store().stats()
+        self.stdout.write(
+            f"{stats['polls']} polls in {stats['used']} of {stats['slots']} "
+            f"slots ({stats['tombstones']} tombstones)."
+        )
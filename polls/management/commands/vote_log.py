@@ -0,0 +1,190 @@
+import json
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from polls.models import Option, Poll, User, Vote
+from polls.sharding import shard_for_poll
+from polls.votelog import read_log, rebuild_tallies, record_datetimes
+
+COLUMNS = ["id", "user_id", "poll_id", "option_id", "created_at"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Reads the append-only vote log (VOTE_LOG_DIR). 'verify' counts "
+        "valid, corrupt and torn records per segment, 'tallies' prints the "
+        "per-option vote counts rebuilt from the log as JSON, and 'replay' "
+        "inserts the logged votes that are missing from the database. The "
+        "log does not record deletions, so only replay into a database "
+        "restored without its vote table: votes deleted since they were "
+        "logged come back unless their poll, option or user is gone too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["verify", "tallies", "replay"])
+        parser.add_argument(
+            "--directory",
+            help="Log directory. Defaults to VOTE_LOG_DIR.",
+        )
+        parser.add_argument(
+            "--poll",
+            type=int,
+            action="append",
+            dest="polls",
+            help="Only tally this poll (repeatable).",
+        )
+        parser.add_argument(
+            "--database",
+            help="Replay every vote into this database instead of the "
+            "poll's shard.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Votes inserted per transaction when replaying.",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"] or settings.VOTE_LOG_DIR
+        if not directory:
+            raise CommandError("Set VOTE_LOG_DIR or pass --directory.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        if options["database"] and options["database"] not in connections:
+            raise CommandError(f"Unknown database '{options['database']}'.")
+
+        if options["action"] == "verify":
+            self.verify(directory)
+        elif options["action"] == "tallies":
+            tallies = rebuild_tallies(directory, options["polls"])
+            self.stdout.write(json.dumps(tallies, sort_keys=True))
+        else:
+            self.replay(directory, options["database"], options["batch_size"])
+
+    def verify(self, directory):
+        totals = [0, 0, 0]
+        for path, records, invalid, torn in read_log(directory):
+            self.stdout.write(
+                f"{path}: {len(records)} records, {invalid} corrupt, "
+                f"{torn} torn bytes"
+            )
+            totals[0] += len(records)
+            totals[1] += invalid
+            totals[2] += bool(torn)
+        message = (
+            f"{totals[0]} valid records, {totals[1]} corrupt, "
+            f"{totals[2]} torn segment tails."
+        )
+        if totals[1]:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def replay(self, directory, database, batch_size):
+        started = time.perf_counter()
+        replayed = skipped = orphaned = 0
+        aliases = set()
+        for _, records, _, _ in read_log(directory):
+            for start in range(0, len(records), batch_size):
+                batch = records[start : start + batch_size]
+                if database:
+                    groups = {database: batch}
+                else:
+                    polls = np.unique(batch["poll_id"]).tolist()
+                    shards = np.array(
+                        [shard_for_poll(poll_id) for poll_id in polls]
+                    )
+                    owners = shards[
+                        np.searchsorted(np.array(polls), batch["poll_id"])
+                    ]
+                    groups = {
+                        alias: batch[owners == alias]
+                        for alias in set(shards.tolist())
+                    }
+                for alias, rows in groups.items():
+                    inserted, present = self.insert(alias, rows)
+                    replayed += inserted
+                    skipped += present
+                    orphaned += len(rows) - inserted - present
+                    aliases.add(alias)
+
+        for alias in aliases:
+            connection = connections[alias]
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [Vote]
+                ):
+                    cursor.execute(sql)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Replayed {replayed} votes ({skipped} already present, "
+                f"{orphaned} of deleted polls, options or users) in "
+                f"{elapsed:.1f}s ({replayed / max(elapsed, 1e-9):,.0f} "
+                "votes/s). Run reconcile_tallies --fix to refresh cached "
+                "results."
+            )
+        )
+
+    def insert(self, alias, records):
+        """
+        Inserts the records whose vote id is not in the database yet and
+        whose poll, option and user still exist, in one transaction.
+        Returns how many were inserted and how many were already present.
+        """
+        with transaction.atomic(using=alias):
+            present = self.existing(alias, Vote, records["vote_id"])
+            records = records[~np.isin(records["vote_id"], present)]
+            keep = np.ones(len(records), dtype=bool)
+            for model, column in (
+                (Poll, "poll_id"),
+                (Option, "option_id"),
+                (User, "user_id"),
+            ):
+                keep &= np.isin(
+                    records[column],
+                    self.existing(alias, model, records[column]),
+                )
+            records = records[keep]
+            if not len(records):
+                return 0, len(present)
+            connection = connections[alias]
+            rows = zip(
+                records["vote_id"].tolist(),
+                records["user_id"].tolist(),
+                records["poll_id"].tolist(),
+                records["option_id"].tolist(),
+                record_datetimes(records),
+            )
+            table = connection.ops.quote_name(Vote._meta.db_table)
+            columns = ", ".join(map(connection.ops.quote_name, COLUMNS))
+            with connection.cursor() as cursor:
+                if connection.vendor == "postgresql":
+                    with cursor.copy(
+                        f"COPY {table} ({columns}) FROM STDIN"
+                    ) as copy:
+                        for row in rows:
+                            copy.write_row(row)
+                else:
+                    adapt = connection.ops.adapt_datetimefield_value
+                    cursor.executemany(
+                        f"INSERT INTO {table} ({columns}) VALUES "
+                        f"({', '.join(['%s'] * len(COLUMNS))})",
+                        [(*row[:4], adapt(row[4])) for row in rows],
+                    )
+            return len(records), len(present)
+
+    def existing(self, alias, model, ids):
+        """
+        Returns which of the ids have a row of ``model`` in the database.
+        """
+        return list(
+            model._base_manager.using(alias)
+            .filter(pk__in=np.unique(ids).tolist())
+            .values_list("pk", flat=True)
+        )
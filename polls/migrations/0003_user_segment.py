@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0002_option_option_order_poll_deleted_at_poll_is_deleted_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='segment',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
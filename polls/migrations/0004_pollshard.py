@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-19 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0003_user_segment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('database', models.CharField(blank=True, max_length=100)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-19 06:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0004_pollshard'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='option',
+            options={'ordering': ['option_order', 'id']},
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-19 06:31
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS polls_poll_search_vector_gin '
+        'ON polls_poll USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS polls_poll_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_option_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poll',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='PollSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='polls.poll')),
+            ],
+            options={
+                'unique_together': {('token', 'poll')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-19 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0007_polltrend'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='polls_vote_user_recent_idx'),
+        ),
+    ]
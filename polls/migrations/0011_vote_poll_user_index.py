@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-19 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0010_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['poll', 'user'], include=('option',), name='polls_vote_poll_user_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0011_vote_poll_user_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poll',
+            name='rendered_json',
+            field=models.TextField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-19 07:37
+
+from django.db import migrations, models
+
+
+def create_change_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE SEQUENCE IF NOT EXISTS polls_poll_change_seq'
+    )
+
+
+def drop_change_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP SEQUENCE IF EXISTS polls_poll_change_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0012_poll_rendered_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollTombstone',
+            fields=[
+                ('poll_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('change_seq', models.BigIntegerField(db_index=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='poll',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(create_change_sequence, drop_change_sequence),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-19 21:12
+
+from django.db import migrations
+from django.db.models import F, Max, Min
+
+
+def stamp_existing_polls(apps, schema_editor):
+    Poll = apps.get_model('polls', 'Poll')
+    PollTombstone = apps.get_model('polls', 'PollTombstone')
+    connection = schema_editor.connection
+    unstamped = Poll.objects.using(connection.alias).filter(change_seq=0)
+    first = unstamped.aggregate(first=Min('id'))['first']
+    if first is None:
+        return
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval('polls_poll_change_seq')")
+            (change,) = cursor.fetchone()
+    else:
+        change = 1 + max(
+            model.objects.using(connection.alias).aggregate(
+                last=Max('change_seq')
+            )['last'] or 0
+            for model in (Poll, PollTombstone)
+        )
+    unstamped.update(change_seq=F('id') + (change - first))
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval('polls_poll_change_seq', "
+                "(SELECT MAX(change_seq) FROM polls_poll))"
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0013_poll_change_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(stamp_existing_polls, migrations.RunPython.noop),
+    ]
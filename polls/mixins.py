@@ -0,0 +1,73 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import (
+    current_shard,
+    is_pinned_to_primary,
+    pin_to_primary,
+    use_replica,
+)
+from .sharding import shard_for_poll, sharding_enabled
+
+
+class PollShardMixin:
+    """
+    View mixin that routes poll, option and vote queries to the poll's shard.
+
+    The poll is identified by ``get_shard_poll_id()``, which defaults to the
+    URL lookup kwarg. Views without a single poll (e.g. lists) keep the
+    default routing and must fan out across shards themselves.
+    """
+
+    def get_shard_poll_id(self):
+        lookup_url_kwarg = getattr(self, "lookup_url_kwarg", None) or getattr(
+            self, "lookup_field", "pk"
+        )
+        return self.kwargs.get(lookup_url_kwarg)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not sharding_enabled():
+            return
+        try:
+            poll_id = int(self.get_shard_poll_id())
+        except (TypeError, ValueError):
+            return
+        self._shard_token = current_shard.set(shard_for_poll(poll_id))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_shard_token", None)
+        if token is not None:
+            current_shard.reset(token)
+            self._shard_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReadReplicaMixin:
+    """
+    View mixin that serves read-only actions from a database replica.
+
+    Actions listed in ``replica_actions`` read from a replica unless the
+    user is pinned to the primary. Any successful write through the view
+    pins the user to the primary so they see their own changes.
+    """
+
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        action = getattr(self, "action", None) or "retrieve"
+        if (
+            request.method in SAFE_METHODS
+            and action in self.replica_actions
+            and not is_pinned_to_primary(request)
+        ):
+            self._replica_token = use_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            use_replica.reset(token)
+            self._replica_token = None
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request, response)
+        return super().finalize_response(request, response, *args, **kwargs)
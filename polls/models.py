@@ -1,11 +1,15 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 
 
 # User model
 class User(AbstractUser):
     email = models.EmailField(unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    segment = models.CharField(max_length=64, blank=True, default="")
 
     def __str__(self):
         return self.username
@@ -24,6 +28,15 @@ class Poll(models.Model):
     settings = models.JSONField(default=dict, blank=True)
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
+    # Maintained by polls.search on PostgreSQL, GIN-indexed.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Public JSON of the poll, rendered on every write (polls.projections).
+    rendered_json = models.TextField(null=True, editable=False)
+    # Position in the catalog change feed (polls.changes), restamped with
+    # every render; 0 until the poll is first rendered.
+    change_seq = models.BigIntegerField(
+        default=0, db_index=True, editable=False
+    )
 
     def __str__(self):
         return self.title
@@ -37,10 +50,33 @@ class Option(models.Model):
     option_text = models.CharField(max_length=255)
     option_order = models.IntegerField(default=0)
 
+    class Meta:
+        ordering = ["option_order", "id"]
+
     def __str__(self):
         return f"{self.poll.title} - {self.option_text}"
 
 
+# Search token model
+class PollSearchToken(models.Model):
+    """
+    Inverted index entry used for poll search on databases without
+    PostgreSQL full-text search (e.g. SQLite test runs).
+    """
+
+    poll = models.ForeignKey(
+        Poll, related_name="search_tokens", on_delete=models.CASCADE
+    )
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ("token", "poll")
+
+    def __str__(self):
+        return f"{self.token} -> {self.poll_id}"
+
+
 # Vote model
 class Vote(models.Model):
     user = models.ForeignKey(
@@ -56,6 +92,147 @@ class Vote(models.Model):
 
     class Meta:
         unique_together = ("user", "poll")
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="polls_vote_user_recent_idx",
+            ),
+            # Voters of a poll in user order, read index-only by crosstabs.
+            models.Index(
+                fields=["poll", "user"],
+                include=["option"],
+                name="polls_vote_poll_user_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} voted on '{self.poll.title}' for '{self.option.option_text}'"
+
+
+# Deleted poll model
+class PollTombstone(models.Model):
+    """
+    Marks a hard-deleted poll in the catalog change feed (see
+    polls.changes), so syncing clients learn to drop it.
+    """
+
+    poll_id = models.BigIntegerField(primary_key=True)
+    change_seq = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Poll {self.poll_id} deleted at {self.change_seq}"
+
+
+# Shard directory model
+class PollShard(models.Model):
+    """
+    Records which database holds a poll and allocates global poll ids.
+
+    Rows always live on the default database. Polls created before sharding
+    was enabled have no row and stay on the default database.
+    """
+
+    database = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        return f"Poll {self.pk} on {self.database}"
+
+
+# Trending score model
+class PollTrend(models.Model):
+    """
+    Exponentially decayed vote activity of a poll, kept in the log domain
+    relative to a fixed epoch (see polls.trending) so scores of different
+    polls stay comparable without ever being decayed in place.
+    """
+
+    poll = models.OneToOneField(
+        Poll,
+        primary_key=True,
+        related_name="trend",
+        on_delete=models.CASCADE,
+    )
+    score = models.FloatField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.poll_id}: {self.score}"
+
+
+# Idempotency key model
+class IdempotencyKey(models.Model):
+    """
+    First response of a request sent with an ``Idempotency-Key`` header,
+    replayed to retries of the same request until it expires.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="idempotency_keys"
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key}"
+
+
+# Background job model
+class Job(models.Model):
+    """
+    Unit of background work, claimed and run by ``manage.py runworker``.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.FloatField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="jobs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "run_after"],
+                name="polls_job_claim_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
@@ -0,0 +1,57 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row of a page, encoded as URL-safe
+base64 JSON. The next page is read with a range condition on that key, so
+every page costs one indexed query no matter how deep the client pages.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+
+def encode_cursor(values):
+    """
+    Encodes a list of sort key values as an opaque cursor string.
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """
+    Decodes a cursor string into a list of ``size`` sort key values.
+
+    Returns None for an empty cursor and raises ``ValidationError`` for a
+    malformed one.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValidationError({"cursor": "Invalid cursor."})
+    if not isinstance(values, list) or len(values) != size:
+        raise ValidationError({"cursor": "Invalid cursor."})
+    return values
+
+
+def get_page_size(request):
+    """
+    Returns the page size requested with ``?limit=``, capped at
+    ``KEYSET_MAX_PAGE_SIZE``.
+    """
+    limit = request.query_params.get("limit")
+    if limit is None:
+        return settings.KEYSET_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValidationError({"limit": "Must be an integer."})
+    if limit < 1:
+        raise ValidationError({"limit": "Must be at least 1."})
+    return min(limit, settings.KEYSET_MAX_PAGE_SIZE)
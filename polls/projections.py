@@ -0,0 +1,148 @@
+"""
+Serializer-free read path for polls.
+
+Builds the same representation as ``PollSerializer`` from two ``.values()``
+queries (polls, then their options) and plain dicts, skipping per-field
+serializer work on the hot list and detail endpoints.
+
+The full representation is also rendered to JSON whenever a poll is
+written and stored in ``Poll.rendered_json``, so full list and detail
+reads only copy those bytes into the response.
+"""
+
+from rest_framework import serializers
+
+from .changes import stamp_polls
+from .models import Option, Poll
+from .renderers import FastJSONRenderer
+
+REPRESENTATION_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "created_at",
+    "expires_at",
+    "options",
+    "poll_type",
+    "settings",
+)
+
+_datetime_field = serializers.DateTimeField()
+
+
+def _datetime(value):
+    if value is None:
+        return None
+    return _datetime_field.to_representation(value)
+
+
+def _identity(value):
+    return value
+
+
+CONVERTERS = {"created_at": _datetime, "expires_at": _datetime}
+
+
+def project_polls(queryset, fields=REPRESENTATION_FIELDS):
+    """
+    Returns the ``PollSerializer`` representation of every poll in the
+    queryset, in queryset order.
+
+    ``fields`` restricts the output to a subset of ``REPRESENTATION_FIELDS``
+    (kept in their canonical order). Only the matching columns are selected,
+    and options are only queried when ``"options"`` is requested.
+    """
+    fields = [field for field in REPRESENTATION_FIELDS if field in fields]
+    columns = [field for field in fields if field not in ("id", "options")]
+    rows = list(queryset.values("id", *columns))
+
+    options_by_poll = {row["id"]: [] for row in rows}
+    if "options" in fields and options_by_poll:
+        options = (
+            Option.objects.using(queryset.db)
+            .filter(poll_id__in=options_by_poll)
+            .order_by("poll_id", "option_order", "id")
+            .values_list("poll_id", "id", "option_text", "option_order")
+        )
+        for poll_id, option_id, option_text, option_order in options:
+            options_by_poll[poll_id].append(
+                {
+                    "id": option_id,
+                    "option_text": option_text,
+                    "option_order": option_order,
+                }
+            )
+
+    converters = [
+        (field, CONVERTERS.get(field, _identity)) for field in fields
+    ]
+    polls = []
+    for row in rows:
+        poll = {}
+        for field, convert in converters:
+            if field == "options":
+                poll[field] = options_by_poll[row["id"]]
+            else:
+                poll[field] = convert(row[field])
+        polls.append(poll)
+    return polls
+
+
+def render_polls(queryset):
+    """
+    Returns ``{poll_id: JSON text}`` of the full representation of every
+    poll in the queryset.
+    """
+    renderer = FastJSONRenderer()
+    return {
+        poll["id"]: renderer.render(poll).decode()
+        for poll in project_polls(queryset)
+    }
+
+
+def store_rendered_polls(queryset):
+    """
+    Renders the polls in the queryset, stores their JSON on their rows and
+    moves them to the head of the change feed.
+
+    Returns the number of polls rendered.
+    """
+    rendered = render_polls(queryset)
+    Poll.objects.using(queryset.db).bulk_update(
+        [
+            Poll(id=poll_id, rendered_json=text)
+            for poll_id, text in rendered.items()
+        ],
+        ["rendered_json"],
+    )
+    stamp_polls(rendered, using=queryset.db)
+    return len(rendered)
+
+
+def render_poll(poll):
+    """
+    Re-renders one poll after a write, on the database it was saved to.
+    """
+    store_rendered_polls(Poll.objects.using(poll._state.db).filter(pk=poll.pk))
+
+
+def rendered_polls(queryset):
+    """
+    Returns ``[{"id", "json"}]`` for the polls in the queryset, in queryset
+    order, rendering polls that have not been rendered yet on the fly.
+    """
+    rows = list(queryset.values_list("id", "rendered_json"))
+    missing = [poll_id for poll_id, text in rows if text is None]
+    fresh = render_polls(queryset.filter(pk__in=missing)) if missing else {}
+    return [
+        {"id": poll_id, "json": fresh[poll_id] if text is None else text}
+        for poll_id, text in rows
+    ]
+
+
+def with_my_vote(text, option_id):
+    """
+    Appends the requesting user's ``my_vote`` to a rendered poll.
+    """
+    vote = "null" if option_id is None else str(int(option_id))
+    return f'{text[:-1]},"my_vote":{vote}}}'
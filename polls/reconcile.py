@@ -0,0 +1,148 @@
+"""
+Tally reconciliation: recount poll results from ``Vote`` and compare them
+with the results cache and, when enabled, the shared tally store.
+
+Polls are processed in poll-id ranges ("chunks"). For each chunk the
+database aggregates votes per ``(poll, option)`` in one grouped query that
+is streamed back with a server-side cursor, so memory stays bounded by the
+chunk's option count however many votes it has. Results that differ from
+the cached copy under the poll's current version, and tally store counts
+that differ from the recount, are reported as drift; votes whose option
+belongs to another poll are reported as misplaced. The tally store is per
+host, so run the check on the web host to compare it.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min
+
+from . import tallies
+from .cache import poll_cache_keys
+from .models import Option, Poll, Vote
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def poll_id_chunks(alias, chunk_size):
+    """
+    Yields ``(low, high)`` poll id ranges (high exclusive) covering every
+    poll on a database.
+    """
+    bounds = Poll.objects.using(alias).aggregate(low=Min("id"), high=Max("id"))
+    if bounds["low"] is None:
+        return
+    for low in range(bounds["low"], bounds["high"] + 1, chunk_size):
+        yield low, low + chunk_size
+
+
+def count_votes(alias, low, high):
+    """
+    Recounts the results of the polls with ids in ``[low, high)``.
+
+    Returns ``(results, votes, misplaced)``: results in the format of
+    ``PollResultsView`` keyed by poll id, the number of votes counted and
+    the ``(poll_id, option_id, votes)`` groups whose option is not one of
+    the poll's options.
+    """
+    in_range = {"poll_id__gte": low, "poll_id__lt": high}
+    options = {
+        poll_id: {}
+        for poll_id in Poll.objects.using(alias)
+        .filter(id__gte=low, id__lt=high)
+        .values_list("id", flat=True)
+    }
+    rows = (
+        Option.objects.using(alias)
+        .filter(**in_range)
+        .order_by("poll_id", "option_order", "id")
+        .values_list("poll_id", "id", "option_text")
+    )
+    for poll_id, option_id, option_text in rows.iterator(STREAM_CHUNK_SIZE):
+        options.setdefault(poll_id, {})[option_id] = {
+            "option_id": option_id,
+            "option_text": option_text,
+            "vote_count": 0,
+        }
+
+    counts = (
+        Vote.objects.using(alias)
+        .filter(**in_range)
+        .values_list("poll_id", "option_id")
+        .annotate(votes=Count("id"))
+        .order_by()
+    )
+    votes = 0
+    misplaced = []
+    for poll_id, option_id, count in counts.iterator(STREAM_CHUNK_SIZE):
+        votes += count
+        entry = options.get(poll_id, {}).get(option_id)
+        if entry is None:
+            misplaced.append((poll_id, option_id, count))
+        else:
+            entry["vote_count"] = count
+
+    results = {
+        poll_id: {"poll_id": poll_id, "results": list(entries.values())}
+        for poll_id, entries in options.items()
+    }
+    return results, votes, misplaced
+
+
+def stale_tallies(results):
+    """
+    Returns the ids of the polls whose counts in the tally store differ
+    from the recounted ``results``. Polls the store has not loaded are
+    skipped.
+    """
+    store = tallies.get_store()
+    stale = []
+    for poll_id, result in results.items():
+        recount = {
+            entry["option_id"]: entry["vote_count"]
+            for entry in result["results"]
+        }
+        counts = store.poll_counts(poll_id, list(recount))
+        if counts is not None and counts != recount:
+            stale.append(poll_id)
+    return sorted(stale)
+
+
+def reconcile_chunk(alias, low, high, fix=False):
+    """
+    Recounts one chunk of polls and checks the cached results and the
+    tally store against it.
+
+    With ``fix`` the drifted cache entries are replaced by the recount and
+    drifted polls are dropped from the tally store, which loads them again
+    from the database on their next read. Returns a report dict.
+    """
+    results, votes, misplaced = count_votes(alias, low, high)
+    drifted = []
+    if results:
+        keys = poll_cache_keys("results", list(results))
+        cached = cache.get_many(keys.values())
+        drifted = sorted(
+            poll_id
+            for poll_id, key in keys.items()
+            if key in cached and cached[key] != results[poll_id]
+        )
+        if fix and drifted:
+            cache.set_many(
+                {keys[poll_id]: results[poll_id] for poll_id in drifted},
+                settings.RESULTS_CACHE_TIMEOUT,
+            )
+    stale = []
+    if results and tallies.store_enabled():
+        stale = stale_tallies(results)
+        if fix and stale:
+            tallies.forget_polls(stale)
+    return {
+        "alias": alias,
+        "low": low,
+        "high": high,
+        "polls": len(results),
+        "votes": votes,
+        "drifted": drifted,
+        "stale_tallies": stale,
+        "misplaced": misplaced,
+    }
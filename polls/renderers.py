@@ -0,0 +1,75 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that uses orjson when it is installed.
+
+    Output matches ``JSONRenderer`` (compact separators, UTF-8, escaped
+    U+2028/U+2029, DRF's encoding of datetimes and other non-JSON types).
+    Indented output, and anything orjson cannot encode natively or through
+    the DRF encoder (e.g. integers over 64 bits), falls back to the stdlib
+    renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class PrerenderedResponse(Response):
+    """
+    A response whose JSON body was rendered ahead of time.
+
+    Compact JSON requests get the bytes as they are. Other renderers (the
+    browsable API, indented JSON) and ``.data`` see the parsed value.
+    """
+
+    def __init__(self, content, **kwargs):
+        self.prerendered = content
+        super().__init__(None, **kwargs)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.prerendered)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, "accepted_renderer", None)
+        if isinstance(renderer, JSONRenderer) and (
+            renderer.get_indent(
+                self.accepted_media_type, self.renderer_context
+            )
+            is None
+        ):
+            self["Content-Type"] = renderer.media_type
+            return self.prerendered
+        return super().rendered_content
@@ -0,0 +1,66 @@
+"""
+Poll results: vote counts per option.
+
+Results are cached per poll under the poll's version (see ``polls.cache``),
+so a vote or an option change invalidates them. Any number of polls is read
+with one cache round trip plus, for the polls not in the cache, one grouped
+aggregation query. Concurrent misses share one aggregation and, within
+``RESULTS_STALE_SECONDS``, the previous results are served while one
+request recomputes them (see ``polls.singleflight``).
+"""
+
+from django.conf import settings
+from django.db.models import Count
+
+from .cache import poll_cache_keys, poll_latest_keys
+from .models import Option
+from .singleflight import SingleFlight
+
+flight = SingleFlight("results")
+
+
+def compute_results(poll_ids, using=None):
+    """
+    Aggregates the results of several polls in a single grouped query.
+
+    Returns ``{poll_id: results}`` in the format of ``PollResultsView``.
+    """
+    options = (
+        Option.objects.all() if using is None else Option.objects.using(using)
+    )
+    rows = (
+        options.filter(poll_id__in=poll_ids)
+        .values("poll_id", "id", "option_text", "option_order")
+        .annotate(vote_count=Count("votes"))
+        .order_by("poll_id", "option_order", "id")
+    )
+    results = {poll_id: [] for poll_id in poll_ids}
+    for row in rows:
+        results[row["poll_id"]].append(
+            {
+                "option_id": row["id"],
+                "option_text": row["option_text"],
+                "vote_count": row["vote_count"],
+            }
+        )
+    return {
+        poll_id: {"poll_id": poll_id, "results": option_results}
+        for poll_id, option_results in results.items()
+    }
+
+
+def get_results(poll_ids, using=None, allow_stale=False):
+    """
+    Returns ``{poll_id: results}``, from the cache where it is warm and
+    from one aggregation over the remaining polls otherwise.
+
+    With ``allow_stale``, results up to ``RESULTS_STALE_SECONDS`` old may
+    be returned for polls whose results are being recomputed.
+    """
+    return flight.get_many(
+        poll_cache_keys("results", poll_ids),
+        lambda missing: compute_results(missing, using=using),
+        settings.RESULTS_CACHE_TIMEOUT,
+        latest_keys=poll_latest_keys("results", poll_ids),
+        stale_seconds=settings.RESULTS_STALE_SECONDS if allow_stale else 0,
+    )
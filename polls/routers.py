@@ -0,0 +1,214 @@
+"""
+Database routers for PollPulse.
+
+Poll, option and vote queries issued inside a ``using_shard()`` block go to
+that shard. Reads are only sent to a replica inside a ``replica_reads()``
+block, which views enter for their read-only actions (see
+``polls.mixins``). Everything else, including all writes, stays on the
+primary.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+
+PIN_KEY = "pollpulse:primary-pin:{user_id}"
+PIN_COOKIE = "pollpulse_primary_pin"
+
+# Lag of a streaming replica in seconds; 0 when it has replayed all it
+# received, NULL (coalesced to 0) on a server that is not in recovery.
+POSTGRES_LAG_SQL = """
+    SELECT COALESCE(
+        CASE
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END,
+        0
+    )
+"""
+
+SHARDED_MODELS = {
+    "poll",
+    "option",
+    "vote",
+    "pollsearchtoken",
+    "polltrend",
+    "polltombstone",
+}
+
+current_shard = ContextVar("pollpulse_current_shard", default=None)
+use_replica = ContextVar("pollpulse_use_replica", default=False)
+_health = {}
+_health_lock = threading.Lock()
+
+
+@contextmanager
+def using_shard(alias):
+    """
+    Routes poll, option and vote queries inside the block to a shard.
+    """
+    token = current_shard.set(alias)
+    try:
+        yield
+    finally:
+        current_shard.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """
+    Allows reads issued inside the block to be served by a replica.
+    """
+    token = use_replica.set(True)
+    try:
+        yield
+    finally:
+        use_replica.reset(token)
+
+
+def pin_to_primary(request, response):
+    """
+    Keeps a user's reads on the primary for REPLICA_PIN_SECONDS.
+
+    The pin is stored in the shared cache and in a signed cookie on
+    ``response``, so it holds whichever worker serves the next request,
+    even if the cache entry is evicted.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return
+    cache.set(PIN_KEY.format(user_id=user.pk), 1, settings.REPLICA_PIN_SECONDS)
+    response.set_signed_cookie(
+        PIN_COOKIE,
+        str(user.pk),
+        salt=PIN_COOKIE,
+        max_age=settings.REPLICA_PIN_SECONDS,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def is_pinned_to_primary(request):
+    """
+    Returns True if the user wrote recently and must read from the primary.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    if cache.get(PIN_KEY.format(user_id=user.pk)):
+        return True
+    pinned_user = request.get_signed_cookie(
+        PIN_COOKIE,
+        default=None,
+        salt=PIN_COOKIE,
+        max_age=settings.REPLICA_PIN_SECONDS,
+    )
+    return pinned_user == str(user.pk)
+
+
+def replica_lag(alias):
+    """
+    Measures how many seconds a replica is behind the primary.
+    """
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_is_healthy(alias):
+    """
+    Returns whether a replica is reachable and within REPLICA_MAX_LAG_SECONDS.
+
+    The answer is cached per process for REPLICA_LAG_CHECK_INTERVAL seconds.
+    """
+    now = time.monotonic()
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (None, False))
+        if (
+            checked_at is not None
+            and now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL
+        ):
+            return healthy
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+    except (ConnectionDoesNotExist, DatabaseError):
+        healthy = False
+    with _health_lock:
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+class PollShardRouter:
+    """
+    Sends poll, option and vote queries to the shard that owns the poll.
+    """
+
+    def _db_for_model(self, model, hints):
+        if (
+            model._meta.app_label != "polls"
+            or model._meta.model_name not in SHARDED_MODELS
+        ):
+            return None
+        alias = current_shard.get()
+        if alias is not None:
+            return alias
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for_model(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for_model(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Users and tokens are replicated into every shard.
+        if {obj1._state.db, obj2._state.db} <= set(settings.POLL_SHARDS):
+            return True
+        return None
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends opted-in reads to a healthy replica, everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not use_replica.get():
+            return None
+        replicas = [
+            alias
+            for alias in settings.DATABASE_REPLICAS
+            if replica_is_healthy(alias)
+        ]
+        if not replicas:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        databases = {"default", *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,175 @@
+"""
+Full-text poll search.
+
+On PostgreSQL every poll carries a weighted ``tsvector`` in
+``Poll.search_vector`` (title A, option texts B, description C) behind a GIN
+index, and matches are ranked with ``ts_rank``. Other databases (SQLite in
+tests and local runs) use the ``PollSearchToken`` inverted index with the
+same weights: every query term must match and the rank is the summed weight
+of the matched terms.
+
+``index_poll`` keeps whichever index the poll's database uses up to date and
+is called whenever a poll or its options are written through the API.
+"""
+
+import heapq
+import operator
+import re
+from collections import defaultdict
+from functools import reduce
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections, router, transaction
+from django.db.models import Count, F, FloatField, Q, Sum, TextField, Value
+from django.db.models.functions import Cast
+
+from .models import Option, Poll, PollSearchToken
+from .projections import project_polls
+from .sharding import sharding_enabled
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# (text, tsvector weight label, inverted index weight), most important first.
+WEIGHTS = (("title", "A", 4), ("options", "B", 2), ("description", "C", 1))
+
+
+def tokenize(text):
+    """
+    Splits text into lower-cased word tokens for the inverted index.
+    """
+    return [token[:64] for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+def uses_full_text(alias):
+    return connections[alias].vendor == "postgresql"
+
+
+def index_poll(poll):
+    """
+    Rebuilds the search index entry of a poll from its current title,
+    description and option texts.
+    """
+    alias = poll._state.db or "default"
+    texts = {
+        "title": poll.title,
+        "description": poll.description or "",
+        "options": " ".join(
+            Option.objects.using(alias)
+            .filter(poll_id=poll.pk)
+            .values_list("option_text", flat=True)
+        ),
+    }
+
+    if uses_full_text(alias):
+        vector = reduce(
+            operator.add,
+            [
+                SearchVector(
+                    Value(texts[name], output_field=TextField()),
+                    weight=label,
+                    config=settings.SEARCH_CONFIG,
+                )
+                for name, label, _ in WEIGHTS
+            ],
+        )
+        Poll.objects.using(alias).filter(pk=poll.pk).update(
+            search_vector=vector
+        )
+        return
+
+    weights = defaultdict(int)
+    for name, _, weight in WEIGHTS:
+        for token in set(tokenize(texts[name])):
+            weights[token] += weight
+    with transaction.atomic(using=alias):
+        PollSearchToken.objects.using(alias).filter(poll_id=poll.pk).delete()
+        PollSearchToken.objects.using(alias).bulk_create(
+            PollSearchToken(poll_id=poll.pk, token=token, weight=weight)
+            for token, weight in weights.items()
+        )
+
+
+def search_shard(alias, query, after, limit):
+    """
+    Returns up to ``limit`` ``(rank, poll_id)`` matches on one database,
+    best first, strictly after the ``(rank, poll_id)`` keyset ``after``.
+    """
+    if uses_full_text(alias):
+        search_query = SearchQuery(
+            query, search_type="websearch", config=settings.SEARCH_CONFIG
+        )
+        # ts_rank returns a real; casting keeps the cursor value exact.
+        rows = (
+            Poll.objects.using(alias)
+            .filter(is_deleted=False, search_vector=search_query)
+            .annotate(
+                rank=Cast(
+                    SearchRank(F("search_vector"), search_query), FloatField()
+                )
+            )
+            .order_by("-rank", "-id")
+        )
+        key = "id"
+    else:
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        rows = (
+            PollSearchToken.objects.using(alias)
+            .filter(token__in=tokens, poll__is_deleted=False)
+            .values("poll_id")
+            .annotate(rank=Sum("weight"), matched=Count("id"))
+            .filter(matched=len(tokens))
+            .order_by("-rank", "-poll_id")
+        )
+        key = "poll_id"
+
+    if after is not None:
+        rank, poll_id = after
+        rows = rows.filter(
+            Q(rank__lt=rank) | Q(rank=rank, **{f"{key}__lt": poll_id})
+        )
+    return list(rows.values_list("rank", key)[:limit])
+
+
+def search_polls(query, after=None, limit=20):
+    """
+    Returns up to ``limit`` ``(rank, poll_id, alias)`` matches, best first.
+
+    With sharding enabled every shard is searched for a page and the pages
+    are merged, so the result is the same as a single-database search.
+    """
+    if sharding_enabled():
+        aliases = settings.POLL_SHARDS
+    else:
+        aliases = [router.db_for_read(Poll)]
+    streams = [
+        [
+            (rank, poll_id, alias)
+            for rank, poll_id in search_shard(alias, query, after, limit)
+        ]
+        for alias in aliases
+    ]
+    merged = heapq.merge(*streams, key=lambda hit: (-hit[0], -hit[1]))
+    return [hit for _, hit in zip(range(limit), merged)]
+
+
+def project_hits(hits):
+    """
+    Returns the poll representations of search hits, in hit order.
+    """
+    ids_by_alias = defaultdict(list)
+    for _, poll_id, alias in hits:
+        ids_by_alias[alias].append(poll_id)
+    polls = {}
+    for alias, ids in ids_by_alias.items():
+        for poll in project_polls(
+            Poll.objects.using(alias).filter(id__in=ids)
+        ):
+            polls[poll["id"]] = poll
+    return [polls[poll_id] for _, poll_id, _ in hits if poll_id in polls]
@@ -1,5 +1,9 @@
 from rest_framework import serializers
-from .models import Poll, Option, Vote, User
+from .models import Job, Poll, Option, Vote, User
+from .cache import bump_list_version, bump_poll_version
+from .projections import render_poll
+from .search import index_poll
+from .tallies import forget_polls, register_poll
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -96,6 +100,10 @@ class PollSerializer(serializers.ModelSerializer):
                 option_text=option_data["option_text"],
                 option_order=order,
             )
+        index_poll(poll)
+        render_poll(poll)
+        register_poll(poll.id)
+        bump_list_version()
         return poll
 
     def update(self, instance, validated_data):
@@ -133,6 +141,11 @@ class PollSerializer(serializers.ModelSerializer):
                 id__in=instance_option_ids - request_option_ids
             ):
                 option_to_delete.delete()
+            bump_poll_version(instance.id)
+            forget_polls([instance.id])
+        index_poll(instance)
+        render_poll(instance)
+        bump_list_version()
         return instance
 
 
@@ -169,3 +182,75 @@ class PollResultsSerializer(serializers.Serializer):
         to further format the output if needed.
         """
         return instance
+
+
+class PollResultsBreakdownSerializer(serializers.Serializer):
+    """
+    Serializer for representing poll results broken down by voter segment.
+
+    Each result carries per-segment vote counts. Counts below the minimum
+    cell size are suppressed and reported as null.
+    """
+
+    poll_id = serializers.IntegerField()
+    by = serializers.CharField()
+    min_cell_size = serializers.IntegerField()
+    segments = serializers.ListField(child=serializers.CharField())
+    results = serializers.ListField()
+
+    def to_representation(self, instance):
+        """
+        Returns the breakdown as computed by the view.
+        """
+        return instance
+
+
+class PollCrosstabSerializer(serializers.Serializer):
+    """
+    Serializer for representing the crosstab of two polls.
+
+    ``counts[i][j]`` is the number of voters who chose option ``i`` of the
+    first poll and option ``j`` of the other poll. Counts below the minimum
+    cell size are suppressed and reported as null.
+    """
+
+    poll_id = serializers.IntegerField()
+    other_poll_id = serializers.IntegerField()
+    min_cell_size = serializers.IntegerField()
+    voters = serializers.IntegerField()
+    options = serializers.ListField()
+    other_options = serializers.ListField()
+    counts = serializers.ListField(child=serializers.ListField())
+
+    def to_representation(self, instance):
+        """
+        Returns the crosstab as computed by the view.
+        """
+        return instance
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Job model.
+
+    Exposes the status, progress and outcome of a background job.
+    """
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "progress",
+            "progress_message",
+            "attempts",
+            "max_attempts",
+            "run_after",
+            "result",
+            "error",
+            "created_at",
+            "updated_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
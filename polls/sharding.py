@@ -0,0 +1,194 @@
+"""
+Poll-id sharding helpers.
+
+Each poll, together with its options and votes, lives on one database in
+``settings.POLL_SHARDS``. The ``PollShard`` directory on the default
+database allocates global poll ids and records where each poll lives; new
+polls are placed by ``id % len(POLL_SHARDS)`` and may later be moved with
+the ``move_poll`` management command.
+
+Option and vote ids stay globally unique because every shard but the first
+draws them from its own block of ``SHARD_ID_BLOCK`` ids, so rows keep their
+ids when a poll moves.
+
+Directory entries are cached in the default cache, which must be shared
+between processes when sharding is on (see ``polls.checks``): a move then
+re-points every worker as soon as ``set_poll_shard`` commits, instead of
+after ``SHARD_DIRECTORY_CACHE_TIMEOUT``.
+"""
+
+import heapq
+from operator import attrgetter, itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Max
+
+from .models import Option, Poll, PollShard, Vote
+
+DIRECTORY_KEY = "pollpulse:poll:{poll_id}:shard"
+SHARD_ID_BLOCK = 10**15
+
+# Whether this process has moved the poll id allocator past existing polls.
+_poll_ids_reserved = False
+
+
+def sharding_enabled():
+    """
+    Returns True when polls are spread over more than one database.
+    """
+    return len(settings.POLL_SHARDS) > 1
+
+
+def shard_for_poll(poll_id):
+    """
+    Returns the database alias that owns a poll.
+    """
+    if not sharding_enabled():
+        return "default"
+    key = DIRECTORY_KEY.format(poll_id=poll_id)
+    alias = cache.get(key)
+    if alias is None:
+        alias = (
+            PollShard.objects.using("default")
+            .filter(pk=poll_id)
+            .values_list("database", flat=True)
+            .first()
+        ) or "default"
+        # add() rather than set(): a lookup that read the directory just
+        # before a move must not overwrite the entry the move wrote.
+        cache.add(key, alias, settings.SHARD_DIRECTORY_CACHE_TIMEOUT)
+    return alias
+
+
+def set_poll_shard(poll_id, alias):
+    """
+    Records a poll's owning database in the directory.
+
+    The cached entry is replaced once the directory row commits, so no
+    process routes the poll to a database the row does not name.
+    """
+    PollShard.objects.using("default").update_or_create(
+        pk=poll_id, defaults={"database": alias}
+    )
+    transaction.on_commit(
+        lambda: cache.set(
+            DIRECTORY_KEY.format(poll_id=poll_id),
+            alias,
+            settings.SHARD_DIRECTORY_CACHE_TIMEOUT,
+        ),
+        using="default",
+    )
+
+
+def highest_poll_id(alias):
+    """
+    Returns the largest poll id on a database, or 0.
+    """
+    return (
+        Poll.objects.using(alias).aggregate(highest=Max("id"))["highest"] or 0
+    )
+
+
+def reserve_poll_ids():
+    """
+    Moves the directory's id sequence past every poll id in use, so polls
+    created before sharding was enabled never share an id with new ones.
+
+    Safe to run repeatedly; the sequence only ever moves forward.
+    """
+    global _poll_ids_reserved
+    highest = max(highest_poll_id(alias) for alias in settings.POLL_SHARDS)
+    with connections["default"].cursor() as cursor:
+        advance_sequence(cursor, PollShard._meta.db_table, highest + 1)
+    _poll_ids_reserved = True
+
+
+def allocate_poll_id():
+    """
+    Reserves a globally unique poll id and places it on a shard.
+
+    Returns a ``(poll_id, alias)`` pair, or ``(None, "default")`` when
+    sharding is disabled and the default database assigns ids itself.
+    """
+    if not sharding_enabled():
+        return None, "default"
+    if not _poll_ids_reserved:
+        reserve_poll_ids()
+    with transaction.atomic(using="default"):
+        entry = PollShard.objects.using("default").create()
+        alias = settings.POLL_SHARDS[entry.pk % len(settings.POLL_SHARDS)]
+        set_poll_shard(entry.pk, alias)
+    return entry.pk, alias
+
+
+def merge_shards(queryset, key="pk", project=None):
+    """
+    Evaluates a queryset on every shard and merges the rows in key order.
+
+    Each shard is queried ordered by ``key`` and the sorted streams are
+    merged lazily, so the result is in the same keyset order as a single
+    database query. ``project``, if given, turns each shard's queryset into
+    a list of dicts (e.g. ``projections.project_polls``) to merge instead
+    of model instances.
+    """
+    ordered = queryset.order_by(key)
+    field = key.lstrip("-")
+    if project is None:
+        streams = [
+            ordered.using(alias).iterator() for alias in settings.POLL_SHARDS
+        ]
+        keyfunc = attrgetter(field)
+    else:
+        streams = [
+            project(ordered.using(alias)) for alias in settings.POLL_SHARDS
+        ]
+        keyfunc = itemgetter("id" if field == "pk" else field)
+    return heapq.merge(*streams, key=keyfunc, reverse=key.startswith("-"))
+
+
+def reserve_id_block(alias):
+    """
+    Moves a shard's option and vote id sequences into its own id block.
+
+    Safe to run repeatedly; sequences already inside the block are left
+    alone.
+    """
+    index = settings.POLL_SHARDS.index(alias)
+    if index == 0:
+        return
+    start = index * SHARD_ID_BLOCK
+    with connections[alias].cursor() as cursor:
+        for model in (Option, Vote):
+            advance_sequence(cursor, model._meta.db_table, start)
+
+
+def advance_sequence(cursor, table, start):
+    """
+    Makes a table's id sequence hand out ``start`` or more next, unless it
+    is already past it.
+    """
+    vendor = cursor.db.vendor
+    if vendor == "postgresql":
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(f"SELECT last_value, is_called FROM {sequence}")
+        last_value, is_called = cursor.fetchone()
+        if last_value + is_called < start:
+            cursor.execute("SELECT setval(%s, %s, false)", [sequence, start])
+    elif vendor == "sqlite":
+        cursor.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = %s", [table]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+                [table, start - 1],
+            )
+        elif row[0] < start - 1:
+            cursor.execute(
+                "UPDATE sqlite_sequence SET seq = %s WHERE name = %s",
+                [start - 1, table],
+            )
@@ -0,0 +1,320 @@
+"""
+Single-flight cache fills with stale-while-revalidate.
+
+When a hot cache entry goes missing (its poll's version was bumped or it
+expired), every concurrent request would recompute it. ``SingleFlight``
+runs one computation per cache key at a time instead:
+
+* within a process, callers wait for the thread already computing the key;
+* across processes, the computing worker holds a short ``cache.add`` lock
+  and the others poll the cache for its result, for up to
+  ``SINGLEFLIGHT_WAIT_SECONDS`` before computing it themselves.
+
+Callers may also pass an unversioned "latest" key per entry, under which
+the last computed value is kept with its computation time. A miss that
+finds a latest value younger than the stale window serves it at once, and
+one request refreshes the entry on a background thread.
+
+Hit, miss, stale, coalesced and refresh counters are kept per process and
+exposed at /ops/stats/.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+# Seconds between cache polls while another process computes an entry.
+WAIT_POLL_INTERVAL = 0.02
+
+FLIGHTS = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _run_and_close(func):
+    try:
+        func()
+    finally:
+        # Refresh threads must not keep connections of their own open.
+        connections.close_all()
+
+
+def run_in_background(func):
+    """
+    Runs ``func`` on the refresh thread pool, with the caller's context so
+    shard and replica routing carry over.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.CACHE_REFRESH_THREADS,
+                thread_name_prefix="cache-refresh",
+            )
+    context = contextvars.copy_context()
+    _executor.submit(context.run, _run_and_close, func)
+
+
+def singleflight_stats():
+    """
+    Returns the counters of every flight of this process.
+    """
+    return {name: flight.stats() for name, flight in FLIGHTS.items()}
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+class _Call:
+    """
+    One in-process computation of a cache key that other threads wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent computations of the same cache entries.
+
+    ``compute`` functions take a list of items and return ``{item: value}``
+    for all of them, so many misses are filled with one computation.
+    """
+
+    counters = ("hits", "misses", "stale", "coalesced", "refreshes")
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counts = dict.fromkeys(self.counters, 0)
+        FLIGHTS[name] = self
+
+    def count(self, counter, amount=1):
+        if amount:
+            with self._lock:
+                self._counts[counter] += amount
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def get_many(
+        self, keys, compute, timeout, latest_keys=None, stale_seconds=0
+    ):
+        """
+        Returns ``{item: value}`` for every item of ``keys`` (``{item:
+        cache key}``), computing the missing ones.
+
+        With ``latest_keys`` (``{item: unversioned key}``) and a positive
+        ``stale_seconds``, a missing item whose latest value is younger
+        than ``stale_seconds`` is served stale and refreshed in the
+        background.
+        """
+        cached = cache.get_many(keys.values())
+        values = {
+            item: cached[key] for item, key in keys.items() if key in cached
+        }
+        self.count("hits", len(values))
+        missing = [item for item in keys if item not in values]
+        if missing and latest_keys and stale_seconds > 0:
+            stale = self.get_stale(missing, latest_keys, stale_seconds)
+            if stale:
+                values.update(stale)
+                self.refresh(list(stale), keys, compute, timeout, latest_keys)
+                missing = [item for item in missing if item not in stale]
+        if missing:
+            values.update(
+                self.fill(missing, keys, compute, timeout, latest_keys)
+            )
+        return values
+
+    def get(self, key, compute, timeout, latest_key=None, stale_seconds=0):
+        """
+        Single-key form of ``get_many``; ``compute`` takes no arguments.
+        """
+        return self.get_many(
+            {key: key},
+            lambda items: {key: compute()},
+            timeout,
+            latest_keys={key: latest_key} if latest_key else None,
+            stale_seconds=stale_seconds,
+        )[key]
+
+    def get_stale(self, items, latest_keys, stale_seconds):
+        """
+        Returns the latest values of the items computed within the window.
+        """
+        latest = cache.get_many([latest_keys[item] for item in items])
+        now = time.time()
+        stale = {}
+        for item in items:
+            entry = latest.get(latest_keys[item])
+            if entry is not None and now - entry[0] <= stale_seconds:
+                stale[item] = entry[1]
+        self.count("stale", len(stale))
+        return stale
+
+    def store(self, values, keys, timeout, latest_keys):
+        cache.set_many(
+            {keys[item]: value for item, value in values.items()}, timeout
+        )
+        if latest_keys:
+            now = time.time()
+            cache.set_many(
+                {
+                    latest_keys[item]: (now, value)
+                    for item, value in values.items()
+                },
+                timeout,
+            )
+
+    def compute_and_store(self, items, keys, compute, timeout, latest_keys):
+        values = compute(items)
+        self.store(values, keys, timeout, latest_keys)
+        self.count("misses", len(items))
+        return values
+
+    def refresh(self, items, keys, compute, timeout, latest_keys):
+        """
+        Recomputes stale items in the background, unless another request
+        already is.
+        """
+        claimed = [
+            item
+            for item in items
+            if cache.add(
+                _lock_key(keys[item]), 1, settings.SINGLEFLIGHT_LOCK_SECONDS
+            )
+        ]
+        if not claimed:
+            return
+        self.count("refreshes", len(claimed))
+
+        def run():
+            try:
+                self.compute_and_store(
+                    claimed, keys, compute, timeout, latest_keys
+                )
+            finally:
+                cache.delete_many([_lock_key(keys[item]) for item in claimed])
+
+        run_in_background(run)
+
+    def fill(self, items, keys, compute, timeout, latest_keys):
+        """
+        Computes missing items, joining computations already running in
+        this process.
+        """
+        leading, following = {}, {}
+        with self._lock:
+            for item in items:
+                call = self._calls.get(keys[item])
+                if call is None:
+                    call = self._calls[keys[item]] = _Call()
+                    leading[item] = call
+                else:
+                    following[item] = call
+
+        values = {}
+        if leading:
+            try:
+                values = self.fill_shared(
+                    list(leading), keys, compute, timeout, latest_keys
+                )
+                for item, call in leading.items():
+                    call.value = values[item]
+            except BaseException as exc:
+                for call in leading.values():
+                    call.error = exc
+                raise
+            finally:
+                with self._lock:
+                    for item, call in leading.items():
+                        del self._calls[keys[item]]
+                        call.done.set()
+
+        late = []
+        for item, call in following.items():
+            if (
+                call.done.wait(settings.SINGLEFLIGHT_WAIT_SECONDS)
+                and call.error is None
+            ):
+                values[item] = call.value
+                self.count("coalesced")
+            else:
+                late.append(item)
+        if late:
+            values.update(
+                self.compute_and_store(
+                    late, keys, compute, timeout, latest_keys
+                )
+            )
+        return values
+
+    def fill_shared(self, items, keys, compute, timeout, latest_keys):
+        """
+        Computes items under cross-process locks, waiting for the results
+        of items another process is computing.
+        """
+        claimed, busy = [], []
+        for item in items:
+            if cache.add(
+                _lock_key(keys[item]), 1, settings.SINGLEFLIGHT_LOCK_SECONDS
+            ):
+                claimed.append(item)
+            else:
+                busy.append(item)
+
+        values = {}
+        if claimed:
+            try:
+                values = self.compute_and_store(
+                    claimed, keys, compute, timeout, latest_keys
+                )
+            finally:
+                cache.delete_many([_lock_key(keys[item]) for item in claimed])
+        if busy:
+            values.update(self.wait_for(busy, keys))
+            late = [item for item in busy if item not in values]
+            if late:
+                values.update(
+                    self.compute_and_store(
+                        late, keys, compute, timeout, latest_keys
+                    )
+                )
+        return values
+
+    def wait_for(self, items, keys):
+        """
+        Polls the cache for items being computed by other processes until
+        they appear, their locks are released or the wait times out.
+        """
+        values = {}
+        pending = list(items)
+        deadline = time.monotonic() + settings.SINGLEFLIGHT_WAIT_SECONDS
+        while pending and time.monotonic() < deadline:
+            time.sleep(WAIT_POLL_INTERVAL)
+            found = cache.get_many([keys[item] for item in pending])
+            arrived = {
+                item: found[keys[item]]
+                for item in pending
+                if keys[item] in found
+            }
+            values.update(arrived)
+            self.count("coalesced", len(arrived))
+            pending = [item for item in pending if item not in arrived]
+            locks = cache.get_many([_lock_key(keys[item]) for item in pending])
+            if not locks:
+                break
+        return values
@@ -0,0 +1,20 @@
+"""
+Runtime statistics of the serving process, exposed at /ops/stats/.
+
+Every Gunicorn worker keeps its own pools and counters, so each response
+describes the worker (``pid``) that served it.
+"""
+
+from django.db import connections
+
+
+def database_pool_stats():
+    """
+    Returns connection pool statistics for every pooled database alias.
+    """
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        if connection.settings_dict.get("OPTIONS", {}).get("pool"):
+            stats[alias] = connection.pool.get_stats()
+    return stats
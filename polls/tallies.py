@@ -0,0 +1,524 @@
+"""
+Vote counts shared by every worker process of a host.
+
+With ``TALLY_STORE_PATH`` set (e.g. ``/dev/shm/pollpulse-tallies``), the
+vote counts of every option are kept in one memory-mapped file: an
+open-addressing hash table of ``TALLY_STORE_SLOTS`` slots, each a
+``(poll_id, option_id, count, next)`` tuple of int64 columns. Every worker
+maps the same file, so a vote counted by one worker is seen by all of them
+and ``PollResultsView`` answers from the table without touching the votes.
+
+Each poll has a marker slot (option id 0) that says whether its counts are
+loaded, and the ``next`` column chains the poll's other slots to it, so a
+poll is dropped without scanning the table. Votes on polls without a marker
+are not counted: the poll's counts are loaded from the database on its
+first read, so polls written around the API (seeding, replays) are never
+under-counted. Boot resets the table and loads every live poll (see
+``warm``).
+
+A load counts the votes up to a watermark, the highest vote id committed
+when the poll was claimed for loading, and is kept in a watermark slot
+(option id -1); increments of votes at or below it are ignored, as the load
+counts them. A vote is thus counted once whether its increment arrives
+before, during or after the load. Only a vote that got its id before the
+watermark was read but commits after the load's count is missed, until the
+poll is loaded again.
+
+Writers serialise on an ``fcntl`` lock of the file (plus a thread lock, as
+``fcntl`` locks are per process); Python has no atomic fetch-and-add on
+shared memory, and the lock costs about a microsecond. Readers take no
+lock: a count is one aligned 8-byte word, and changes to the table's
+layout (new, removed or moved slots) are bracketed by a sequence counter
+in the header that readers check before and after a lookup, retrying when
+it changed or is odd (a seqlock).
+
+Slots of deleted polls become tombstones; ``compact`` rebuilds the table
+without them and without polls that no longer exist. When the table is too
+full to take a poll's options, that poll is dropped from it and its results
+are read from the database.
+
+All processes of a host must use the same ``TALLY_STORE_SLOTS``, and only
+votes cast on this host are counted: use the store with a single web host.
+"""
+
+import fcntl
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Poll, Vote
+from .sharding import shard_for_poll
+
+MAGIC = 0x32415454504C4C50  # "PLLPTTA2"
+HEADER_WORDS = 8
+# Header words.
+H_MAGIC, H_SLOTS, H_SEQUENCE, H_USED, H_DEAD = range(5)
+
+EMPTY = 0
+TOMBSTONE = -1
+MARKER = 0  # option id of a poll's marker slot
+WATERMARK = -1  # option id of the slot with a poll's load watermark
+READY = -1  # marker count of a loaded poll; otherwise its load start time
+LOAD_TIMEOUT = 60
+# Slots may fill up to this fraction; longer probe chains are refused.
+MAX_LOAD = 0.75
+READ_RETRIES = 100
+
+HASH_POLL = 0x9E3779B97F4A7C15
+HASH_OPTION = 0xC2B2AE3D27D4EB4F
+MASK64 = 2**64 - 1
+
+
+class TallyStore:
+    """
+    The shared tally table of one file.
+
+    Opened lazily and again after a fork, so a module-level store works in
+    preloaded Gunicorn workers.
+    """
+
+    def __init__(self, path, slots):
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError("TALLY_STORE_SLOTS must be a power of two.")
+        self.path = path
+        self.slots = slots
+        self.bits = slots.bit_length() - 1
+        self._pid = None
+
+    def _open(self):
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = (HEADER_WORDS + 4 * self.slots) * 8
+        with self._file_lock():
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+            words = np.frombuffer(self._map, np.int64)
+            self._header = words[:HEADER_WORDS]
+            columns = words[HEADER_WORDS:].reshape(4, self.slots)
+            self._polls, self._options, self._counts, self._next = columns
+            if (
+                self._header[H_MAGIC] != MAGIC
+                or self._header[H_SLOTS] != self.slots
+            ):
+                words[:] = 0
+                self._header[H_SLOTS] = self.slots
+                self._header[H_MAGIC] = MAGIC
+        self._pid = os.getpid()
+
+    def _ensure_open(self):
+        if self._pid != os.getpid():
+            self._open()
+
+    @contextmanager
+    def _file_lock(self):
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1)
+
+    @contextmanager
+    def _locked(self):
+        self._ensure_open()
+        with self._thread_lock, self._file_lock():
+            yield
+
+    @contextmanager
+    def _changing(self):
+        """
+        Brackets a change of the table's layout for lock-free readers.
+        Callers hold the lock.
+        """
+        self._header[H_SEQUENCE] += 1
+        try:
+            yield
+        finally:
+            self._header[H_SEQUENCE] += 1
+
+    def _slot(self, poll_id, option_id):
+        mixed = (poll_id * HASH_POLL) ^ (option_id * HASH_OPTION)
+        return (mixed & MASK64) >> (64 - self.bits)
+
+    def _find(self, poll_id, option_id):
+        """
+        Returns the slot of a key, or -1.
+        """
+        slot = self._slot(poll_id, option_id)
+        for _ in range(self.slots):
+            poll = int(self._polls[slot])
+            if poll == EMPTY:
+                return -1
+            if poll == poll_id and int(self._options[slot]) == option_id:
+                return slot
+            slot = (slot + 1) & (self.slots - 1)
+        return -1
+
+    def _insert(self, poll_id, option_id, count=0):
+        """
+        Puts a new key in the first free slot of its chain, links it to its
+        poll's marker and returns the slot, or -1 when the table is full.
+        Callers hold the lock and bracket the call with ``_changing``; a
+        poll's marker is inserted before its other slots.
+        """
+        if self._header[H_USED] - self._header[H_DEAD] >= (
+            self.slots * MAX_LOAD
+        ):
+            return -1
+        slot = self._slot(poll_id, option_id)
+        while self._polls[slot] > 0:
+            slot = (slot + 1) & (self.slots - 1)
+        if self._polls[slot] == TOMBSTONE:
+            self._header[H_DEAD] -= 1
+        else:
+            self._header[H_USED] += 1
+        if option_id == MARKER:
+            self._next[slot] = -1
+        else:
+            marker = self._find(poll_id, MARKER)
+            self._next[slot] = self._next[marker]
+            self._next[marker] = slot
+        self._options[slot] = option_id
+        self._counts[slot] = count
+        self._polls[slot] = poll_id
+        return slot
+
+    def _drop(self, poll_ids):
+        """
+        Turns every slot of the polls into a tombstone.
+        """
+        dropped = 0
+        for poll_id in poll_ids:
+            slot = self._find(poll_id, MARKER)
+            while slot >= 0:
+                self._polls[slot] = TOMBSTONE
+                dropped += 1
+                slot = int(self._next[slot])
+        self._header[H_DEAD] += dropped
+
+    def poll_counts(self, poll_id, option_ids):
+        """
+        Returns ``{option_id: votes}`` of a loaded poll without locking,
+        or None when the poll is not loaded.
+        """
+        self._ensure_open()
+        for _ in range(READ_RETRIES):
+            sequence = int(self._header[H_SEQUENCE])
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            marker = self._find(poll_id, MARKER)
+            counts = None
+            if marker >= 0 and self._counts[marker] == READY:
+                counts = {}
+                for option_id in option_ids:
+                    slot = self._find(poll_id, option_id)
+                    counts[option_id] = (
+                        int(self._counts[slot]) if slot >= 0 else 0
+                    )
+            if int(self._header[H_SEQUENCE]) == sequence:
+                return counts
+        return None
+
+    def increment(self, poll_id, option_id, vote_id):
+        """
+        Counts a vote if its poll is loaded (or being loaded) and the vote
+        is above the poll's load watermark.
+        """
+        with self._locked():
+            if self._find(poll_id, MARKER) < 0:
+                return
+            watermark = self._find(poll_id, WATERMARK)
+            if watermark >= 0 and vote_id <= self._counts[watermark]:
+                return
+            slot = self._find(poll_id, option_id)
+            if slot < 0:
+                with self._changing():
+                    slot = self._insert(poll_id, option_id)
+                    if slot < 0:
+                        self._drop([poll_id])
+                        return
+            self._counts[slot] += 1
+
+    def register_poll(self, poll_id):
+        """
+        Marks a new poll, which has no votes yet, as loaded.
+        """
+        with self._locked(), self._changing():
+            if self._find(poll_id, MARKER) < 0:
+                self._insert(poll_id, MARKER, READY)
+
+    def forget_polls(self, poll_ids):
+        """
+        Drops polls from the table; they are loaded again on their next
+        read.
+        """
+        with self._locked(), self._changing():
+            self._drop(poll_ids)
+
+    def load(self, poll_ids, compute, watermark):
+        """
+        Loads the counts of the polls that are not loaded yet.
+
+        ``watermark()`` returns the highest committed vote id and is called
+        under the lock once the polls are claimed, so no increment falls
+        between the two. ``compute(poll_ids, watermark)`` then returns
+        ``{poll_id: {option_id: votes}}`` for the votes up to the watermark
+        and runs without the lock; votes above it are counted by their
+        increments, before or after it returns.
+        """
+        now = int(time.time())
+        with self._locked(), self._changing():
+            claimed = []
+            for poll_id in poll_ids:
+                marker = self._find(poll_id, MARKER)
+                if marker >= 0:
+                    started = self._counts[marker]
+                    if started == READY or now - started < LOAD_TIMEOUT:
+                        continue
+                    # An abandoned load; start over.
+                    self._drop([poll_id])
+                if self._insert(poll_id, MARKER, now) >= 0:
+                    claimed.append(poll_id)
+            if not claimed:
+                return 0
+            try:
+                highest = watermark()
+            except BaseException:
+                self._drop(claimed)
+                raise
+            for poll_id in claimed:
+                if self._insert(poll_id, WATERMARK, highest) < 0:
+                    self._drop([poll_id])
+
+        try:
+            counts = compute(claimed, highest)
+        except BaseException:
+            self.forget_polls(claimed)
+            raise
+
+        with self._locked(), self._changing():
+            for poll_id in claimed:
+                marker = self._find(poll_id, MARKER)
+                if marker < 0 or self._counts[marker] != now:
+                    # Forgotten or reloaded meanwhile.
+                    continue
+                for option_id, votes in counts.get(poll_id, {}).items():
+                    slot = self._find(poll_id, option_id)
+                    if slot < 0:
+                        slot = self._insert(poll_id, option_id)
+                        if slot < 0:
+                            self._drop([poll_id])
+                            break
+                    self._counts[slot] += votes
+                else:
+                    self._counts[marker] = READY
+        return len(claimed)
+
+    def reset(self):
+        """
+        Empties the table.
+        """
+        with self._locked(), self._changing():
+            self._polls[:] = EMPTY
+            self._header[H_USED] = 0
+            self._header[H_DEAD] = 0
+
+    def poll_ids(self):
+        """
+        Returns the ids of the polls in the table.
+        """
+        self._ensure_open()
+        markers = (self._polls > 0) & (self._options == MARKER)
+        return self._polls[markers].tolist()
+
+    def compact(self, live_poll_ids=None):
+        """
+        Rebuilds the table without tombstones and, if ``live_poll_ids`` is
+        given, without the polls not in it. Returns the slots freed.
+        """
+        with self._locked(), self._changing():
+            keep = self._polls > 0
+            if live_poll_ids is not None:
+                keep &= np.isin(self._polls, list(live_poll_ids))
+            entries = list(
+                zip(
+                    self._polls[keep].tolist(),
+                    self._options[keep].tolist(),
+                    self._counts[keep].tolist(),
+                )
+            )
+            freed = int(self._header[H_USED]) - len(entries)
+            self._polls[:] = EMPTY
+            self._header[H_USED] = 0
+            self._header[H_DEAD] = 0
+            # Markers first, so the other slots link to them.
+            entries.sort(key=lambda entry: entry[1] != MARKER)
+            for poll_id, option_id, count in entries:
+                self._insert(poll_id, option_id, count)
+        return freed
+
+    def stats(self):
+        self._ensure_open()
+        return {
+            "slots": self.slots,
+            "used": int(self._header[H_USED]),
+            "tombstones": int(self._header[H_DEAD]),
+            "polls": len(self.poll_ids()),
+        }
+
+
+_store = None
+
+
+def store_enabled():
+    return bool(settings.TALLY_STORE_PATH)
+
+
+def get_store():
+    global _store
+    if _store is None or (_store.path, _store.slots) != (
+        settings.TALLY_STORE_PATH,
+        settings.TALLY_STORE_SLOTS,
+    ):
+        _store = TallyStore(
+            settings.TALLY_STORE_PATH, settings.TALLY_STORE_SLOTS
+        )
+    return _store
+
+
+def count_vote(poll_id, option_id, vote_id):
+    if store_enabled():
+        get_store().increment(poll_id, option_id, vote_id)
+
+
+def register_poll(poll_id):
+    if store_enabled():
+        get_store().register_poll(poll_id)
+
+
+def forget_polls(poll_ids):
+    if store_enabled():
+        get_store().forget_polls(poll_ids)
+
+
+def highest_vote_id(using):
+    return (
+        Vote.objects.using(using).aggregate(highest=Max("id"))["highest"] or 0
+    )
+
+
+def vote_counts(poll_ids, using, up_to=None):
+    """
+    Counts the votes of the polls' options: ``{poll_id: {option_id: n}}``,
+    only those with ids up to ``up_to`` if given.
+    """
+    counts = {}
+    votes = Vote.objects.using(using).filter(poll_id__in=poll_ids)
+    if up_to is not None:
+        votes = votes.filter(id__lte=up_to)
+    rows = (
+        votes.values_list("poll_id", "option_id")
+        .annotate(votes=Count("id"))
+        .order_by()
+    )
+    for poll_id, option_id, votes in rows:
+        counts.setdefault(poll_id, {})[option_id] = votes
+    return counts
+
+
+def load_poll(poll_id):
+    """
+    Loads one poll's counts from its primary database.
+    """
+    alias = shard_for_poll(poll_id)
+    get_store().load(
+        [poll_id],
+        lambda ids, highest: vote_counts(ids, alias, highest),
+        lambda: highest_vote_id(alias),
+    )
+
+
+def poll_results(poll, rendered):
+    """
+    Returns a poll's results in the format of ``PollResultsView`` from
+    the shared counts and its rendered representation (for the option
+    texts and order), or None when the poll cannot be served that way.
+    """
+    store = get_store()
+    option_ids = [option["id"] for option in rendered["options"]]
+    counts = store.poll_counts(poll.id, option_ids)
+    if counts is None:
+        load_poll(poll.id)
+        counts = store.poll_counts(poll.id, option_ids)
+        if counts is None:
+            return None
+    return {
+        "poll_id": poll.id,
+        "results": [
+            {
+                "option_id": option["id"],
+                "option_text": option["option_text"],
+                "vote_count": counts[option["id"]],
+            }
+            for option in rendered["options"]
+        ],
+    }
+
+
+def warm(databases=None, chunk_size=1000):
+    """
+    Resets the table and loads the counts of every live poll, a chunk of
+    polls at a time. Returns the number of polls loaded.
+    """
+    store = get_store()
+    store.reset()
+    loaded = 0
+    for alias in databases or settings.POLL_SHARDS:
+        polls = Poll.objects.using(alias).filter(is_deleted=False)
+        after = 0
+        while True:
+            ids = list(
+                polls.filter(pk__gt=after)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            loaded += store.load(
+                ids,
+                lambda chunk, highest, alias=alias: vote_counts(
+                    chunk, alias, highest
+                ),
+                lambda alias=alias: highest_vote_id(alias),
+            )
+            after = ids[-1]
+    return loaded
+
+
+def compact(databases=None, chunk_size=1000):
+    """
+    Drops tombstones and polls that were deleted or no longer exist.
+    Returns the slots freed.
+    """
+    store = get_store()
+    poll_ids = store.poll_ids()
+    live = set()
+    for alias in databases or settings.POLL_SHARDS:
+        for start in range(0, len(poll_ids), chunk_size):
+            live.update(
+                Poll.objects.using(alias)
+                .filter(
+                    pk__in=poll_ids[start : start + chunk_size],
+                    is_deleted=False,
+                )
+                .values_list("pk", flat=True)
+            )
+    return store.compact(live)
@@ -0,0 +1,70 @@
+"""
+Background job handlers. Imported by ``manage.py runworker``.
+"""
+
+from . import deletion
+from .cache import bump_poll_version
+from .jobs import PermanentJobError, job_handler, report_progress
+from .models import Poll, User
+from .results import compute_results
+from .routers import using_shard
+from .sharding import shard_for_poll
+from .tallies import forget_polls
+
+
+@job_handler("recount_poll")
+def recount_poll(job):
+    """
+    Recomputes a poll's results from its votes and drops cached copies.
+
+    Payload: ``{"poll_id": <id>}``.
+    """
+    poll_id = job.payload.get("poll_id")
+    alias = shard_for_poll(poll_id)
+    with using_shard(alias):
+        if not Poll.objects.filter(pk=poll_id).exists():
+            raise PermanentJobError(f"Poll {poll_id} does not exist.")
+        report_progress(job, 0.5, "Counting votes")
+        results = compute_results([poll_id])[poll_id]
+    bump_poll_version(poll_id)
+    forget_polls([poll_id])
+    return results
+
+
+def deletion_progress(job):
+    """
+    Returns a deletion ``report`` callback that updates the job's progress.
+    """
+
+    def report(done, total, message):
+        report_progress(job, done / total, message)
+
+    return report
+
+
+@job_handler("delete_poll")
+def delete_poll(job):
+    """
+    Deletes a poll with its options and votes in batches.
+
+    Payload: ``{"poll_id": <id>}``.
+    """
+    poll_id = job.payload.get("poll_id")
+    try:
+        return deletion.delete_poll(poll_id, report=deletion_progress(job))
+    except Poll.DoesNotExist as exc:
+        raise PermanentJobError(str(exc))
+
+
+@job_handler("delete_user")
+def delete_user(job):
+    """
+    Deletes a user with their polls and votes in batches.
+
+    Payload: ``{"user_id": <id>}``.
+    """
+    user_id = job.payload.get("user_id")
+    try:
+        return deletion.delete_user(user_id, report=deletion_progress(job))
+    except User.DoesNotExist as exc:
+        raise PermanentJobError(str(exc))
@@ -1,12 +1,70 @@
+import importlib
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+from array import array
+from datetime import timedelta
+from io import StringIO
+from operator import itemgetter
+from types import SimpleNamespace
+import tempfile
+import threading
+import time
 import dj_database_url
-from django.test import TestCase
+from unittest.mock import patch
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import CharField, Count, F, Value
+from django.db.models.functions import NullIf
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.test import (
+    Client,
+    RequestFactory,
+    TestCase,
+    override_settings,
+)
 from testcontainers.postgres import PostgresContainer
 from django.conf import settings
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient, APITestCase
 from django.urls import reverse
-from ..models import Poll, User, Vote
+from django.core.management import CommandError, call_command
+from .. import checks, jobs, routers, sharding, tallies, trending, votelog
+from ..models import (
+    IdempotencyKey,
+    Job,
+    Option,
+    Poll,
+    PollTrend,
+    User,
+    Vote,
+)
+from ..deletion import delete_poll, delete_user
+from ..management.commands.move_poll import Command as MovePollCommand
+from ..management.commands.seed_pollpulse import COLUMNS as SEED_COLUMNS
+from ..columnar import ColumnarExport
+from ..cache import (
+    bump_poll_version,
+    get_list_version,
+    get_poll_version,
+    poll_cache_key,
+)
+from ..projections import project_polls
+from ..results import compute_results
+from ..renderers import FastJSONRenderer
+from ..serializers import PollSerializer
+from ..singleflight import SingleFlight
+from ..views import PollResultsBreakdownView
+from ..voterfilter import ScalableBloomFilter, voter_filters
 
 
 class BaseIntegrationTest(TestCase):
@@ -38,6 +96,12 @@ class BaseIntegrationTest(TestCase):
 
         call_command("migrate")
 
+    def setUp(self):
+        super().setUp()
+        # Cached poll data is keyed by poll id, and ids repeat across tests.
+        cache.clear()
+        trending.pending.clear()
+
     @classmethod
     def tearDownClass(cls):
         if cls.container:
@@ -75,7 +139,11 @@ class APITestMixin:
 
     def vote_on_poll(self, poll_id, option_id):
         vote_data = {"poll": poll_id, "option": option_id}
-        response = self.client.post("/api/v1/vote/", vote_data, format="json")
+        # The vote's side effects run once it commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/vote/", vote_data, format="json"
+            )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         return response.data
 
@@ -260,6 +328,14 @@ class PollViewSetTests(BaseIntegrationTest, APITestMixin, APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_retrieve_poll_with_invalid_id(self):
+        """
+        Test that a non-numeric poll id is not found.
+        """
+        for fields in ("", "?fields=title"):
+            response = self.client.get(f"/api/v1/polls/abc/{fields}")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_update_poll(self):
         """
         Test updating an existing poll.
@@ -518,3 +594,3162 @@ class PollResultsViewTests(BaseIntegrationTest, APITestMixin, APITestCase):
         url = reverse("poll-results", kwargs={"pk": 999})
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PollResultsBreakdownViewTests(
+    BaseIntegrationTest, APITestMixin, APITestCase
+):
+    """
+    Tests for PollResultsBreakdownView API endpoint.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.test_user = self.authenticate_client()
+        self.poll_data = {
+            "title": "Breakdown Test Poll",
+            "description": "Poll for breakdown testing.",
+            "options": [
+                {"option_text": "Breakdown Option 1"},
+                {"option_text": "Breakdown Option 2"},
+            ],
+            "poll_type": "single_choice",
+            "settings": {},
+        }
+        poll_response = self.create_poll(self.poll_data)
+        self.poll_id = poll_response["id"]
+        self.options = list(
+            Poll.objects.get(pk=self.poll_id).options.order_by("id")
+        )
+        self.url = reverse(
+            "poll-results-breakdown", kwargs={"pk": self.poll_id}
+        )
+
+    def cast_votes(self, segment, option, count):
+        for i in range(count):
+            voter = User.objects.create_user(
+                username=f"{segment}-voter-{i}",
+                email=f"{segment}-voter-{i}@example.com",
+                password="testpassword",
+                segment=segment,
+            )
+            Vote.objects.create(
+                user=voter, poll_id=self.poll_id, option=option
+            )
+
+    @override_settings(BREAKDOWN_MIN_CELL_SIZE=1)
+    def test_breakdown_by_segment(self):
+        """
+        Test the option x segment matrix returned for the segment dimension.
+        """
+        self.cast_votes("north", self.options[0], 2)
+        self.cast_votes("south", self.options[1], 1)
+
+        response = self.client.get(self.url, {"by": "segment"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["segments"], ["north", "south"])
+        counts = [result["counts"] for result in response.data["results"]]
+        self.assertEqual(
+            counts, [{"north": 2, "south": 0}, {"north": 0, "south": 1}]
+        )
+
+    @override_settings(BREAKDOWN_MIN_CELL_SIZE=1)
+    def test_breakdown_sums_empty_and_null_segments(self):
+        """
+        Test that empty and missing segments add up in the "unknown"
+        column instead of replacing each other.
+        """
+        self.cast_votes("", self.options[0], 2)
+        self.cast_votes("none", self.options[0], 3)
+        self.cast_votes("north", self.options[1], 1)
+
+        # Voters in segment "none" have no segment (NULL) in this query.
+        segment = NullIf(
+            "votes__user__segment", Value("none", output_field=CharField())
+        )
+        with patch.dict(
+            PollResultsBreakdownView.dimensions, {"segment": segment}
+        ):
+            response = self.client.get(self.url, {"by": "segment"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["segments"], ["north", "unknown"])
+        counts = [result["counts"] for result in response.data["results"]]
+        self.assertEqual(
+            counts, [{"north": 0, "unknown": 5}, {"north": 1, "unknown": 0}]
+        )
+
+    @override_settings(BREAKDOWN_MIN_CELL_SIZE=2)
+    def test_breakdown_suppresses_small_cells(self):
+        """
+        Test that cells below the minimum cell size are returned as null.
+        """
+        self.cast_votes("north", self.options[0], 2)
+        self.cast_votes("south", self.options[0], 1)
+
+        response = self.client.get(self.url, {"by": "segment"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"][0]["counts"], {"north": 2, "south": None}
+        )
+
+    @override_settings(BREAKDOWN_MIN_CELL_SIZE=1)
+    def test_breakdown_invalidated_by_new_vote(self):
+        """
+        Test that a vote cast through the API invalidates the cached matrix.
+        """
+        response = self.client.get(self.url, {"by": "cohort"})
+        self.assertEqual(response.data["segments"], [])
+
+        self.vote_on_poll(self.poll_id, self.options[0].id)
+        response = self.client.get(self.url, {"by": "cohort"})
+        self.assertEqual(len(response.data["segments"]), 1)
+        cohort = response.data["segments"][0]
+        self.assertEqual(response.data["results"][0]["counts"], {cohort: 1})
+
+    def test_breakdown_unknown_dimension(self):
+        """
+        Test requesting a breakdown by an unsupported dimension.
+        """
+        response = self.client.get(self.url, {"by": "country"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("error", response.data)
+
+
+class PrimaryReplicaRouterTests(
+    BaseIntegrationTest, APITestMixin, APITestCase
+):
+    """
+    Tests for PrimaryReplicaRouter and read-your-writes pinning.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        routers._health.clear()
+        self.router = routers.PrimaryReplicaRouter()
+        self.test_user = self.authenticate_client()
+
+    def test_reads_outside_replica_block_use_primary(self):
+        """
+        Test that reads default to the primary.
+        """
+        with override_settings(DATABASE_REPLICAS=["replica_0"]):
+            self.assertIsNone(self.router.db_for_read(Poll))
+
+    def test_replica_reads_use_healthy_replica(self):
+        """
+        Test that opted-in reads go to a replica within the lag limit.
+        """
+        with override_settings(DATABASE_REPLICAS=["replica_0"]), patch(
+            "polls.routers.replica_lag", return_value=0.0
+        ), routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Poll), "replica_0")
+            self.assertIsNone(self.router.db_for_write(Poll))
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        """
+        Test that a replica behind REPLICA_MAX_LAG_SECONDS is skipped.
+        """
+        with override_settings(
+            DATABASE_REPLICAS=["replica_0"], REPLICA_MAX_LAG_SECONDS=2
+        ), patch(
+            "polls.routers.replica_lag", return_value=30.0
+        ), routers.replica_reads():
+            self.assertIsNone(self.router.db_for_read(Poll))
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        """
+        Test that a replica that cannot be queried is skipped.
+        """
+        with override_settings(
+            DATABASE_REPLICAS=["missing_replica"]
+        ), routers.replica_reads():
+            self.assertIsNone(self.router.db_for_read(Poll))
+
+    def is_pinned(self, user):
+        """
+        Checks the pin for a request carrying the client's cookies.
+        """
+        request = RequestFactory().get("/")
+        request.COOKIES = {
+            name: morsel.value for name, morsel in self.client.cookies.items()
+        }
+        request.user = user
+        return routers.is_pinned_to_primary(request)
+
+    def test_vote_pins_user_to_primary(self):
+        """
+        Test that a successful write pins the user to the primary.
+        """
+        self.assertFalse(self.is_pinned(self.test_user))
+        poll_response = self.create_poll(
+            {
+                "title": "Pinned Poll",
+                "options": [{"option_text": "Yes"}, {"option_text": "No"}],
+                "poll_type": "single_choice",
+                "settings": {},
+            }
+        )
+        self.assertTrue(self.is_pinned(self.test_user))
+
+        self.client.cookies.clear()
+        self.vote_on_poll(
+            poll_response["id"], poll_response["options"][0]["id"]
+        )
+        self.assertTrue(self.is_pinned(self.test_user))
+
+    def test_pin_holds_on_a_fresh_cache(self):
+        """
+        Test that the pin survives a worker whose cache never saw the
+        write, and only applies to the user who wrote.
+        """
+        self.create_poll(
+            {
+                "title": "Pinned Poll",
+                "options": [{"option_text": "Yes"}],
+                "poll_type": "single_choice",
+                "settings": {},
+            }
+        )
+        cache.clear()
+        self.assertTrue(self.is_pinned(self.test_user))
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="pw"
+        )
+        self.assertFalse(self.is_pinned(other))
+
+
+class PollShardingTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the poll shard directory and the move_poll command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_sharding_disabled_uses_default(self):
+        """
+        Test that a single configured shard keeps every poll on default.
+        """
+        self.assertEqual(sharding.shard_for_poll(123), "default")
+        self.assertEqual(sharding.allocate_poll_id(), (None, "default"))
+
+    @override_settings(POLL_SHARDS=["default", "shard_1"])
+    @patch("polls.sharding._poll_ids_reserved", True)
+    def test_allocate_poll_id_places_poll_by_id(self):
+        """
+        Test that allocated ids are placed by id and recorded in the directory.
+        """
+        poll_id, alias = sharding.allocate_poll_id()
+        self.assertEqual(alias, ["default", "shard_1"][poll_id % 2])
+        cache.clear()
+        self.assertEqual(sharding.shard_for_poll(poll_id), alias)
+
+    def test_allocate_poll_id_skips_existing_poll_ids(self):
+        """
+        Test that enabling sharding on a database with polls hands out ids
+        above the existing ones.
+        """
+        owner = User.objects.create_user(
+            username="owner", email="owner@example.com", password="pw"
+        )
+        existing = [
+            Poll.objects.create(user=owner, title=f"Old {n}").id
+            for n in range(5)
+        ]
+        real_highest = sharding.highest_poll_id
+
+        def highest_poll_id(alias):
+            # Only the default database holds polls in this test.
+            return real_highest(alias) if alias == "default" else 0
+
+        with override_settings(POLL_SHARDS=["default", "shard_1"]), patch(
+            "polls.sharding.highest_poll_id", highest_poll_id
+        ), patch("polls.sharding._poll_ids_reserved", False):
+            allocated = [sharding.allocate_poll_id()[0] for _ in range(3)]
+        self.assertGreater(min(allocated), max(existing))
+        self.assertEqual(len(set(allocated)), 3)
+
+    @patch("polls.views.sharding_enabled", lambda: True)
+    def test_sharded_list_with_sparse_fields(self):
+        """
+        Test that a list merged across shards can leave out the poll id.
+        """
+        self.authenticate_client()
+        for title in ("First", "Second"):
+            self.create_poll(
+                {
+                    "title": title,
+                    "description": "Sharded poll.",
+                    "options": [{"option_text": "A"}],
+                    "poll_type": "single_choice",
+                    "settings": {},
+                }
+            )
+        response = self.client.get("/api/v1/polls/?fields=title")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(response.data, key=itemgetter("title")),
+            [{"title": "First"}, {"title": "Second"}],
+        )
+        response = self.client.get("/api/v1/polls/?fields=title,my_vote")
+        self.assertEqual(
+            sorted(response.data, key=itemgetter("title")),
+            [
+                {"title": "First", "my_vote": None},
+                {"title": "Second", "my_vote": None},
+            ],
+        )
+
+    @override_settings(POLL_SHARDS=["default", "shard_1"])
+    def test_polls_without_directory_entry_stay_on_default(self):
+        """
+        Test that polls created before sharding resolve to default.
+        """
+        self.assertEqual(sharding.shard_for_poll(999), "default")
+
+    @override_settings(POLL_SHARDS=["default", "shard_1"])
+    def test_move_poll_rejects_current_shard(self):
+        """
+        Test that moving a poll onto the shard it already lives on fails.
+        """
+        with self.assertRaises(CommandError):
+            call_command("move_poll", 999, "default")
+
+    def test_move_poll_reports_conflicting_votes(self):
+        """
+        Test that votes clashing with rows on the target are recorded
+        instead of silently dropped.
+        """
+        voters = [
+            User.objects.create_user(
+                username=f"mover{n}",
+                email=f"mover{n}@example.com",
+                password="pw",
+            )
+            for n in range(2)
+        ]
+        poll = Poll.objects.create(user=voters[0], title="Moving")
+        option = Option.objects.create(poll=poll, option_text="A")
+        Vote.objects.create(user=voters[0], poll=poll, option=option)
+        copies = [
+            Vote(id=10**6 + n, user=voter, poll=poll, option=option)
+            for n, voter in enumerate(voters)
+        ]
+
+        command = MovePollCommand()
+        command.conflicts = []
+        command.insert_votes(copies, "default")
+        self.assertEqual(command.conflicts, [copies[0].id])
+        self.assertTrue(Vote.objects.filter(pk=copies[1].id).exists())
+
+    @override_settings(POLL_SHARDS=["default", "shard_1"])
+    def test_directory_change_replaces_cached_entry_on_commit(self):
+        """
+        Test that a move re-points the cached directory entry once the
+        directory row commits, and that later lookups do not overwrite it.
+        """
+        self.assertEqual(sharding.shard_for_poll(999), "default")
+        with self.captureOnCommitCallbacks(execute=True):
+            sharding.set_poll_shard(999, "shard_1")
+            self.assertEqual(sharding.shard_for_poll(999), "default")
+        self.assertEqual(sharding.shard_for_poll(999), "shard_1")
+        self.assertEqual(
+            cache.get(sharding.DIRECTORY_KEY.format(poll_id=999)), "shard_1"
+        )
+
+    def test_move_poll_adds_trending_score(self):
+        """
+        Test that the source's trending score is added to the target's.
+        """
+        owner = User.objects.create_user(
+            username="trendy", email="trendy@example.com", password="pw"
+        )
+        poll = Poll.objects.create(user=owner, title="Trending")
+        PollTrend.objects.create(poll=poll, score=10.0)
+
+        # Source and target are the same database here, so the row ends up
+        # holding the sum of two equal scores.
+        MovePollCommand().copy_trend(poll.id, "default", "default")
+        self.assertAlmostEqual(
+            PollTrend.objects.get(poll=poll).score, 10.0 + math.log(2)
+        )
+
+
+class OpsStatsViewTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for OpsStatsView API endpoint.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.url = reverse("ops-stats")
+
+    def test_ops_stats_requires_staff(self):
+        """
+        Test that non-staff users cannot read worker statistics.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_ops_stats(self):
+        """
+        Test retrieving worker statistics as a staff user.
+        """
+        self.test_user.is_staff = True
+        self.test_user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("pid", response.data)
+        self.assertIsInstance(response.data["database_pools"], dict)
+        self.assertEqual(
+            set(response.data["cache"]["results"]), set(SingleFlight.counters)
+        )
+
+
+class SwaggerDocsTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the lazily loaded Swagger UI and prebuilt OpenAPI schema.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("schema-swagger-ui")
+
+    def test_prebuilt_schema_is_served_from_disk(self):
+        """
+        Test that a prebuilt schema file is returned as is.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".json") as schema_file:
+            schema_file.write(b'{"swagger": "2.0", "prebuilt": true}')
+            schema_file.flush()
+            with override_settings(OPENAPI_SCHEMA_PATH=schema_file.name):
+                response = self.client.get(self.url, {"format": "openapi"})
+                body = b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(body)["prebuilt"], True)
+
+    @override_settings(OPENAPI_SCHEMA_PATH="/nonexistent/openapi.json")
+    def test_schema_generated_without_prebuilt_file(self):
+        """
+        Test that the schema is generated when no prebuilt file exists.
+        """
+        response = self.client.get(self.url, {"format": "openapi"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("/polls/", json.loads(response.content)["paths"])
+
+
+class PollReadPathTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the serializer-free poll read path and FastJSONRenderer.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        for title in ("Read Poll   1", "Read Poll ü 2"):
+            self.create_poll(
+                {
+                    "title": title,
+                    "description": "Poll for read path testing.",
+                    "options": [
+                        {"option_text": "Read Option 1"},
+                        {"option_text": "Read Option 2"},
+                    ],
+                    "poll_type": "single_choice",
+                    "settings": {"anonymous": True, "limit": 2.5},
+                }
+            )
+        Poll.objects.update(
+            expires_at=timezone.now(), description="Line\u2028break"
+        )
+
+    def test_projection_matches_serializer(self):
+        """
+        Test that the projected polls render to the serializer's bytes.
+        """
+        queryset = Poll.objects.all()
+        expected = JSONRenderer().render(
+            PollSerializer(queryset, many=True).data
+        )
+        rendered = FastJSONRenderer().render(project_polls(queryset))
+        self.assertEqual(rendered, expected)
+
+    def test_list_and_retrieve_use_one_query(self):
+        """
+        Test that list and detail reads cost one query for the pre-rendered
+        polls (plus authentication).
+        """
+        poll_id = Poll.objects.first().id
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("poll-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        poll_queries = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "polls_poll" in query["sql"] or "polls_option" in query["sql"]
+        ]
+        self.assertEqual(len(poll_queries), 1)
+
+        response = self.client.get(
+            reverse("poll-detail", kwargs={"pk": poll_id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["options"]), 2)
+
+    def test_sparse_fieldset_skips_options_query(self):
+        """
+        Test that ?fields= returns only the requested fields without
+        querying options.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("poll-list"), {"fields": "id,title,expires_at"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data[0]), ["id", "title", "expires_at"])
+        self.assertFalse(
+            any(
+                "polls_option" in query["sql"]
+                for query in queries.captured_queries
+            )
+        )
+
+    def test_sparse_fieldset_with_expanded_options(self):
+        """
+        Test that ?expand=options embeds options in a sparse response.
+        """
+        poll_id = Poll.objects.first().id
+        response = self.client.get(
+            reverse("poll-detail", kwargs={"pk": poll_id}),
+            {"fields": "id,title", "expand": "options"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data), ["id", "title", "options"])
+        self.assertEqual(len(response.data["options"]), 2)
+
+    def test_sparse_fieldset_unknown_field(self):
+        """
+        Test requesting a field that polls do not have.
+        """
+        response = self.client.get(
+            reverse("poll-list"), {"fields": "id,password"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
+
+
+class PollSearchViewTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the PollSearchView API endpoint.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.url = reverse("poll-search")
+        self.polls = {}
+        for key, title, description, option in (
+            ("title", "Favourite volcano", "Pick one.", "Etna"),
+            ("option", "Holiday plans", "Where to?", "Volcano hike"),
+            ("description", "Weekend", "Volcano or beach?", "Beach"),
+            ("other", "Breakfast", "Tea or coffee?", "Tea"),
+        ):
+            self.polls[key] = self.create_poll(
+                {
+                    "title": title,
+                    "description": description,
+                    "options": [
+                        {"option_text": option},
+                        {"option_text": "Something else"},
+                    ],
+                    "poll_type": "single_choice",
+                    "settings": {},
+                }
+            )
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_search_ranks_title_then_options_then_description(self):
+        """
+        Test that matches are ranked by where the term occurs.
+        """
+        data = self.search(q="volcano")
+        self.assertEqual(
+            [poll["id"] for poll in data["results"]],
+            [
+                self.polls["title"]["id"],
+                self.polls["option"]["id"],
+                self.polls["description"]["id"],
+            ],
+        )
+        self.assertEqual(data["results"][0], self.polls["title"])
+        self.assertIsNone(data["next"])
+
+    def test_search_requires_every_term(self):
+        """
+        Test that every search term has to match.
+        """
+        data = self.search(q="volcano hike")
+        self.assertEqual(
+            [poll["id"] for poll in data["results"]],
+            [self.polls["option"]["id"]],
+        )
+
+    def test_search_cursor_pagination(self):
+        """
+        Test that following 'next' walks all matches without repeats.
+        """
+        seen = []
+        data = self.search(q="volcano", limit=1)
+        while True:
+            self.assertLessEqual(len(data["results"]), 1)
+            seen.extend(poll["id"] for poll in data["results"])
+            if data["next"] is None:
+                break
+            data = self.search(q="volcano", limit=1, cursor=data["next"])
+        self.assertEqual(
+            seen, [poll["id"] for poll in self.search(q="volcano")["results"]]
+        )
+        self.assertEqual(len(seen), 3)
+
+    def test_search_follows_updates_and_deletes(self):
+        """
+        Test that edited polls are reindexed and deleted polls are hidden.
+        """
+        poll = self.polls["other"]
+        response = self.client.patch(
+            reverse("poll-detail", kwargs={"pk": poll["id"]}),
+            {"title": "Volcano breakfast"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.search(q="volcano")["results"][0]["id"], poll["id"]
+        )
+
+        self.client.delete(
+            reverse("poll-detail", kwargs={"pk": self.polls["title"]["id"]})
+        )
+        ids = [poll["id"] for poll in self.search(q="volcano")["results"]]
+        self.assertNotIn(self.polls["title"]["id"], ids)
+
+    def test_search_rejects_bad_input(self):
+        """
+        Test that a missing query or a malformed cursor is a 400.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {"q": "volcano", "cursor": "!!"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PollTrendingViewTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for trending scores and the PollTrendingView API endpoint.
+    """
+
+    def setUp(self):
+        super().setUp()
+        trending.board.clear()
+        self.test_user = self.authenticate_client()
+        self.url = reverse("poll-trending")
+        self.polls = [
+            self.create_poll(
+                {
+                    "title": f"Trending Poll {i}",
+                    "description": "Poll for trending testing.",
+                    "options": [
+                        {"option_text": "Option 1"},
+                        {"option_text": "Option 2"},
+                    ],
+                    "poll_type": "single_choice",
+                    "settings": {},
+                }
+            )
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        trending.board.clear()
+        super().tearDown()
+
+    def test_votes_update_score(self):
+        """
+        Test that each vote adds one (undecayed) unit to the poll's score.
+        """
+        poll = self.polls[0]
+        self.vote_on_poll(poll["id"], poll["options"][0]["id"])
+        self.authenticate_client(
+            User.objects.create_user(
+                username="voter2", email="voter2@example.com", password="pw"
+            )
+        )
+        self.vote_on_poll(poll["id"], poll["options"][1]["id"])
+
+        trending.pending.flush()
+        stored = PollTrend.objects.get(poll_id=poll["id"]).score
+        self.assertAlmostEqual(trending.current_score(stored), 2.0, places=2)
+
+    def test_votes_are_written_in_batches(self):
+        """
+        Test that buffered votes on a poll are written with one UPDATE once
+        the flush interval has passed.
+        """
+        poll_id = self.polls[0]["id"]
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                trending.record_vote(poll_id)
+        self.assertEqual(len(queries), 0)
+        self.assertFalse(PollTrend.objects.filter(poll_id=poll_id).exists())
+
+        with override_settings(
+            TRENDING_FLUSH_SECONDS=0
+        ), CaptureQueriesContext(connection) as queries:
+            trending.record_vote(poll_id)
+        updates = [
+            q["sql"]
+            for q in queries.captured_queries
+            if q["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 1)
+        stored = PollTrend.objects.get(poll_id=poll_id).score
+        self.assertAlmostEqual(trending.current_score(stored), 4.0, places=2)
+
+    def test_older_votes_decay(self):
+        """
+        Test that a vote one half-life old counts half as much.
+        """
+        now = timezone.now().timestamp()
+        half_life = settings.TRENDING_HALF_LIFE_SECONDS
+        old, recent = self.polls[0]["id"], self.polls[1]["id"]
+        trending.record_vote(old, at=now - half_life)
+        trending.record_vote(old, at=now - half_life)
+        trending.record_vote(recent, at=now)
+        trending.pending.flush()
+
+        old_score = PollTrend.objects.get(poll_id=old).score
+        recent_score = PollTrend.objects.get(poll_id=recent).score
+        self.assertAlmostEqual(
+            trending.current_score(old_score, now), 1.0, places=6
+        )
+        self.assertAlmostEqual(
+            trending.current_score(recent_score, now), 1.0, places=6
+        )
+
+    def test_trending_orders_by_activity_without_scanning_votes(self):
+        """
+        Test that the endpoint ranks polls by activity, hides deleted polls
+        and serves repeated requests from memory.
+        """
+        now = timezone.now().timestamp()
+        for votes, poll in zip((1, 3, 2), self.polls):
+            for _ in range(votes):
+                trending.record_vote(poll["id"], at=now)
+        Poll.objects.filter(pk=self.polls[2]["id"]).update(is_deleted=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [poll["id"] for poll in response.data],
+            [self.polls[1]["id"], self.polls[0]["id"]],
+        )
+        self.assertEqual(response.data[0]["title"], "Trending Poll 1")
+        self.assertAlmostEqual(response.data[0]["score"], 3.0, places=2)
+        self.assertFalse(
+            any("polls_vote" in query["sql"] for query in queries)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"limit": 1})
+        self.assertEqual(len(response.data), 1)
+        self.assertFalse(
+            any(
+                "polls_poll" in query["sql"]
+                or "polls_polltrend" in query["sql"]
+                for query in queries
+            )
+        )
+
+
+class MyVoteTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the per-user 'my_vote' field and the MyVotesView endpoint.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.polls = [
+            self.create_poll(
+                {
+                    "title": f"My Vote Poll {i}",
+                    "description": "Poll for my_vote testing.",
+                    "options": [
+                        {"option_text": "Option 1"},
+                        {"option_text": "Option 2"},
+                    ],
+                    "poll_type": "single_choice",
+                    "settings": {},
+                }
+            )
+            for i in range(3)
+        ]
+
+    def test_list_and_retrieve_include_my_vote(self):
+        """
+        Test that polls carry the requesting user's option, or null, from
+        a single vote lookup.
+        """
+        voted = self.polls[1]
+        option_id = voted["options"][1]["id"]
+        self.vote_on_poll(voted["id"], option_id)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("poll-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        my_votes = {poll["id"]: poll["my_vote"] for poll in response.data}
+        self.assertEqual(
+            my_votes,
+            {
+                self.polls[0]["id"]: None,
+                voted["id"]: option_id,
+                self.polls[2]["id"]: None,
+            },
+        )
+        self.assertEqual(
+            len([query for query in queries if "polls_vote" in query["sql"]]),
+            1,
+        )
+
+        response = self.client.get(
+            reverse("poll-detail", kwargs={"pk": voted["id"]})
+        )
+        self.assertEqual(response.data["my_vote"], option_id)
+
+        self.authenticate_client(
+            User.objects.create_user(
+                username="other", email="other@example.com", password="pw"
+            )
+        )
+        response = self.client.get(
+            reverse("poll-detail", kwargs={"pk": voted["id"]})
+        )
+        self.assertIsNone(response.data["my_vote"])
+
+    def test_my_vote_in_sparse_fieldset(self):
+        """
+        Test that my_vote is only returned when listed in ?fields=.
+        """
+        self.vote_on_poll(
+            self.polls[0]["id"], self.polls[0]["options"][0]["id"]
+        )
+        response = self.client.get(reverse("poll-list"), {"fields": "title"})
+        self.assertEqual(list(response.data[0]), ["title"])
+        response = self.client.get(
+            reverse("poll-list"), {"fields": "title,my_vote"}
+        )
+        self.assertEqual(list(response.data[0]), ["title", "my_vote"])
+        self.assertEqual(
+            response.data[0]["my_vote"], self.polls[0]["options"][0]["id"]
+        )
+
+    def test_my_votes_keyset_pagination(self):
+        """
+        Test that /me/votes/ pages through the user's votes newest first.
+        """
+        for poll in self.polls:
+            self.vote_on_poll(poll["id"], poll["options"][0]["id"])
+        url = reverse("my-votes")
+
+        seen = []
+        response = self.client.get(url, {"limit": 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(response.data["results"])
+            if response.data["next"] is None:
+                break
+            response = self.client.get(
+                url, {"limit": 2, "cursor": response.data["next"]}
+            )
+        self.assertEqual(
+            [vote["poll"] for vote in seen],
+            [poll["id"] for poll in reversed(self.polls)],
+        )
+        self.assertEqual(seen[0]["poll_title"], "My Vote Poll 2")
+        self.assertEqual(seen[0]["option_text"], "Option 1")
+
+        response = self.client.get(url, {"cursor": "e30"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PollBatchResultsViewTests(
+    BaseIntegrationTest, APITestMixin, APITestCase
+):
+    """
+    Tests for the PollBatchResultsView API endpoint.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.test_user = self.authenticate_client()
+        self.url = reverse("poll-batch-results")
+        self.polls = [
+            self.create_poll(
+                {
+                    "title": f"Batch Poll {i}",
+                    "description": "Poll for batch results testing.",
+                    "options": [
+                        {"option_text": "Option 1"},
+                        {"option_text": "Option 2"},
+                    ],
+                    "poll_type": "single_choice",
+                    "settings": {},
+                }
+            )
+            for i in range(3)
+        ]
+        self.vote_on_poll(
+            self.polls[0]["id"], self.polls[0]["options"][1]["id"]
+        )
+
+    def get_batch(self, ids):
+        response = self.client.get(
+            self.url, {"ids": ",".join(str(poll_id) for poll_id in ids)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["results"]
+
+    def test_batch_matches_single_results_in_one_query(self):
+        """
+        Test that batch results equal per-poll results and are aggregated
+        with one query, then served from the cache.
+        """
+        ids = [poll["id"] for poll in self.polls]
+        with CaptureQueriesContext(connection) as queries:
+            entries = self.get_batch(ids)
+        self.assertEqual([entry["poll_id"] for entry in entries], ids)
+        self.assertEqual(
+            len([query for query in queries if "polls_vote" in query["sql"]]),
+            1,
+        )
+        for entry in entries:
+            self.assertEqual(entry.pop("status"), "ok")
+            self.assertEqual(entry, self.get_poll_results(entry["poll_id"]))
+        self.assertEqual(entries[0]["results"][1]["vote_count"], 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_batch(ids)
+        self.assertFalse(
+            any("polls_vote" in query["sql"] for query in queries)
+        )
+
+    def test_batch_results_follow_new_votes(self):
+        """
+        Test that a vote invalidates the cached batch entry of its poll.
+        """
+        poll = self.polls[1]
+        self.get_batch([poll["id"]])
+        self.vote_on_poll(poll["id"], poll["options"][0]["id"])
+        entry = self.get_batch([poll["id"]])[0]
+        self.assertEqual(entry["results"][0]["vote_count"], 1)
+
+    def test_batch_reports_missing_deleted_and_forbidden(self):
+        """
+        Test that unreadable polls get a per-poll status.
+        """
+        deleted, forbidden, ok = self.polls
+        Poll.objects.filter(pk=deleted["id"]).update(is_deleted=True)
+
+        def check_object_permissions(view, request, obj):
+            if obj.id == forbidden["id"]:
+                raise PermissionDenied
+
+        with patch(
+            "polls.views.PollBatchResultsView.check_object_permissions",
+            check_object_permissions,
+        ):
+            entries = self.get_batch(
+                [deleted["id"], forbidden["id"], 999999, ok["id"]]
+            )
+        self.assertEqual(
+            [entry["status"] for entry in entries],
+            ["deleted", "forbidden", "not_found", "ok"],
+        )
+        self.assertEqual(
+            entries[2], {"poll_id": 999999, "status": "not_found"}
+        )
+
+    def test_batch_rejects_bad_ids(self):
+        """
+        Test that malformed, empty or too many ids are a 400.
+        """
+        for ids in ("", "1,x", ",".join(str(i) for i in range(1, 60))):
+            response = self.client.get(self.url, {"ids": ids})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IdempotencyKeyTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for Idempotency-Key handling on vote and poll creation.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.poll_data = {
+            "title": "Idempotent Poll",
+            "description": "Poll for idempotency testing.",
+            "options": [
+                {"option_text": "Option 1"},
+                {"option_text": "Option 2"},
+            ],
+            "poll_type": "single_choice",
+            "settings": {},
+        }
+
+    def post(self, url, data, key):
+        return self.client.post(
+            url, data, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retried_poll_create_replays_first_response(self):
+        """
+        Test that a retried create returns the same poll without creating
+        another one.
+        """
+        url = reverse("poll-list")
+        first = self.post(url, self.poll_data, "create-1")
+        retry = self.post(url, self.poll_data, "create-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Poll.objects.count(), 1)
+
+        other = self.post(url, self.poll_data, "create-2")
+        self.assertEqual(other.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Poll.objects.count(), 2)
+
+    def test_retried_vote_replays_first_response(self):
+        """
+        Test that a retried vote gets the original 201 instead of the
+        duplicate-vote error.
+        """
+        poll = self.create_poll(self.poll_data)
+        vote = {"poll": poll["id"], "option": poll["options"][0]["id"]}
+        first = self.post(reverse("vote"), vote, "vote-1")
+        retry = self.post(reverse("vote"), vote, "vote-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Vote.objects.count(), 1)
+
+        again = self.post(reverse("vote"), vote, "vote-2")
+        self.assertEqual(again.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_key_reused_for_different_request(self):
+        """
+        Test that reusing a key with another body is rejected.
+        """
+        url = reverse("poll-list")
+        self.post(url, self.poll_data, "reused")
+        response = self.post(
+            url, {**self.poll_data, "title": "Other"}, "reused"
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(Poll.objects.count(), 1)
+
+    def test_expired_key_runs_again_and_is_purged(self):
+        """
+        Test that an expired key no longer replays and is purged.
+        """
+        url = reverse("poll-list")
+        self.post(url, self.poll_data, "expiring")
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        response = self.post(url, self.poll_data, "expiring")
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(Poll.objects.count(), 2)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        call_command("purge_idempotency_keys", stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_vote_side_effects_wait_for_commit(self):
+        """
+        Test that a keyed vote bumps the poll version only once its
+        transaction commits, so results read before then are not cached
+        under the new version.
+        """
+        poll = self.create_poll(self.poll_data)
+        vote = {"poll": poll["id"], "option": poll["options"][0]["id"]}
+        version = get_poll_version(poll["id"])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(reverse("vote"), vote, "vote-commit")
+            self.assertEqual(get_poll_version(poll["id"]), version)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(get_poll_version(poll["id"]), version)
+        results = self.get_poll_results(poll["id"])
+        self.assertEqual(results["results"][0]["vote_count"], 1)
+
+
+class JobQueueTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the background job queue, runworker and JobStatusView.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.calls = []
+
+        @jobs.job_handler("test_flaky")
+        def flaky(job):
+            self.calls.append(job.attempts)
+            jobs.report_progress(job, 0.5, "Half way")
+            if job.attempts < job.payload["succeed_on"]:
+                raise RuntimeError("Transient failure")
+            return {"attempts": job.attempts}
+
+        self.addCleanup(jobs.HANDLERS.pop, "test_flaky")
+
+    def run_worker(self):
+        call_command("runworker", processes=1, burst=True, stdout=StringIO())
+
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+    def test_recount_job_succeeds(self):
+        """
+        Test that runworker runs a queued recount and stores its result.
+        """
+        poll = self.create_poll(
+            {
+                "title": "Job Poll",
+                "description": "Poll for job testing.",
+                "options": [{"option_text": "Option 1"}],
+                "poll_type": "single_choice",
+                "settings": {},
+            }
+        )
+        self.vote_on_poll(poll["id"], poll["options"][0]["id"])
+        job = jobs.enqueue(
+            "recount_poll", {"poll_id": poll["id"]}, user=self.test_user
+        )
+        self.run_worker()
+
+        response = self.client.get(
+            reverse("job-status", kwargs={"pk": job.pk})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], Job.SUCCEEDED)
+        self.assertEqual(response.data["progress"], 1.0)
+        self.assertEqual(
+            response.data["result"]["results"][0]["vote_count"], 1
+        )
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """
+        Test that a failing job is requeued for later, then succeeds.
+        """
+        job = jobs.enqueue("test_flaky", {"succeed_on": 2})
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.progress, 0.5)
+        self.assertIn("Transient failure", job.error)
+        self.assertGreater(job.run_after, timezone.now())
+
+        self.run_worker()
+        self.assertEqual(self.calls, [1])
+
+        self.make_due(job)
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {"attempts": 2})
+        self.assertEqual(job.error, "")
+
+    def test_job_fails_after_max_attempts(self):
+        """
+        Test that a job stops being retried after max_attempts, and that
+        unknown kinds fail at once.
+        """
+        job = jobs.enqueue("test_flaky", {"succeed_on": 5}, max_attempts=2)
+        self.run_worker()
+        self.make_due(job)
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(self.calls, [1, 2])
+
+        unknown = jobs.enqueue("no_such_kind")
+        self.run_worker()
+        unknown.refresh_from_db()
+        self.assertEqual(unknown.status, Job.FAILED)
+        self.assertEqual(unknown.attempts, 1)
+
+    def test_expired_lease_is_reclaimed(self):
+        """
+        Test that a running job whose worker vanished is claimed again.
+        """
+        job = jobs.enqueue("test_flaky", {"succeed_on": 1})
+        self.assertEqual(jobs.claim_job("dead-worker").pk, job.pk)
+        self.assertIsNone(jobs.claim_job("other-worker"))
+
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now()
+            - timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+        )
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+
+    def test_expired_lease_on_last_attempt_fails_the_job(self):
+        """
+        Test that a job that kept losing its worker is not claimed again
+        once it has used up its attempts.
+        """
+        job = jobs.enqueue("test_flaky", {"succeed_on": 1}, max_attempts=2)
+        for worker_id in ("first-worker", "second-worker"):
+            self.assertEqual(jobs.claim_job(worker_id).pk, job.pk)
+            Job.objects.filter(pk=job.pk).update(
+                locked_at=timezone.now()
+                - timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+            )
+        self.assertIsNone(jobs.claim_job("third-worker"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("lease expired", job.error)
+        self.assertEqual(self.calls, [])
+
+    @override_settings(JOB_LEASE_SECONDS=0.3)
+    def test_heartbeat_renews_lease_of_silent_handler(self):
+        """
+        Test that the lease of a handler that never reports progress is
+        renewed while it runs.
+        """
+        renewals = []
+
+        @jobs.job_handler("test_silent")
+        def silent(job):
+            time.sleep(0.35)
+
+        self.addCleanup(jobs.HANDLERS.pop, "test_silent")
+        jobs.enqueue("test_silent")
+        job = jobs.claim_job("silent-worker")
+        with patch(
+            "polls.jobs.renew_lease",
+            lambda job: renewals.append(job.pk) or True,
+        ):
+            self.assertTrue(jobs.run_job(job))
+        self.assertGreaterEqual(len(renewals), 2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+
+    def test_lost_lease_stops_the_handler(self):
+        """
+        Test that reporting progress on a job another worker took over
+        raises, and that the first worker records no outcome.
+        """
+        job = jobs.enqueue("test_flaky", {"succeed_on": 1})
+        claimed = jobs.claim_job("stalled-worker")
+        Job.objects.filter(pk=job.pk).update(locked_by="other-worker")
+        with self.assertRaises(jobs.LeaseLost):
+            jobs.report_progress(claimed, 0.5)
+
+        self.assertFalse(jobs.run_job(claimed))
+        self.assertEqual(self.calls, [1])
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.locked_by), (Job.RUNNING, "other-worker")
+        )
+
+    def test_job_status_hidden_from_other_users(self):
+        """
+        Test that users cannot follow jobs queued by someone else.
+        """
+        job = jobs.enqueue("test_flaky", {"succeed_on": 1})
+        response = self.client.get(
+            reverse("job-status", kwargs={"pk": job.pk})
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ReconcileTalliesTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the reconcile_tallies management command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.polls = [
+            self.create_poll(
+                {
+                    "title": f"Reconcile Poll {i}",
+                    "description": "Poll for reconciliation testing.",
+                    "options": [
+                        {"option_text": "Option 1"},
+                        {"option_text": "Option 2"},
+                    ],
+                    "poll_type": "single_choice",
+                    "settings": {},
+                }
+            )
+            for i in range(3)
+        ]
+        for poll in self.polls:
+            self.vote_on_poll(poll["id"], poll["options"][0]["id"])
+            self.get_poll_results(poll["id"])
+
+    def reconcile(self, *args):
+        out = StringIO()
+        call_command("reconcile_tallies", "--processes=1", *args, stdout=out)
+        return out.getvalue()
+
+    def corrupt_cached_results(self, poll):
+        key = poll_cache_key("results", poll["id"])
+        cached = cache.get(key)
+        cached["results"][0]["vote_count"] = 7
+        cache.set(key, cached)
+
+    def test_consistent_tallies(self):
+        """
+        Test that a clean database and cache report no drift.
+        """
+        output = self.reconcile("--chunk-size=2")
+        self.assertIn("Checked 3 polls and 3 votes: 0 drifted", output)
+
+    def test_drift_is_reported_then_fixed(self):
+        """
+        Test that drifted cached results fail the check and --fix repairs
+        them.
+        """
+        poll = self.polls[1]
+        self.corrupt_cached_results(poll)
+        with self.assertRaisesMessage(CommandError, "1 drifted"):
+            self.reconcile()
+
+        output = self.reconcile("--fix")
+        self.assertIn(f"Drift: poll {poll['id']} on 'default' (fixed)", output)
+        results = self.get_poll_results(poll["id"])
+        self.assertEqual(results["results"][0]["vote_count"], 1)
+        self.assertIn("0 drifted", self.reconcile())
+
+    def test_misplaced_votes_are_reported(self):
+        """
+        Test that votes pointing at another poll's option are reported.
+        """
+        voter = User.objects.create_user(
+            username="misplaced", email="misplaced@example.com", password="pw"
+        )
+        Vote.objects.create(
+            user=voter,
+            poll_id=self.polls[0]["id"],
+            option_id=self.polls[1]["options"][1]["id"],
+        )
+        output = self.reconcile()
+        self.assertIn("1 misplaced vote groups", output)
+
+    def test_resumes_from_checkpoint(self):
+        """
+        Test that chunks below the checkpoint's cursor are skipped, that
+        the checkpoint is removed after a complete run and that it cannot
+        be resumed with another chunk size.
+        """
+        first_id = self.polls[0]["id"]
+        state = {"chunk_size": 1, "cursor": {"default": first_id + 1}}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "reconcile.json")
+            with open(path, "w") as checkpoint:
+                json.dump(state, checkpoint)
+            self.corrupt_cached_results(self.polls[0])
+            output = self.reconcile("--chunk-size=1", f"--checkpoint={path}")
+            self.assertIn("Resuming: 1 chunks done, 2 left.", output)
+            self.assertIn("Checked 2 polls and 2 votes: 0 drifted", output)
+            self.assertFalse(os.path.exists(path))
+
+            with open(path, "w") as checkpoint:
+                json.dump(state, checkpoint)
+            with self.assertRaisesMessage(CommandError, "--chunk-size 1"):
+                self.reconcile("--chunk-size=2", f"--checkpoint={path}")
+
+    def test_checkpoint_holds_only_the_cursor(self):
+        """
+        Test that the checkpoint written after each chunk records how far
+        the check got rather than its findings.
+        """
+        saved = []
+        with patch(
+            "polls.management.commands.reconcile_tallies.Command."
+            "save_checkpoint",
+            lambda command, path, state: saved.append(json.dumps(state)),
+        ):
+            self.reconcile("--chunk-size=1", "--checkpoint=unused")
+        self.assertEqual(
+            json.loads(saved[-1]),
+            {
+                "chunk_size": 1,
+                "cursor": {"default": self.polls[-1]["id"] + 1},
+            },
+        )
+
+    def test_tally_store_drift_is_reported_then_fixed(self):
+        """
+        Test that counts in the tally store that differ from the votes fail
+        the check and --fix makes the store reload them.
+        """
+        with tempfile.TemporaryDirectory() as directory, self.settings(
+            TALLY_STORE_PATH=os.path.join(directory, "tallies"),
+            TALLY_STORE_SLOTS=64,
+        ):
+            poll = self.polls[2]
+            self.get_poll_results(poll["id"])
+            option_id = poll["options"][1]["id"]
+            tallies.count_vote(poll["id"], option_id, 10**9)
+            with self.assertRaisesMessage(
+                CommandError, "1 drifted in the tally store"
+            ):
+                self.reconcile()
+
+            output = self.reconcile("--fix")
+            self.assertIn(
+                f"Tally store drift: poll {poll['id']} on 'default' (fixed)",
+                output,
+            )
+            self.assertIn("0 drifted in the tally store", self.reconcile())
+            cache.clear()
+            results = self.get_poll_results(poll["id"])
+            self.assertEqual(results["results"][1]["vote_count"], 0)
+
+
+class SeedPollPulseTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the seed_pollpulse management command.
+    """
+
+    def seed(self, *args):
+        call_command(
+            "seed_pollpulse",
+            "--users=20",
+            "--polls=5",
+            "--votes=60",
+            "--options=3",
+            *args,
+            stdout=StringIO(),
+        )
+
+    def relative_votes(self, after_id):
+        """
+        Returns the new votes with ids made relative to the first new row.
+        """
+        votes = Vote.objects.filter(id__gt=after_id).order_by("id")
+        first = votes.values_list("user_id", "poll_id", "option_id").first()
+        return [
+            (user - first[0], poll - first[1], option - first[2])
+            for user, poll, option in votes.values_list(
+                "user_id", "poll_id", "option_id"
+            )
+        ]
+
+    def test_seed_writes_every_required_column(self):
+        """
+        Test that the COPY column lists cover every NOT NULL column, which
+        has no database default after its migration.
+        """
+        for model, columns in SEED_COLUMNS.items():
+            required = {
+                field.column
+                for field in model._meta.concrete_fields
+                if not field.null
+            }
+            self.assertEqual(required - set(columns), set(), model.__name__)
+
+    def test_seed_creates_consistent_data(self):
+        """
+        Test that seeding creates the requested rows with valid votes.
+        """
+        self.seed("--skew=zipf", "--seed=1")
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Poll.objects.count(), 5)
+        self.assertEqual(Vote.objects.count(), 60)
+        self.assertFalse(
+            Vote.objects.exclude(option__poll_id=F("poll_id")).exists()
+        )
+        per_poll = sorted(
+            Poll.objects.annotate(votes_count=Count("votes")).values_list(
+                "votes_count", flat=True
+            )
+        )
+        self.assertLessEqual(per_poll[-1], 20)
+        self.assertGreater(per_poll[-1], per_poll[0])
+        self.assertEqual(
+            list(
+                Option.objects.filter(poll=Poll.objects.first()).values_list(
+                    "option_order", flat=True
+                )
+            ),
+            [0, 1, 2],
+        )
+
+    def test_seed_is_deterministic(self):
+        """
+        Test that the same seed produces the same votes.
+        """
+        self.seed("--seed=7")
+        first_run = self.relative_votes(0)
+        last_id = Vote.objects.order_by("-id").values_list("id", flat=True)[0]
+        self.seed("--seed=7")
+        self.assertEqual(self.relative_votes(last_id), first_run)
+
+    def test_seed_rejects_impossible_vote_counts(self):
+        """
+        Test that more votes than user x poll pairs are rejected.
+        """
+        with self.assertRaisesMessage(CommandError, "do not fit"):
+            self.seed("--votes=101")
+
+
+class ExportColumnarTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the export_columnar management command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+        call_command(
+            "seed_pollpulse",
+            "--users=10",
+            "--polls=3",
+            "--votes=20",
+            "--options=2",
+            stdout=StringIO(),
+        )
+
+    def export(self, *args):
+        call_command(
+            "export_columnar",
+            self.output,
+            "--settle-seconds=0",
+            "--chunk-size=7",
+            *args,
+            stdout=StringIO(),
+        )
+        with open(os.path.join(self.output, "manifest.json")) as manifest:
+            return json.load(manifest)
+
+    def column(self, table, column, typecode="q"):
+        values = array(typecode)
+        path = os.path.join(self.output, table, f"{column}.bin")
+        with open(path, "rb") as column_file:
+            values.frombytes(column_file.read())
+        if sys.byteorder != "little":
+            values.byteswap()
+        return list(values)
+
+    def test_export_writes_typed_columns(self):
+        """
+        Test that every vote and option lands in its column files.
+        """
+        manifest = self.export()
+        votes = Vote.objects.order_by("id")
+        self.assertEqual(manifest["tables"]["votes"]["rows"], 20)
+        self.assertEqual(
+            manifest["tables"]["votes"]["columns"]["option_id"], "<i8"
+        )
+        self.assertEqual(
+            self.column("votes", "id"),
+            list(votes.values_list("id", flat=True)),
+        )
+        self.assertEqual(
+            self.column("votes", "option_id"),
+            list(votes.values_list("option_id", flat=True)),
+        )
+        first = votes.first()
+        self.assertEqual(
+            self.column("votes", "created_at")[0],
+            round(first.created_at.timestamp() * 10**6),
+        )
+
+        with open(
+            os.path.join(self.output, "options", "option_text.dict.json")
+        ) as dictionary:
+            texts = json.load(dictionary)
+        self.assertEqual(texts, ["Option 1", "Option 2"])
+        self.assertEqual(
+            [
+                texts[code]
+                for code in self.column("options", "option_text", "i")
+            ],
+            list(
+                Option.objects.order_by("id").values_list(
+                    "option_text", flat=True
+                )
+            ),
+        )
+        self.assertEqual(self.column("polls", "is_deleted", "b"), [0, 0, 0])
+
+    def test_export_appends_only_new_rows(self):
+        """
+        Test that a second run appends rows above the watermark.
+        """
+        self.export()
+        with open(os.path.join(self.output, "votes", "id.bin"), "ab") as f:
+            f.write(b"\xff" * 8)  # leftover of an interrupted run
+        voter = User.objects.create_user(username="late", password="x")
+        poll = Poll.objects.order_by("id").first()
+        Vote.objects.create(
+            user=voter, poll=poll, option=poll.options.order_by("id").first()
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            manifest = self.export()
+        self.assertEqual(manifest["tables"]["votes"]["rows"], 21)
+        self.assertEqual(
+            self.column("votes", "id"),
+            list(Vote.objects.order_by("id").values_list("id", flat=True)),
+        )
+        self.assertEqual(self.column("votes", "user_id")[-1], voter.id)
+        self.assertFalse(
+            any("OFFSET" in query["sql"] for query in queries.captured_queries)
+        )
+
+        manifest = self.export("--full")
+        self.assertEqual(manifest["tables"]["votes"]["rows"], 21)
+        self.assertEqual(len(self.column("votes", "poll_id")), 21)
+
+    def test_dictionary_is_written_once_per_run(self):
+        """
+        Test that dictionary values are appended chunk by chunk and the
+        dictionary file is written once, past an interrupted run's
+        leftovers.
+        """
+        for option in Option.objects.all():
+            Option.objects.filter(pk=option.pk).update(
+                option_text=f"Text {option.pk}"
+            )
+        with patch.object(
+            ColumnarExport,
+            "write_json",
+            autospec=True,
+            side_effect=ColumnarExport.write_json,
+        ) as write_json:
+            self.export("--chunk-size=2")
+        self.assertEqual(
+            [
+                call.args[1]
+                for call in write_json.call_args_list
+                if call.args[1].endswith(".dict.json")
+            ],
+            [os.path.join(self.output, "options", "option_text.dict.json")],
+        )
+
+        log = os.path.join(self.output, "options", "option_text.dict.jsonl")
+        with open(log, "a") as leftovers:
+            leftovers.write('"Leftover"\n')
+        poll = Poll.objects.order_by("id").first()
+        Option.objects.create(poll=poll, option_text="Late", option_order=9)
+        self.export("--chunk-size=2")
+        texts = list(
+            Option.objects.order_by("id").values_list("option_text", flat=True)
+        )
+        with open(log) as values:
+            self.assertEqual([json.loads(line) for line in values], texts)
+        with open(
+            os.path.join(self.output, "options", "option_text.dict.json")
+        ) as dictionary:
+            self.assertEqual(json.load(dictionary), texts)
+        self.assertEqual(
+            self.column("options", "option_text", "i"), list(range(7))
+        )
+
+
+class PollCrosstabViewTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for PollCrosstabView API endpoint.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.polls = [
+            self.create_poll(
+                {
+                    "title": f"Crosstab Poll {i}",
+                    "description": "Poll for crosstab testing.",
+                    "options": [
+                        {"option_text": f"Poll {i} Option 1"},
+                        {"option_text": f"Poll {i} Option 2"},
+                    ],
+                    "poll_type": "single_choice",
+                    "settings": {},
+                }
+            )
+            for i in range(2)
+        ]
+        self.url = reverse(
+            "poll-crosstab",
+            kwargs={
+                "pk": self.polls[0]["id"],
+                "other_pk": self.polls[1]["id"],
+            },
+        )
+
+    def cast_votes(self, choices):
+        """
+        Creates one voter per ``(option of poll 0, option of poll 1)``
+        choice; None skips voting on that poll.
+        """
+        for i, picks in enumerate(choices):
+            voter = User.objects.create_user(
+                username=f"crosstab-voter-{i}",
+                email=f"crosstab-voter-{i}@example.com",
+                password="testpassword",
+            )
+            for poll, pick in zip(self.polls, picks):
+                if pick is not None:
+                    Vote.objects.create(
+                        user=voter,
+                        poll_id=poll["id"],
+                        option_id=poll["options"][pick]["id"],
+                    )
+
+    @override_settings(BREAKDOWN_MIN_CELL_SIZE=1, CROSSTAB_CHUNK_SIZE=2)
+    def test_crosstab_counts_shared_voters(self):
+        """
+        Test the option x option matrix over voters of both polls.
+        """
+        self.cast_votes(
+            [(0, 0), (0, 1), (0, 1), (1, 1), (1, None), (None, 0), (0, 0)]
+        )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["counts"], [[2, 2], [0, 1]])
+        self.assertEqual(response.data["voters"], 5)
+        self.assertEqual(
+            [option["option_text"] for option in response.data["options"]],
+            ["Poll 0 Option 1", "Poll 0 Option 2"],
+        )
+        self.assertEqual(
+            [option["id"] for option in response.data["other_options"]],
+            [option["id"] for option in self.polls[1]["options"]],
+        )
+
+    @override_settings(BREAKDOWN_MIN_CELL_SIZE=2)
+    def test_crosstab_suppresses_small_cells(self):
+        """
+        Test that cells below the minimum cell size are returned as null.
+        """
+        self.cast_votes([(0, 0), (0, 0), (1, 0)])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["counts"], [[2, 0], [None, 0]])
+
+    @override_settings(BREAKDOWN_MIN_CELL_SIZE=1)
+    def test_crosstab_invalidated_by_vote_on_either_poll(self):
+        """
+        Test that the cached matrix follows the versions of both polls.
+        """
+        self.cast_votes([(0, None)])
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["counts"], [[0, 0], [0, 0]])
+
+        Vote.objects.create(
+            user=User.objects.get(username="crosstab-voter-0"),
+            poll_id=self.polls[1]["id"],
+            option_id=self.polls[1]["options"][1]["id"],
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["counts"], [[0, 0], [0, 0]])
+
+        bump_poll_version(self.polls[1]["id"])
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["counts"], [[0, 1], [0, 0]])
+
+    def test_crosstab_unknown_poll(self):
+        """
+        Test cross-tabulating against a poll that does not exist.
+        """
+        response = self.client.get(
+            reverse(
+                "poll-crosstab",
+                kwargs={"pk": self.polls[0]["id"], "other_pk": 999999},
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SingleFlightTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for coalesced and stale-while-revalidate cache fills.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.poll = self.create_poll(
+            {
+                "title": "Single Flight Poll",
+                "description": "Poll for cache fill testing.",
+                "options": [
+                    {"option_text": "Option 1"},
+                    {"option_text": "Option 2"},
+                ],
+                "poll_type": "single_choice",
+                "settings": {},
+            }
+        )
+        self.voter = User.objects.create_user(
+            username="flight-voter",
+            email="flight-voter@example.com",
+            password="testpassword",
+        )
+
+    def test_concurrent_misses_share_one_computation(self):
+        """
+        Test that threads missing the same key wait for one computation.
+        """
+        flight = SingleFlight("test")
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(flight.get("key", compute, 60))
+        )
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(
+                target=lambda: results.append(flight.get("key", compute, 60))
+            )
+            for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        time.sleep(0.2)  # let the followers find the running call
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(results, ["value"] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats()["misses"], 1)
+        self.assertEqual(flight.stats()["coalesced"], 3)
+        self.assertEqual(flight.get("key", compute, 60), "value")
+        self.assertEqual(flight.stats()["hits"], 1)
+
+    def vote(self):
+        Vote.objects.create(
+            user=self.voter,
+            poll_id=self.poll["id"],
+            option_id=self.poll["options"][0]["id"],
+        )
+        bump_poll_version(self.poll["id"])
+
+    def first_count(self):
+        return self.get_poll_results(self.poll["id"])["results"][0][
+            "vote_count"
+        ]
+
+    @patch("polls.singleflight.run_in_background", lambda func: func())
+    def test_results_served_stale_while_refreshing(self):
+        """
+        Test that results just invalidated are served stale once while
+        they are recomputed.
+        """
+        # The poll's author wrote recently and always reads fresh results.
+        self.authenticate_client(self.voter)
+        self.assertEqual(self.first_count(), 0)
+        self.vote()
+        self.assertEqual(self.first_count(), 0)
+        self.assertEqual(self.first_count(), 1)
+
+    @override_settings(RESULTS_STALE_SECONDS=0)
+    def test_results_not_stale_without_window(self):
+        """
+        Test that results are recomputed at once without a stale window.
+        """
+        self.assertEqual(self.first_count(), 0)
+        self.vote()
+        self.assertEqual(self.first_count(), 1)
+
+    def test_results_fresh_for_voter(self):
+        """
+        Test that a user who just voted never gets stale results.
+        """
+        self.assertEqual(self.first_count(), 0)
+        self.vote_on_poll(self.poll["id"], self.poll["options"][0]["id"])
+        self.assertEqual(self.first_count(), 1)
+
+    def test_list_cached_until_poll_changes(self):
+        """
+        Test that list pages are cached, keep per-user votes and are
+        invalidated by poll changes.
+        """
+        self.client.get("/api/v1/polls/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/polls/")
+        self.assertFalse(
+            any("polls_option" in q["sql"] for q in queries.captured_queries)
+        )
+        self.assertIsNone(response.data[0]["my_vote"])
+
+        self.vote_on_poll(self.poll["id"], self.poll["options"][1]["id"])
+        response = self.client.get("/api/v1/polls/")
+        self.assertEqual(
+            response.data[0]["my_vote"], self.poll["options"][1]["id"]
+        )
+
+        self.client.delete(f"/api/v1/polls/{self.poll['id']}/")
+        response = self.client.get("/api/v1/polls/", {"is_deleted": False})
+        self.assertEqual(response.data, [])
+
+
+class PrerenderedPollTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for write-time rendered poll JSON.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.poll = self.create_poll(
+            {
+                "title": "Prerendered Poll",
+                "description": "Poll for pre-rendering testing.",
+                "options": [
+                    {"option_text": "Option 1"},
+                    {"option_text": "Option 2"},
+                ],
+                "poll_type": "single_choice",
+                "settings": {},
+            }
+        )
+        self.url = reverse("poll-detail", kwargs={"pk": self.poll["id"]})
+
+    def serialized(self):
+        return JSONRenderer().render(
+            PollSerializer(Poll.objects.get(pk=self.poll["id"])).data
+        )
+
+    def test_poll_rendered_on_write(self):
+        """
+        Test that creating and editing a poll stores the serializer's JSON.
+        """
+        poll = Poll.objects.get(pk=self.poll["id"])
+        self.assertEqual(poll.rendered_json.encode(), self.serialized())
+
+        response = self.client.patch(
+            self.url,
+            {"options": [{"option_text": "Only option"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        poll.refresh_from_db()
+        self.assertEqual(poll.rendered_json.encode(), self.serialized())
+        self.assertIn("Only option", poll.rendered_json)
+
+    def test_retrieve_returns_rendered_bytes(self):
+        """
+        Test that a detail read returns the stored JSON with my_vote.
+        """
+        option_id = self.poll["options"][1]["id"]
+        self.vote_on_poll(self.poll["id"], option_id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response.content,
+            self.serialized()[:-1] + f',"my_vote":{option_id}}}'.encode(),
+        )
+        self.assertFalse(
+            any("polls_option" in q["sql"] for q in queries.captured_queries)
+        )
+
+        response = self.client.get(self.url, HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, "Prerendered Poll")
+
+    def test_rebuild_poll_json(self):
+        """
+        Test that the rebuild command renders polls written around the API.
+        """
+        Poll.objects.update(rendered_json=None, title="Renamed")
+        response = self.client.get("/api/v1/polls/")
+        self.assertEqual(response.data[0]["title"], "Renamed")
+
+        call_command("rebuild_poll_json", "--missing", stdout=StringIO())
+        poll = Poll.objects.get(pk=self.poll["id"])
+        self.assertEqual(poll.rendered_json.encode(), self.serialized())
+
+
+class VoteLogTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the append-only vote log and the vote_log command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        log_settings = self.settings(VOTE_LOG_DIR=self.directory)
+        log_settings.enable()
+        self.addCleanup(log_settings.disable)
+        self.writer = votelog.VoteLogWriter(self.directory)
+        self.addCleanup(self.writer.close)
+        writer_patch = patch.object(votelog, "writer", self.writer)
+        writer_patch.start()
+        self.addCleanup(writer_patch.stop)
+
+        self.author = self.authenticate_client()
+        self.poll = self.create_poll(
+            {
+                "title": "Logged Poll",
+                "description": "Poll with a vote log.",
+                "options": [{"option_text": "A"}, {"option_text": "B"}],
+                "poll_type": "single_choice",
+                "settings": {},
+            }
+        )
+        self.options = [option["id"] for option in self.poll["options"]]
+
+    def cast_votes(self, choices):
+        for index, choice in enumerate(choices):
+            self.authenticate_client(
+                User.objects.create_user(
+                    username=f"logged{index}",
+                    email=f"logged{index}@example.com",
+                    password="pw",
+                )
+            )
+            self.vote_on_poll(self.poll["id"], self.options[choice])
+        self.writer.close()
+
+    def pack(self, vote_id, option=0, user_id=1):
+        return votelog.pack(
+            vote_id,
+            self.poll["id"],
+            self.options[option],
+            user_id,
+            timezone.now(),
+        )
+
+    def test_votes_are_logged_after_commit(self):
+        """
+        Test that committed votes are logged and tally like the database.
+        """
+        self.cast_votes([0, 1, 1])
+        tallies = votelog.rebuild_tallies(self.directory)
+        self.assertEqual(
+            tallies,
+            {self.poll["id"]: {self.options[0]: 1, self.options[1]: 2}},
+        )
+        _, records, invalid, torn = next(votelog.read_log(self.directory))
+        vote = Vote.objects.order_by("id").first()
+        self.assertEqual((invalid, torn), (0, 0))
+        self.assertEqual(
+            records["vote_id"].tolist(),
+            list(Vote.objects.order_by("id").values_list("id", flat=True)),
+        )
+        self.assertEqual(votelog.record_datetimes(records)[0], vote.created_at)
+
+        out = StringIO()
+        call_command("vote_log", "tallies", stdout=out)
+        self.assertEqual(
+            json.loads(out.getvalue()),
+            {
+                str(self.poll["id"]): {
+                    str(self.options[0]): 1,
+                    str(self.options[1]): 2,
+                }
+            },
+        )
+
+    def test_rolled_back_votes_are_not_logged(self):
+        """
+        Test that a vote is only logged once its transaction commits.
+        """
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(
+                "/api/v1/vote/",
+                {"poll": self.poll["id"], "option": self.options[0]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(
+            votelog.writer.append_vote,
+            [callback.func for callback in callbacks],
+        )
+        self.writer.close()
+        self.assertEqual(votelog.segment_paths(self.directory), [])
+
+    def test_segments_rotate_and_fsyncs_are_batched(self):
+        """
+        Test append throughput, segment rotation and fsync batching.
+        """
+        writer = votelog.VoteLogWriter(
+            self.directory,
+            segment_records=5000,
+            fsync_records=500,
+            fsync_interval=60,
+        )
+        records = [self.pack(vote_id, vote_id % 2) for vote_id in range(20000)]
+        with patch("polls.votelog.os.fsync", wraps=os.fsync) as fsync:
+            started = time.perf_counter()
+            for start in range(0, len(records), 100):
+                writer.append(records[start : start + 100])
+            writer.close()
+            elapsed = time.perf_counter() - started
+
+        segments = votelog.segment_paths(self.directory)
+        self.assertEqual(len(segments), 4)
+        # One data fsync per 500 records plus the directory entry of each
+        # new segment, instead of one per append.
+        self.assertEqual(fsync.call_count, 20000 // 500 + len(segments))
+        self.assertLess(elapsed, 5)
+        self.assertEqual(
+            votelog.rebuild_tallies(self.directory),
+            {
+                self.poll["id"]: {
+                    self.options[0]: 10000,
+                    self.options[1]: 10000,
+                }
+            },
+        )
+
+    def test_torn_and_corrupt_records_are_skipped(self):
+        """
+        Test that records damaged by a crash are skipped and reported and a
+        restarted writer continues in a new segment.
+        """
+        writer = votelog.VoteLogWriter(self.directory)
+        writer.append([self.pack(vote_id) for vote_id in range(1, 11)])
+        writer.close()
+        [segment] = votelog.segment_paths(self.directory)
+        with open(segment, "r+b") as log:
+            log.seek(3 * votelog.RECORD.size + 20)
+            log.write(b"\xff")
+            log.seek(0, os.SEEK_END)
+            log.write(self.pack(11)[:20])
+
+        restarted = votelog.VoteLogWriter(self.directory)
+        restarted.append([self.pack(vote_id, 1) for vote_id in range(12, 15)])
+        restarted.close()
+
+        segments = list(votelog.read_log(self.directory))
+        self.assertEqual(len(segments), 2)
+        self.assertEqual(
+            [(len(r), invalid, torn) for _, r, invalid, torn in segments],
+            [(9, 1, 20), (3, 0, 0)],
+        )
+        self.assertNotIn(4, segments[0][1]["vote_id"].tolist())
+        self.assertEqual(
+            votelog.rebuild_tallies(self.directory),
+            {self.poll["id"]: {self.options[0]: 9, self.options[1]: 3}},
+        )
+        with self.assertRaisesMessage(CommandError, "1 corrupt"):
+            call_command("vote_log", "verify", stdout=StringIO())
+
+    def test_replay_restores_missing_votes(self):
+        """
+        Test that replaying the log restores deleted votes with their ids
+        and timestamps, and that replaying again inserts nothing.
+        """
+        self.cast_votes([0, 1, 0])
+        expected = list(
+            Vote.objects.order_by("id").values_list(
+                "id", "user_id", "option_id", "created_at"
+            )
+        )
+        Vote.objects.filter(id=expected[1][0]).delete()
+        Vote.objects.filter(id=expected[2][0]).delete()
+
+        out = StringIO()
+        call_command("vote_log", "replay", "--batch-size=2", stdout=out)
+        self.assertIn(
+            "Replayed 2 votes (1 already present, 0 of deleted",
+            out.getvalue(),
+        )
+        self.assertEqual(
+            list(
+                Vote.objects.order_by("id").values_list(
+                    "id", "user_id", "option_id", "created_at"
+                )
+            ),
+            expected,
+        )
+
+        out = StringIO()
+        call_command("vote_log", "replay", stdout=out)
+        self.assertIn(
+            "Replayed 0 votes (3 already present, 0 of deleted",
+            out.getvalue(),
+        )
+
+    def test_replay_skips_votes_of_deleted_polls_and_users(self):
+        """
+        Test that replay leaves out votes whose user or poll was deleted
+        instead of failing on their foreign keys.
+        """
+        self.cast_votes([0, 1, 0])
+        Vote.objects.all().delete()
+        User.objects.filter(username="logged1").delete()
+
+        out = StringIO()
+        call_command("vote_log", "replay", stdout=out)
+        self.assertIn(
+            "Replayed 2 votes (0 already present, 1 of deleted",
+            out.getvalue(),
+        )
+        self.assertEqual(
+            sorted(Vote.objects.values_list("user__username", flat=True)),
+            ["logged0", "logged2"],
+        )
+
+        Poll.objects.filter(pk=self.poll["id"]).delete()
+        out = StringIO()
+        call_command("vote_log", "replay", stdout=out)
+        self.assertIn(
+            "Replayed 0 votes (0 already present, 3 of deleted",
+            out.getvalue(),
+        )
+        self.assertFalse(Vote.objects.exists())
+
+
+def increment_tallies(poll_id, option_id, times):
+    store = tallies.get_store()
+    for vote_id in range(1, times + 1):
+        store.increment(poll_id, option_id, vote_id)
+
+
+class TallyStoreTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the shared-memory tally store.
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        store_settings = self.settings(
+            TALLY_STORE_PATH=os.path.join(directory, "tallies"),
+            TALLY_STORE_SLOTS=64,
+        )
+        store_settings.enable()
+        self.addCleanup(store_settings.disable)
+
+        self.authenticate_client()
+        self.poll = self.create_poll(
+            {
+                "title": "Shared Poll",
+                "description": "Poll counted in shared memory.",
+                "options": [
+                    {"option_text": "A"},
+                    {"option_text": "B"},
+                    {"option_text": "C"},
+                ],
+                "poll_type": "single_choice",
+                "settings": {},
+            }
+        )
+        self.options = [option["id"] for option in self.poll["options"]]
+        self.url = f"/api/v1/polls/{self.poll['id']}/results/"
+        self.voters = 0
+
+    def cast_votes(self, choices):
+        for choice in choices:
+            self.voters += 1
+            self.authenticate_client(
+                User.objects.create_user(
+                    username=f"shared{self.voters}",
+                    email=f"shared{self.voters}@example.com",
+                    password="pw",
+                )
+            )
+            self.vote_on_poll(self.poll["id"], self.options[choice])
+
+    def expected_results(self):
+        return compute_results([self.poll["id"]])[self.poll["id"]]
+
+    def test_results_are_read_from_shared_counts(self):
+        """
+        Test that results of a poll created through the API are served
+        from the shared counts, without counting votes in the database.
+        """
+        self.cast_votes([0, 1, 1])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, self.expected_results())
+        self.assertEqual(
+            [r["vote_count"] for r in response.data["results"]], [1, 2, 0]
+        )
+        self.assertFalse(
+            any("polls_vote" in q["sql"] for q in queries.captured_queries)
+        )
+
+    def test_increments_from_several_processes(self):
+        """
+        Test that concurrent increments by forked workers are all counted.
+        """
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(
+                target=increment_tallies,
+                args=(self.poll["id"], self.options[2], 500),
+            )
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(
+            tallies.get_store().poll_counts(self.poll["id"], self.options),
+            {self.options[0]: 0, self.options[1]: 0, self.options[2]: 2000},
+        )
+
+    def test_polls_written_around_the_api_are_loaded_on_read(self):
+        """
+        Test that a poll missing from the store is loaded from the
+        database on its first read and counted afterwards.
+        """
+        tallies.forget_polls([self.poll["id"]])
+        self.cast_votes([2])
+        voter = User.objects.create_user(
+            username="direct", email="direct@example.com", password="pw"
+        )
+        Vote.objects.create(
+            user=voter, poll_id=self.poll["id"], option_id=self.options[0]
+        )
+        store = tallies.get_store()
+        self.assertIsNone(store.poll_counts(self.poll["id"], self.options))
+
+        self.assertEqual(
+            self.client.get(self.url).data, self.expected_results()
+        )
+        self.cast_votes([0])
+        self.assertEqual(
+            store.poll_counts(self.poll["id"], self.options),
+            {self.options[0]: 2, self.options[1]: 0, self.options[2]: 1},
+        )
+
+    def test_votes_committed_during_a_load_are_counted_once(self):
+        """
+        Test that increments arriving while a poll loads count only the
+        votes the load leaves out.
+        """
+        self.cast_votes([0])
+        tallies.forget_polls([self.poll["id"]])
+        voters = [
+            User.objects.create_user(
+                username=f"loading{n}",
+                email=f"loading{n}@example.com",
+                password="pw",
+            )
+            for n in range(2)
+        ]
+        # Committed before the load; its increment arrives during it.
+        counted = Vote.objects.create(
+            user=voters[0], poll_id=self.poll["id"], option_id=self.options[1]
+        )
+
+        def compute(poll_ids, highest):
+            tallies.count_vote(self.poll["id"], self.options[1], counted.id)
+            # Committed after the watermark, so left to its increment.
+            late = Vote.objects.create(
+                user=voters[1],
+                poll_id=self.poll["id"],
+                option_id=self.options[2],
+            )
+            tallies.count_vote(self.poll["id"], self.options[2], late.id)
+            return tallies.vote_counts(poll_ids, "default", highest)
+
+        store = tallies.get_store()
+        store.load(
+            [self.poll["id"]],
+            compute,
+            lambda: tallies.highest_vote_id("default"),
+        )
+        tallies.count_vote(self.poll["id"], self.options[1], counted.id)
+        self.assertEqual(
+            store.poll_counts(self.poll["id"], self.options),
+            {self.options[0]: 1, self.options[1]: 1, self.options[2]: 1},
+        )
+
+    def test_forgetting_a_poll_leaves_the_others(self):
+        """
+        Test that dropping a poll frees exactly its own slots.
+        """
+        other = self.create_poll(
+            {
+                "title": "Other Poll",
+                "description": "Poll sharing the table.",
+                "options": [{"option_text": "X"}, {"option_text": "Y"}],
+                "poll_type": "single_choice",
+                "settings": {},
+            }
+        )
+        other_options = [option["id"] for option in other["options"]]
+        self.cast_votes([0, 1, 2])
+        store = tallies.get_store()
+        store.increment(other["id"], other_options[1], 1)
+        used = store.stats()["used"]
+
+        tallies.forget_polls([self.poll["id"]])
+        self.assertEqual(store.stats()["tombstones"], 4)
+        self.assertEqual(store.stats()["used"], used)
+        self.assertIsNone(store.poll_counts(self.poll["id"], self.options))
+        self.assertEqual(
+            store.poll_counts(other["id"], other_options),
+            {other_options[0]: 0, other_options[1]: 1},
+        )
+
+    def test_full_store_falls_back_to_the_database(self):
+        """
+        Test that a poll that does not fit is served from the database.
+        """
+        self.cast_votes([0, 1, 2])
+        with self.settings(
+            TALLY_STORE_PATH=f"{settings.TALLY_STORE_PATH}.small",
+            TALLY_STORE_SLOTS=4,
+        ):
+            response = self.client.get(self.url)
+            self.assertEqual(response.data, self.expected_results())
+            self.assertEqual(tallies.get_store().stats()["polls"], 0)
+
+    def test_warm_and_compact(self):
+        """
+        Test that warming loads live polls and compaction frees the slots
+        of deleted ones.
+        """
+        self.cast_votes([0, 1])
+        tallies.get_store().reset()
+        out = StringIO()
+        call_command("tally_store", "warm", stdout=out)
+        self.assertIn("Loaded 1 polls.", out.getvalue())
+        self.assertEqual(tallies.get_store().stats()["used"], 4)
+
+        Poll.objects.filter(pk=self.poll["id"]).update(is_deleted=True)
+        out = StringIO()
+        call_command("tally_store", "compact", stdout=out)
+        self.assertIn("Freed 4 slots.", out.getvalue())
+        self.assertEqual(
+            tallies.get_store().stats(),
+            {"slots": 64, "used": 0, "tombstones": 0, "polls": 0},
+        )
+
+
+@patch("polls.voterfilter.run_in_background", lambda func: func())
+class VoterFilterTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the per-poll voter Bloom filters of the vote endpoint.
+    """
+
+    def setUp(self):
+        super().setUp()
+        voter_filters.clear()
+        self.addCleanup(voter_filters.clear)
+        self.authenticate_client()
+        self.poll = self.create_poll(
+            {
+                "title": "Filtered Poll",
+                "description": "Poll behind a voter filter.",
+                "options": [{"option_text": "A"}, {"option_text": "B"}],
+                "poll_type": "single_choice",
+                "settings": {},
+            }
+        )
+        self.option_id = self.poll["options"][0]["id"]
+        self.voters = 0
+
+    def as_new_voter(self):
+        self.voters += 1
+        return self.authenticate_client(
+            User.objects.create_user(
+                username=f"filtered{self.voters}",
+                email=f"filtered{self.voters}@example.com",
+                password="pw",
+            )
+        )
+
+    def post_vote(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/v1/vote/",
+                {"poll": self.poll["id"], "option": self.option_id},
+                format="json",
+            )
+        return response, [
+            q["sql"]
+            for q in queries.captured_queries
+            if q["sql"].startswith("SELECT") and ' FROM "polls_' in q["sql"]
+        ]
+
+    def test_new_voters_skip_the_duplicate_check(self):
+        """
+        Test that once the poll's filter is built, new voters are not
+        looked up in the vote table.
+        """
+        self.as_new_voter()
+        self.vote_on_poll(self.poll["id"], self.option_id)
+        self.as_new_voter()
+        response, queries = self.post_vote()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(
+            any('FROM "polls_vote"' in sql for sql in queries), queries
+        )
+        self.assertEqual(voter_filters.stats()["skipped"], 1)
+
+    def test_repeated_vote_is_answered_from_the_vote_table(self):
+        """
+        Test that a repeated vote costs one query and no poll lookup.
+        """
+        self.as_new_voter()
+        self.vote_on_poll(self.poll["id"], self.option_id)
+        response, queries = self.post_vote()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(queries), 1, queries)
+        self.assertIn('FROM "polls_vote"', queries[0])
+
+    def test_duplicate_unknown_to_the_filter_is_rejected(self):
+        """
+        Test that a vote cast around this process is still rejected by the
+        unique constraint when the filter says the voter is new.
+        """
+        self.as_new_voter()
+        self.vote_on_poll(self.poll["id"], self.option_id)
+        user = self.as_new_voter()
+        Vote.objects.create(
+            user=user, poll_id=self.poll["id"], option_id=self.option_id
+        )
+        response, _ = self.post_vote()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["detail"], "User has already voted in this poll."
+        )
+        self.assertEqual(Vote.objects.filter(user=user).count(), 1)
+
+    def test_filter_has_no_false_negatives(self):
+        """
+        Test that a grown filter finds every key at about its error rate.
+        """
+        voters = ScalableBloomFilter(1000, 0.01)
+        voters.add(range(1, 50001))
+        self.assertGreater(len(voters.slices), 1)
+        self.assertTrue(all(user_id in voters for user_id in range(1, 50001)))
+        false_positives = sum(
+            user_id in voters for user_id in range(10**6, 10**6 + 20000)
+        )
+        self.assertLess(false_positives / 20000, 0.02)
+
+    @override_settings(VOTER_FILTER_MAX_BYTES=4096)
+    def test_filters_stay_within_their_memory_budget(self):
+        """
+        Test that the least recently used filters are dropped.
+        """
+        for poll_id in range(self.poll["id"], self.poll["id"] + 10):
+            voter_filters.might_have_voted(poll_id, 1)
+        stats = voter_filters.stats()
+        self.assertLessEqual(stats["bytes"], 4096)
+        self.assertEqual(stats["builds"], 10)
+        self.assertLess(stats["polls"], 10)
+
+    def test_dropped_filter_is_not_accounted(self):
+        """
+        Test that a filter dropped while it is being built neither counts
+        against the memory budget nor keeps being seeded.
+        """
+        self.as_new_voter()
+        self.vote_on_poll(self.poll["id"], self.option_id)
+        voter_filters.clear()
+        builds = []
+        with patch("polls.voterfilter.run_in_background", builds.append):
+            voter_filters.might_have_voted(self.poll["id"], 1)
+        voter_filters.clear()
+        builds[0]()
+        self.assertEqual(
+            voter_filters.stats(),
+            {"polls": 0, "bytes": 0, "skipped": 0, "checked": 0, "builds": 0},
+        )
+
+    def test_seeding_does_not_count_votes(self):
+        """
+        Test that building a filter reads the voters once, without a
+        separate COUNT query.
+        """
+        self.as_new_voter()
+        self.vote_on_poll(self.poll["id"], self.option_id)
+        voter_filters.clear()
+        with CaptureQueriesContext(connection) as queries:
+            voter_filters.might_have_voted(self.poll["id"], 1)
+        self.assertEqual(
+            [
+                q["sql"]
+                for q in queries.captured_queries
+                if "COUNT" in q["sql"]
+            ],
+            [],
+        )
+        self.assertFalse(voter_filters.might_have_voted(self.poll["id"], 1))
+
+
+class AdminTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the poll, option, vote and user admin.
+    """
+
+    def setUp(self):
+        super().setUp()
+        call_command(
+            "seed_pollpulse",
+            "--users=10",
+            "--polls=3",
+            "--votes=20",
+            "--options=2",
+            stdout=StringIO(),
+        )
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pw"
+        )
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.poll_ids = list(Poll.objects.values_list("id", flat=True))
+
+    def act(self, action, poll_ids):
+        return self.client.post(
+            "/admin/polls/poll/",
+            {"action": action, "_selected_action": poll_ids},
+            follow=True,
+        )
+
+    def test_changelists_fetch_related_rows_in_one_query(self):
+        """
+        Test that every change list renders without a query per row.
+        """
+        for model in ("poll", "option", "vote", "user"):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f"/admin/polls/{model}/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLess(len(queries), 10, model)
+        self.assertNotContains(response, "delete_selected")
+
+    def test_poll_page_counts_votes_in_one_query(self):
+        """
+        Test that the option inline shows vote counts from one aggregation.
+        """
+        poll_id = self.poll_ids[0]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/admin/polls/poll/{poll_id}/change/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = [
+            q["sql"]
+            for q in queries.captured_queries
+            if 'COUNT("polls_vote"' in q["sql"]
+        ]
+        self.assertEqual(len(counts), 1)
+        for option in Option.objects.filter(poll_id=poll_id).annotate(
+            votes_cast=Count("votes")
+        ):
+            self.assertContains(
+                response,
+                f'<td class="field-vote_count">'
+                f"<p>{option.votes_cast}</p></td>",
+                html=True,
+            )
+
+    def test_soft_delete_and_close_actions(self):
+        """
+        Test that bulk actions update the polls and invalidate list pages.
+        """
+        version = get_list_version()
+        self.act("soft_delete", self.poll_ids[:2])
+        self.assertEqual(
+            Poll.objects.filter(
+                is_deleted=True, deleted_at__isnull=False
+            ).count(),
+            2,
+        )
+        self.assertGreater(get_list_version(), version)
+
+        self.act("close", self.poll_ids)
+        self.assertFalse(Poll.objects.filter(expires_at__isnull=True).exists())
+        poll = Poll.objects.get(pk=self.poll_ids[2])
+        self.assertEqual(
+            json.loads(poll.rendered_json)["expires_at"],
+            poll.expires_at.isoformat().replace("+00:00", "Z"),
+        )
+
+    def test_recount_action_stores_fresh_results(self):
+        """
+        Test that recounting caches every selected poll's results.
+        """
+        response = self.act("recount", self.poll_ids)
+        self.assertContains(response, "Recounted 3 polls.")
+        for poll_id in self.poll_ids:
+            self.assertEqual(
+                cache.get(poll_cache_key("results", poll_id)),
+                compute_results([poll_id])[poll_id],
+            )
+
+    def test_cascading_deletes_are_disabled(self):
+        """
+        Test that polls and users cannot be hard deleted from the admin.
+        """
+        response = self.client.get(
+            f"/admin/polls/poll/{self.poll_ids[0]}/delete/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(
+            f"/admin/polls/user/{self.admin.id}/delete/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_option_inline_cannot_delete_options(self):
+        """
+        Test that the poll page offers no way to delete an option.
+        """
+        response = self.client.get(
+            f"/admin/polls/poll/{self.poll_ids[0]}/change/"
+        )
+        (formset,) = response.context["inline_admin_formsets"]
+        self.assertFalse(formset.formset.can_delete)
+        self.assertNotContains(response, "-DELETE")
+
+
+class ChunkedDeletionTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the chunked deletion of polls and users.
+    """
+
+    def setUp(self):
+        super().setUp()
+        call_command(
+            "seed_pollpulse",
+            "--users=20",
+            "--polls=3",
+            "--votes=50",
+            "--options=3",
+            stdout=StringIO(),
+        )
+        self.poll = Poll.objects.annotate(n=Count("votes")).latest("n")
+
+    def test_delete_poll_in_batches_without_loading_votes(self):
+        """
+        Test that a poll's votes are deleted in batches with progress and
+        without selecting vote rows.
+        """
+        votes = self.poll.votes.count()
+        reports = []
+        with CaptureQueriesContext(connection) as queries:
+            deleted = delete_poll(
+                self.poll.id,
+                batch_size=7,
+                report=lambda *args: reports.append(args),
+            )
+        self.assertEqual(deleted["Vote"], votes)
+        self.assertEqual(deleted["Option"], 3)
+        self.assertEqual(deleted["Poll"], 1)
+        self.assertFalse(Poll.objects.filter(pk=self.poll.id).exists())
+        self.assertFalse(Option.objects.filter(poll_id=self.poll.id).exists())
+        self.assertEqual(Vote.objects.count(), 50 - votes)
+
+        self.assertEqual(len(reports), -(-votes // 7))
+        self.assertEqual(reports[-1][:2], (votes, votes))
+        sql = [query["sql"] for query in queries.captured_queries]
+        self.assertFalse([s for s in sql if '"polls_vote"."created_at"' in s])
+        self.assertEqual(
+            len([s for s in sql if s.startswith('DELETE FROM "polls_vote"')]),
+            len(reports) + 1,
+        )
+
+    def test_delete_user_removes_polls_and_votes(self):
+        """
+        Test that deleting a user removes their polls and their votes
+        elsewhere, and refreshes the results of the polls they voted in.
+        """
+        owner = self.poll.user
+        voted = (
+            Vote.objects.exclude(poll__user=owner).exclude(user=owner).first()
+        )
+        self.authenticate_client(owner)
+        self.get_poll_results(voted.poll_id)
+        self.assertIsNotNone(
+            cache.get(poll_cache_key("results", voted.poll_id))
+        )
+
+        delete_user(voted.user_id, batch_size=2)
+        # The poll's cached results were invalidated.
+        self.assertIsNone(cache.get(poll_cache_key("results", voted.poll_id)))
+
+        delete_user(owner.id, batch_size=2)
+        self.assertFalse(
+            User.objects.filter(pk__in=[voted.user_id, owner.id]).exists()
+        )
+        self.assertFalse(Poll.objects.filter(user=owner).exists())
+        self.assertFalse(Vote.objects.filter(user=owner).exists())
+        self.assertFalse(Vote.objects.filter(user_id=voted.user_id).exists())
+        with self.assertRaises(User.DoesNotExist):
+            delete_user(owner.id)
+
+    def test_delete_user_revokes_tokens_and_tracks_new_votes(self):
+        """
+        Test that a user's tokens go before their votes, and that a vote
+        they cast during the deletion still refreshes its poll's results.
+        """
+        voter, poll = next(
+            (user, poll)
+            for user in User.objects.filter(votes__isnull=False).distinct()
+            for poll in Poll.objects.exclude(user=user).exclude(
+                votes__user=user
+            )
+        )
+        Token.objects.create(user=voter)
+        self.authenticate_client(poll.user)
+        self.get_poll_results(poll.id)
+        self.assertIsNotNone(cache.get(poll_cache_key("results", poll.id)))
+
+        late_votes = []
+
+        def cast_late_vote(done, total, message):
+            self.assertFalse(Token.objects.filter(user=voter).exists())
+            if not late_votes:
+                late_votes.append(
+                    Vote.objects.create(
+                        user=voter, poll=poll, option=poll.options.first()
+                    )
+                )
+
+        deleted = delete_user(voter.id, batch_size=1, report=cast_late_vote)
+        self.assertEqual(Vote.objects.filter(user_id=voter.id).count(), 0)
+        self.assertGreaterEqual(deleted["Vote"], 2)
+        self.assertIsNone(cache.get(poll_cache_key("results", poll.id)))
+
+    def test_command_and_background_job(self):
+        """
+        Test that chunked_delete deletes inline or queues a job that
+        runworker completes.
+        """
+        out = StringIO()
+        call_command(
+            "chunked_delete",
+            "poll",
+            str(self.poll.id),
+            "--background",
+            stdout=out,
+        )
+        job = Job.objects.get(kind="delete_poll")
+        self.assertEqual(job.payload, {"poll_id": self.poll.id})
+        call_command("runworker", processes=1, burst=True, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.progress, 1.0)
+        self.assertEqual(job.result["Poll"], 1)
+        self.assertFalse(Poll.objects.filter(pk=self.poll.id).exists())
+
+        poll = Poll.objects.first()
+        call_command(
+            "chunked_delete",
+            "poll",
+            str(poll.id),
+            "--batch-size=3",
+            stdout=out,
+        )
+        self.assertIn(f"Deleted poll {poll.id}", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command(
+                "chunked_delete", "poll", str(poll.id), stdout=StringIO()
+            )
+
+    def test_admin_queues_deletions(self):
+        """
+        Test that the admin queues one deletion job per selected user.
+        """
+        admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pw"
+        )
+        client = Client()
+        client.force_login(admin_user)
+        user_ids = list(
+            User.objects.filter(is_staff=False)[:2].values_list(
+                "id", flat=True
+            )
+        )
+        response = client.post(
+            "/admin/polls/user/",
+            {"action": "delete_in_background", "_selected_action": user_ids},
+            follow=True,
+        )
+        self.assertContains(response, "Queued deletion of 2 users")
+        self.assertEqual(
+            sorted(
+                job.payload["user_id"]
+                for job in Job.objects.filter(kind="delete_user")
+            ),
+            sorted(user_ids),
+        )
+        response = client.get("/admin/polls/job/")
+        self.assertContains(response, "delete_user")
+
+
+class PollChangesTests(BaseIntegrationTest, APITestMixin, APITestCase):
+    """
+    Tests for the incremental catalog sync endpoint.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_user = self.authenticate_client()
+        self.polls = [
+            self.create_poll(
+                {
+                    "title": f"Sync Poll {n}",
+                    "description": "Poll for sync testing.",
+                    "options": [
+                        {"option_text": "Option 1"},
+                        {"option_text": "Option 2"},
+                    ],
+                    "poll_type": "single_choice",
+                    "settings": {},
+                }
+            )
+            for n in range(3)
+        ]
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params["since"] = since
+        response = self.client.get("/api/v1/polls/changes/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_full_sync_then_empty_sync(self):
+        """
+        Test that a sync without a cursor returns every poll and that a
+        sync finding nothing new costs one query on the poll tables.
+        """
+        page = self.sync()
+        self.assertFalse(page["has_more"])
+        self.assertEqual(
+            [change["id"] for change in page["changes"]],
+            [poll["id"] for poll in self.polls],
+        )
+        seqs = [change["seq"] for change in page["changes"]]
+        self.assertEqual(seqs, sorted(set(seqs)))
+        for change, poll in zip(page["changes"], self.polls):
+            self.assertFalse(change["deleted"])
+            detail = self.client.get(f"/api/v1/polls/{poll['id']}/").data
+            del detail["my_vote"]
+            self.assertEqual(change["poll"], json.loads(json.dumps(detail)))
+
+        with CaptureQueriesContext(connection) as queries:
+            empty = self.sync(page["next"])
+        self.assertEqual(empty["changes"], [])
+        self.assertEqual(empty["next"], page["next"])
+        self.assertEqual(
+            len(
+                [
+                    query
+                    for query in queries.captured_queries
+                    if 'FROM "polls_poll' in query["sql"]
+                ]
+            ),
+            1,
+        )
+
+    def test_updates_and_deletions_since_cursor(self):
+        """
+        Test that updates, option edits, soft and hard deletes show up as
+        upserts and tombstones after the cursor.
+        """
+        cursor = self.sync()["next"]
+        first, second, third = (poll["id"] for poll in self.polls)
+        self.client.patch(
+            f"/api/v1/polls/{first}/", {"title": "Renamed"}, format="json"
+        )
+        self.client.delete(f"/api/v1/polls/{second}/")
+
+        page = self.sync(cursor)
+        self.assertEqual(
+            [(c["id"], c["deleted"]) for c in page["changes"]],
+            [(first, False), (second, True)],
+        )
+        self.assertEqual(page["changes"][0]["poll"]["title"], "Renamed")
+        self.assertNotIn("poll", page["changes"][1])
+
+        delete_poll(first)
+        page = self.sync(page["next"])
+        self.assertEqual(
+            [(c["id"], c["deleted"]) for c in page["changes"]],
+            [(first, True)],
+        )
+        self.assertFalse(Poll.objects.filter(pk=first).exists())
+        self.assertEqual(self.sync(page["next"])["changes"], [])
+
+        # Options edited through the admin restamp their poll.
+        admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pw"
+        )
+        client = Client()
+        client.force_login(admin_user)
+        option = Option.objects.filter(poll_id=third).first()
+        response = client.post(
+            f"/admin/polls/option/{option.id}/change/",
+            {
+                "poll": third,
+                "option_text": "Edited",
+                "option_order": option.option_order,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        page = self.sync(page["next"])
+        self.assertEqual([c["id"] for c in page["changes"]], [third])
+        self.assertIn(
+            "Edited",
+            [o["option_text"] for o in page["changes"][0]["poll"]["options"]],
+        )
+
+    def test_admin_actions_bump_the_sequence(self):
+        """
+        Test that polls closed from the admin are returned by the next sync.
+        """
+        cursor = self.sync()["next"]
+        admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pw"
+        )
+        client = Client()
+        client.force_login(admin_user)
+        ids = [poll["id"] for poll in self.polls[:2]]
+        client.post(
+            "/admin/polls/poll/", {"action": "close", "_selected_action": ids}
+        )
+        page = self.sync(cursor)
+        self.assertEqual(sorted(c["id"] for c in page["changes"]), ids)
+        for change in page["changes"]:
+            self.assertIsNotNone(change["poll"]["expires_at"])
+
+    def test_keyset_pages_and_invalid_cursor(self):
+        """
+        Test that syncs page through changes with the returned cursor and
+        reject malformed cursors.
+        """
+        first = self.sync(limit=2)
+        self.assertTrue(first["has_more"])
+        self.assertEqual(len(first["changes"]), 2)
+        second = self.sync(first["next"], limit=2)
+        self.assertFalse(second["has_more"])
+        self.assertEqual(
+            [c["id"] for c in first["changes"] + second["changes"]],
+            [poll["id"] for poll in self.polls],
+        )
+        response = self.client.get(
+            "/api/v1/polls/changes/", {"since": "not-a-cursor"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_full_sync_includes_polls_loaded_outside_the_feed(self):
+        """
+        Test that polls that existed before the feed (backfilled by the
+        migration) and seeded polls are returned by a full sync, with their
+        representation.
+        """
+        migration = importlib.import_module(
+            "polls.migrations.0014_backfill_poll_change_seq"
+        )
+        old_id = self.polls[1]["id"]
+        Poll.objects.filter(pk=old_id).update(change_seq=0)
+        migration.stamp_existing_polls(
+            django_apps, SimpleNamespace(connection=connection)
+        )
+        call_command(
+            "seed_pollpulse",
+            "--users=2",
+            "--polls=2",
+            "--votes=0",
+            stdout=StringIO(),
+        )
+        seeded = list(
+            Poll.objects.filter(title__startswith="Seed poll")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+        changes = self.sync()["changes"]
+        self.assertEqual(
+            [change["id"] for change in changes],
+            [self.polls[0]["id"], self.polls[2]["id"], old_id, *seeded],
+        )
+        self.assertEqual(
+            changes[-1]["poll"]["title"], f"Seed poll {seeded[-1]}"
+        )
+
+
+class SharedCacheCheckTests(BaseIntegrationTest):
+    """
+    Tests for the check that multi-process deployments use a shared cache.
+    """
+
+    LOCMEM = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+    @override_settings(CACHES=LOCMEM)
+    def test_local_cache_is_fine_for_one_process(self):
+        """
+        Test that a single process without shards or replicas may use the
+        process-local cache.
+        """
+        self.assertEqual(checks.shared_cache_check(None), [])
+        checks.require_shared_cache(1)
+
+    @override_settings(CACHES=LOCMEM, DATABASE_REPLICAS=["replica_0"])
+    def test_local_cache_is_refused_with_workers_or_replicas(self):
+        """
+        Test that several workers or databases refuse the process-local
+        cache.
+        """
+        self.assertEqual(
+            [error.id for error in checks.shared_cache_check(None)],
+            ["polls.E001"],
+        )
+        with self.assertRaisesMessage(ImproperlyConfigured, "4 web workers"):
+            checks.require_shared_cache(4)
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://localhost:6379/0",
+            }
+        },
+        POLL_SHARDS=["default", "shard_1"],
+    )
+    def test_shared_cache_serves_any_deployment(self):
+        """
+        Test that a shared cache passes with workers and shards.
+        """
+        self.assertEqual(checks.shared_cache_check(None), [])
+        checks.require_shared_cache(4)
@@ -0,0 +1,264 @@
+"""
+Trending polls.
+
+Each vote adds ``exp(-decay * age)`` to its poll's trending score, where the
+decay rate follows from ``TRENDING_HALF_LIFE_SECONDS``. Decaying every score
+on every tick would mean rewriting all rows, so ``PollTrend.score`` instead
+stores
+
+    ln(sum over votes of exp(decay * (vote_time - EPOCH)))
+
+Every poll is decayed by the same factor over time, so ordering by the
+stored value is ordering by the current decayed score, and adding votes is
+a single-row ``UPDATE`` (a log-sum-exp, computed in SQL so concurrent
+writers are not lost). The current score is
+``exp(stored - decay * (now - EPOCH))``.
+
+Votes are not written one by one: ``TrendBuffer`` sums each process's
+votes per poll in the same log domain and writes them every
+``TRENDING_FLUSH_SECONDS``, so a hot poll's row takes one ``UPDATE`` per
+worker and interval instead of one per vote, and no vote waits on its lock.
+Increments still buffered when a worker dies are lost.
+
+``TrendingBoard`` keeps the top ``TRENDING_TOP_K`` polls of the process in
+memory and refreshes them at most every ``TRENDING_REFRESH_SECONDS`` with an
+indexed top-K query per shard, so serving the endpoint never touches
+``Vote``.
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, router, transaction
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Abs, Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import Poll, PollTrend
+from .projections import project_polls
+from .sharding import shard_for_poll, sharding_enabled
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc).timestamp()
+
+logger = logging.getLogger(__name__)
+
+
+def decay_rate():
+    return math.log(2) / settings.TRENDING_HALF_LIFE_SECONDS
+
+
+def vote_weight(at=None):
+    """
+    Returns the log-domain weight of a vote cast at ``at`` (a timestamp,
+    defaults to now).
+    """
+    at = time.time() if at is None else at
+    return decay_rate() * (at - EPOCH)
+
+
+def current_score(stored, now=None):
+    """
+    Converts a stored log-domain score into the decayed score at ``now``.
+    """
+    return math.exp(stored - vote_weight(now))
+
+
+def log_add(first, second):
+    """
+    Returns ``ln(e^first + e^second)`` without overflow.
+    """
+    return max(first, second) + math.log1p(math.exp(-abs(first - second)))
+
+
+def record_vote(poll_id, at=None):
+    """
+    Adds one vote cast at ``at`` to a poll's trending score, once this
+    process's buffer is flushed.
+    """
+    pending.add(poll_id, vote_weight(at))
+
+
+def add_weight(poll_id, weight, alias):
+    """
+    Adds a log-domain ``weight`` to a poll's stored score on ``alias``.
+    """
+    trends = PollTrend.objects.using(alias).filter(poll_id=poll_id)
+    # ln(e^a + e^b) = max(a, b) + ln(1 + e^-|a - b|). The gap is capped
+    # because PostgreSQL raises on exp() underflow; past 50 the correction
+    # term is below 1e-21 anyway.
+    value = Value(weight, output_field=FloatField())
+    gap = Least(Abs(F("score") - value), Value(50.0))
+    log_sum = Greatest("score", value) + Ln(Value(1.0) + Exp(-gap))
+    if trends.update(score=log_sum):
+        return
+    try:
+        with transaction.atomic(using=alias):
+            PollTrend.objects.using(alias).create(
+                poll_id=poll_id, score=weight
+            )
+    except IntegrityError:
+        # Another vote created the row first.
+        trends.update(score=log_sum)
+
+
+class TrendBuffer:
+    """
+    Trending weights of this process's votes waiting to be written.
+    """
+
+    def __init__(self):
+        self._weights = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def add(self, poll_id, weight):
+        """
+        Buffers a weight; the first call past the flush interval writes
+        the buffer, unless another thread is already doing so.
+        """
+        with self._lock:
+            current = self._weights.get(poll_id)
+            self._weights[poll_id] = (
+                weight if current is None else log_add(current, weight)
+            )
+        if (
+            time.monotonic() - self._flushed_at
+            >= settings.TRENDING_FLUSH_SECONDS
+        ):
+            self.flush(blocking=False)
+
+    def flush(self, blocking=True):
+        """
+        Writes the buffered weights, one ``UPDATE`` per poll, to the poll's
+        current shard. Weights that could not be written stay buffered.
+        """
+        if not self._flush_lock.acquire(blocking=blocking):
+            return
+        try:
+            self._flushed_at = time.monotonic()
+            with self._lock:
+                weights, self._weights = self._weights, {}
+            while weights:
+                poll_id, weight = next(iter(weights.items()))
+                add_weight(poll_id, weight, shard_for_poll(poll_id))
+                del weights[poll_id]
+        except DatabaseError:
+            logger.exception("Could not write trending scores")
+            with self._lock:
+                for poll_id, weight in weights.items():
+                    current = self._weights.get(poll_id)
+                    self._weights[poll_id] = (
+                        weight if current is None else log_add(current, weight)
+                    )
+        finally:
+            self._flush_lock.release()
+
+    def clear(self):
+        with self._lock:
+            self._weights = {}
+            self._flushed_at = time.monotonic()
+
+
+def top_polls(alias, limit):
+    """
+    Returns the ``(score, poll_id)`` pairs of the ``limit`` hottest open
+    polls on one database, hottest first.
+    """
+    now = timezone.now()
+    return list(
+        PollTrend.objects.using(alias)
+        .filter(poll__is_deleted=False)
+        .filter(Q(poll__expires_at__isnull=True) | Q(poll__expires_at__gt=now))
+        .order_by("-score")
+        .values_list("score", "poll_id")[:limit]
+    )
+
+
+class TrendingBoard:
+    """
+    In-process top-K of trending polls with their representations.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        return (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at
+            >= settings.TRENDING_REFRESH_SECONDS
+        )
+
+    def refresh(self):
+        """
+        Reloads the top polls from the database, after writing this
+        process's buffered votes.
+        """
+        pending.flush()
+        limit = settings.TRENDING_TOP_K
+        if sharding_enabled():
+            aliases = settings.POLL_SHARDS
+        else:
+            aliases = [router.db_for_read(PollTrend)]
+        streams = [
+            [
+                (score, poll_id, alias)
+                for score, poll_id in top_polls(alias, limit)
+            ]
+            for alias in aliases
+        ]
+        top = heapq.nlargest(limit, itertools.chain(*streams))
+
+        polls = {}
+        for alias in aliases:
+            ids = [
+                poll_id for _, poll_id, hit_alias in top if hit_alias == alias
+            ]
+            if ids:
+                queryset = Poll.objects.using(alias).filter(id__in=ids)
+                for poll in project_polls(queryset):
+                    polls[poll["id"]] = poll
+        self._entries = [
+            (score, polls[poll_id])
+            for score, poll_id, _ in top
+            if poll_id in polls
+        ]
+        self._refreshed_at = time.monotonic()
+
+    def get(self, limit):
+        """
+        Returns up to ``limit`` trending polls with their current scores.
+
+        A stale board is refreshed by one thread while concurrent requests
+        keep serving the previous entries.
+        """
+        if self.is_stale():
+            blocking = self._refreshed_at is None
+            if self._lock.acquire(blocking=blocking):
+                try:
+                    if self.is_stale():
+                        self.refresh()
+                finally:
+                    self._lock.release()
+        now = time.time()
+        return [
+            {**poll, "score": round(current_score(score, now), 4)}
+            for score, poll in self._entries[:limit]
+        ]
+
+    def clear(self):
+        self._entries = []
+        self._refreshed_at = None
+
+
+pending = TrendBuffer()
+board = TrendingBoard()
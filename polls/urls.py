@@ -4,8 +4,17 @@ from .views import (
     register,
     login,
     PollViewSet,
+    PollChangesView,
+    PollSearchView,
+    PollTrendingView,
     VoteCreateView,
+    MyVotesView,
     PollResultsView,
+    PollBatchResultsView,
+    PollResultsBreakdownView,
+    PollCrosstabView,
+    OpsStatsView,
+    JobStatusView,
 )
 from rest_framework.routers import DefaultRouter
 
@@ -17,11 +26,32 @@ urlpatterns = [
     path("login/", login, name="login"),
     path("api-token-auth/", obtain_auth_token, name="api_token_auth"),
     path("vote/", VoteCreateView.as_view(), name="vote"),
+    path("me/votes/", MyVotesView.as_view(), name="my-votes"),
+    path("polls/search/", PollSearchView.as_view(), name="poll-search"),
+    path("polls/changes/", PollChangesView.as_view(), name="poll-changes"),
+    path("polls/trending/", PollTrendingView.as_view(), name="poll-trending"),
+    path(
+        "polls/results/",
+        PollBatchResultsView.as_view(),
+        name="poll-batch-results",
+    ),
     path(
         "polls/<int:pk>/results/",
         PollResultsView.as_view(),
         name="poll-results",
     ),
+    path(
+        "polls/<int:pk>/results/breakdown/",
+        PollResultsBreakdownView.as_view(),
+        name="poll-results-breakdown",
+    ),
+    path(
+        "polls/<int:pk>/crosstab/<int:other_pk>/",
+        PollCrosstabView.as_view(),
+        name="poll-crosstab",
+    ),
+    path("jobs/<int:pk>/", JobStatusView.as_view(), name="job-status"),
+    path("ops/stats/", OpsStatsView.as_view(), name="ops-stats"),
 ]
 
 urlpatterns += router.urls
@@ -1,17 +1,76 @@
-from rest_framework import viewsets, generics, status
+import heapq
+import json
+import os
+from functools import partial
+from itertools import islice
+from operator import itemgetter
+
+from rest_framework import viewsets, generics, permissions, status
+from rest_framework.exceptions import (
+    NotAuthenticated,
+    PermissionDenied,
+    ValidationError,
+)
 from rest_framework.response import Response
-from .models import Poll, Vote, Option, User
+from rest_framework.views import APIView
+from .models import Job, Poll, Vote, Option, User
 from .serializers import (
     LoginSerializer,
     PollSerializer,
     VoteSerializer,
     UserSerializer,
     PollResultsSerializer,
+    PollResultsBreakdownSerializer,
+    PollCrosstabSerializer,
+    JobSerializer,
+)
+from .changes import changes_since, render_changes
+from .cache import (
+    bump_list_version,
+    bump_poll_version,
+    get_poll_version,
+    list_cache_key,
+    list_latest_key,
+    poll_cache_key,
+)
+from .crosstab import compute_crosstab
+from .idempotency import idempotent
+from .mixins import PollShardMixin, ReadReplicaMixin
+from .pagination import decode_cursor, encode_cursor, get_page_size
+from .results import get_results
+from .projections import (
+    CONVERTERS,
+    REPRESENTATION_FIELDS,
+    project_polls,
+    render_poll,
+    rendered_polls,
+    with_my_vote,
+)
+from .renderers import PrerenderedResponse
+from .routers import is_pinned_to_primary, using_shard
+from .search import project_hits, search_polls
+from .sharding import (
+    allocate_poll_id,
+    merge_shards,
+    shard_for_poll,
+    sharding_enabled,
 )
+from .singleflight import SingleFlight, singleflight_stats
+from .stats import database_pool_stats
+from .trending import board as trending_board, record_vote
+from .voterfilter import voter_filters
+from . import tallies, votelog
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
-from django.db.models import Count
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, router as db_router, transaction
+from django.db.models import Count, F, Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from django.db.models.functions import TruncMonth
 
 
 @swagger_auto_schema(
@@ -79,11 +138,37 @@ def login(request):
     )
 
 
-class PollViewSet(viewsets.ModelViewSet):
+SPARSE_FIELDSET_PARAMETERS = [
+    openapi.Parameter(
+        "fields",
+        openapi.IN_QUERY,
+        description="Comma-separated poll fields to return, e.g. 'id,title,expires_at'.",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        "expand",
+        openapi.IN_QUERY,
+        description="Set to 'options' to embed options in a sparse response.",
+        type=openapi.TYPE_STRING,
+        enum=["options"],
+    ),
+]
+
+
+IDEMPOTENCY_KEY_PARAMETER = openapi.Parameter(
+    "Idempotency-Key",
+    openapi.IN_HEADER,
+    description="Client-chosen unique key. Retries with the same key and body replay the first response instead of repeating the request.",
+    type=openapi.TYPE_STRING,
+)
+
+
+class PollViewSet(PollShardMixin, ReadReplicaMixin, viewsets.ModelViewSet):
     """
     API endpoint for creating and managing polls.
     """
 
+    replica_actions = ("list", "retrieve")
     queryset = Poll.objects.all()
     serializer_class = PollSerializer
 
@@ -97,36 +182,232 @@ class PollViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(is_deleted=is_deleted)
         return queryset
 
+    # Per-user fields appended after the poll's own fields.
+    user_fields = ("my_vote",)
+
+    list_flight = SingleFlight("poll_list")
+
+    def get_representation_fields(self):
+        """
+        Returns the poll fields requested with ``?fields=`` and
+        ``?expand=options``.
+
+        Without ``fields`` every field is returned. With it, only the listed
+        fields are, and nested options are only included when listed or
+        expanded.
+        """
+        available = REPRESENTATION_FIELDS + self.user_fields
+        fields = self.request.query_params.get("fields")
+        expand = self.request.query_params.get("expand")
+        if not fields:
+            return available
+        requested = {field.strip() for field in fields.split(",")} - {""}
+        if expand:
+            requested |= {field.strip() for field in expand.split(",")}
+        unknown = requested - set(available)
+        if unknown:
+            raise ValidationError(
+                {"fields": f"Unknown field(s): {', '.join(sorted(unknown))}."}
+            )
+        return [field for field in available if field in requested]
+
+    def project(self, queryset, fields):
+        """
+        Projects polls like ``project_polls`` and adds the requesting user's
+        vote (``my_vote``, an option id or null) with one batched lookup.
+        """
+        if "my_vote" not in fields:
+            return project_polls(queryset, fields=fields)
+        polls = project_polls(queryset, fields=("id", *self.shared(fields)))
+        return self.add_my_vote(polls, fields, using=queryset.db)
+
+    def shared(self, fields):
+        """
+        Returns the fields that are the same for every user.
+        """
+        return [field for field in fields if field not in self.user_fields]
+
+    def is_full(self, fields):
+        """
+        Returns whether ``fields`` is the full representation, which is
+        served from the pre-rendered JSON.
+        """
+        return tuple(fields) == REPRESENTATION_FIELDS + self.user_fields
+
+    def my_votes(self, poll_ids, using=None):
+        """
+        Returns ``{poll_id: option_id}`` of the requesting user's votes.
+
+        Votes are read from ``using``, or from each poll's shard.
+        """
+        by_alias = {}
+        for poll_id in poll_ids:
+            alias = shard_for_poll(poll_id) if using is None else using
+            by_alias.setdefault(alias, []).append(poll_id)
+        votes = {}
+        for alias, ids in by_alias.items():
+            votes.update(
+                Vote.objects.using(alias)
+                .filter(user_id=self.request.user.pk, poll_id__in=ids)
+                .values_list("poll_id", "option_id")
+            )
+        return votes
+
+    def add_my_vote(self, polls, fields, using=None):
+        """
+        Returns copies of projected polls (which must include ``id``) with
+        the requesting user's vote appended as ``my_vote``.
+        """
+        votes = self.my_votes([poll["id"] for poll in polls], using=using)
+        result = []
+        for poll in polls:
+            poll = {**poll, "my_vote": votes.get(poll["id"])}
+            if "id" not in fields:
+                del poll["id"]
+            result.append(poll)
+        return result
+
+    def render_with_my_vote(self, polls, using=None):
+        """
+        Joins pre-rendered polls (``{"id", "json"}``) into a JSON array with
+        the requesting user's vote spliced into each.
+        """
+        votes = self.my_votes([poll["id"] for poll in polls], using=using)
+        return (
+            "["
+            + ",".join(
+                with_my_vote(poll["json"], votes.get(poll["id"]))
+                for poll in polls
+            )
+            + "]"
+        ).encode()
+
+    def list_polls(self, queryset, fields):
+        """
+        Returns the poll list projected to ``fields``.
+
+        ``id`` is always projected, as shards are merged by it, and left
+        out of the result unless requested.
+        """
+        polls = self.cached_list(
+            queryset,
+            ",".join(fields),
+            partial(project_polls, fields=("id", *fields)),
+        )
+        if "id" in fields:
+            return polls
+        return [
+            {field: value for field, value in poll.items() if field != "id"}
+            for poll in polls
+        ]
+
+    def list_rendered(self, queryset):
+        """
+        Returns the pre-rendered poll list (``{"id", "json"}`` per poll).
+        """
+        return self.cached_list(queryset, "rendered", rendered_polls)
+
+    def cached_list(self, queryset, variant, project):
+        """
+        Builds a poll list with ``project``, merged across shards, cached
+        under the list version and, except to users who just wrote, served
+        stale for up to ``POLL_LIST_STALE_SECONDS`` while it is rebuilt.
+        """
+        parts = (self.request.query_params.get("is_deleted"), variant)
+
+        def build():
+            if sharding_enabled():
+                return list(merge_shards(queryset, project=project))
+            return project(queryset)
+
+        return self.list_flight.get(
+            list_cache_key(*parts),
+            build,
+            settings.POLL_LIST_CACHE_TIMEOUT,
+            latest_key=list_latest_key(*parts),
+            stale_seconds=(
+                0
+                if is_pinned_to_primary(self.request)
+                else settings.POLL_LIST_STALE_SECONDS
+            ),
+        )
+
     @swagger_auto_schema(
         operation_summary="List all polls",
-        operation_description="Retrieve a list of all polls. Supports filtering by 'is_deleted' status using query parameters.",
+        operation_description="Retrieve a list of all polls. Supports filtering by 'is_deleted' status using query parameters. Each poll includes 'my_vote', the option the requesting user voted for (or null). Use 'fields' to select a subset of poll fields and 'expand=options' to embed options in a sparse response.",
+        manual_parameters=SPARSE_FIELDSET_PARAMETERS,
         responses={200: PollSerializer(many=True, help_text="List of polls.")},
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.get_representation_fields()
+        using = None if sharding_enabled() else queryset.db
+        if self.is_full(fields):
+            polls = self.list_rendered(queryset)
+            return PrerenderedResponse(
+                self.render_with_my_vote(polls, using=using)
+            )
+        if "my_vote" not in fields:
+            return Response(self.list_polls(queryset, fields))
+        polls = self.list_polls(queryset, ["id", *self.shared(fields)])
+        return Response(self.add_my_vote(polls, fields, using=using))
 
     @swagger_auto_schema(
         operation_summary="Create a new poll",
-        operation_description="Create a new poll. Authenticated users are associated with created polls.",
+        operation_description="Create a new poll. Authenticated users are associated with created polls. Send an 'Idempotency-Key' header to make retries safe.",
         request_body=PollSerializer(help_text="Poll data to create."),
+        manual_parameters=[IDEMPOTENCY_KEY_PARAMETER],
         responses={
             201: PollSerializer(help_text="Poll created successfully."),
             400: "Bad Request - Validation errors.",
+            422: "Unprocessable Entity - Idempotency key reused for a different request.",
         },
     )
+    @idempotent
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
+    def perform_create(self, serializer):
+        """
+        Saves a new poll on the shard chosen for its allocated id.
+        """
+        poll_id, alias = allocate_poll_id()
+        if poll_id is None:
+            serializer.save()
+            return
+        with using_shard(alias):
+            serializer.save(id=poll_id)
+
     @swagger_auto_schema(
         operation_summary="Retrieve a specific poll",
-        operation_description="Retrieve details of a specific poll by its ID.",
+        operation_description="Retrieve details of a specific poll by its ID, including the requesting user's 'my_vote'. Supports the same 'fields' and 'expand' parameters as the list.",
+        manual_parameters=SPARSE_FIELDSET_PARAMETERS,
         responses={
             200: PollSerializer(help_text="Poll details."),
             404: "Not Found - Poll not found.",
         },
     )
     def retrieve(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        try:
+            poll_id = int(kwargs["pk"])
+        except (TypeError, ValueError):
+            raise Http404("No Poll matches the given query.")
+        queryset = self.filter_queryset(self.get_queryset()).filter(pk=poll_id)
+        fields = self.get_representation_fields()
+        if not self.is_full(fields):
+            polls = self.project(queryset, fields=fields)
+            if not polls:
+                raise Http404("No Poll matches the given query.")
+            return Response(polls[0])
+
+        polls = rendered_polls(queryset)
+        if not polls:
+            raise Http404("No Poll matches the given query.")
+        poll = polls[0]
+        votes = self.my_votes([poll["id"]], using=queryset.db)
+        return PrerenderedResponse(
+            with_my_vote(poll["json"], votes.get(poll["id"])).encode()
+        )
 
     @swagger_auto_schema(
         operation_summary="Update an existing poll",
@@ -168,28 +449,189 @@ class PollViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         instance.is_deleted = True  # Soft delete
         instance.save()
+        render_poll(instance)
+        bump_list_version()
+        tallies.forget_polls([instance.id])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class VoteCreateView(generics.CreateAPIView):
+class PollSearchView(ReadReplicaMixin, APIView):
+    """
+    API endpoint for full-text search over polls.
+    """
+
+    replica_actions = ("retrieve",)
+
+    @swagger_auto_schema(
+        operation_summary="Search polls",
+        operation_description="Full-text search over poll titles, descriptions and option texts. Results are ranked best first (title matches weigh most, then options, then description) and paginated with an opaque cursor: pass the returned 'next' value as 'cursor' to read the following page.",
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description="Search terms.",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Cursor returned as 'next' by the previous page.",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Page size.",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+        responses={
+            200: "Matching polls and the cursor of the next page.",
+            400: "Bad Request - Missing query or invalid cursor.",
+        },
+    )
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"error": "'q' is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = get_page_size(request)
+        after = decode_cursor(request.query_params.get("cursor"), 2)
+        if after is not None and not all(
+            isinstance(value, (int, float)) for value in after
+        ):
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+        hits = search_polls(query, after=after, limit=limit + 1)
+        next_cursor = None
+        if len(hits) > limit:
+            hits = hits[:limit]
+            rank, poll_id, _ = hits[-1]
+            next_cursor = encode_cursor([rank, poll_id])
+        return Response({"results": project_hits(hits), "next": next_cursor})
+
+
+class PollChangesView(ReadReplicaMixin, APIView):
+    """
+    API endpoint listing catalog changes since a cursor, for incremental sync.
+    """
+
+    replica_actions = ("retrieve",)
+
+    @swagger_auto_schema(
+        operation_summary="List poll changes since a cursor",
+        operation_description="Returns the polls created, updated (including option changes) or deleted since 'since', oldest change first. Each entry has the change number 'seq', the poll 'id' and 'deleted'; live polls also carry the full 'poll' representation (without 'my_vote'), soft- and hard-deleted polls are tombstones. Store the returned 'next' cursor and pass it as 'since' on the next sync; while 'has_more' is true, keep reading. Omit 'since' to download the whole catalog.",
+        manual_parameters=[
+            openapi.Parameter(
+                "since",
+                openapi.IN_QUERY,
+                description="Cursor returned as 'next' by the previous sync.",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Maximum number of changes.",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+        responses={
+            200: "Changes, the cursor to sync from next and whether more changes are waiting.",
+            400: "Bad Request - Invalid cursor or limit.",
+        },
+    )
+    def get(self, request):
+        limit = get_page_size(request)
+        shards = settings.POLL_SHARDS
+        positions = decode_cursor(
+            request.query_params.get("since"), len(shards)
+        ) or [0] * len(shards)
+        if not all(isinstance(position, int) for position in positions):
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+        # Each database numbers its own changes; the cursor holds one
+        # position per shard.
+        entries = []
+        has_more = False
+        for index, alias in enumerate(shards):
+            room = limit - len(entries)
+            if room <= 0:
+                has_more = True
+                break
+            using = alias if sharding_enabled() else None
+            changes = changes_since(positions[index], room + 1, using=using)
+            if len(changes) > room:
+                changes = changes[:room]
+                has_more = True
+            if changes:
+                positions[index] = changes[-1][0]
+                entries.extend(render_changes(changes, using=using))
+        body = (
+            '{"changes":['
+            + ",".join(entries)
+            + f'],"next":"{encode_cursor(positions)}",'
+            + f'"has_more":{json.dumps(has_more)}}}'
+        )
+        return PrerenderedResponse(body.encode())
+
+
+class PollTrendingView(ReadReplicaMixin, APIView):
+    """
+    API endpoint listing the polls with the most recent voting activity.
+    """
+
+    replica_actions = ("retrieve",)
+
+    @swagger_auto_schema(
+        operation_summary="List trending polls",
+        operation_description="Returns open polls ordered by their exponentially decayed vote activity, hottest first. Each poll carries its current 'score'. The list is served from memory and refreshed periodically, so it may trail the latest votes by a few seconds.",
+        manual_parameters=[
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Number of polls to return (at most TRENDING_TOP_K).",
+                type=openapi.TYPE_INTEGER,
+            )
+        ],
+        responses={200: "Trending polls with their scores."},
+    )
+    def get(self, request):
+        limit = request.query_params.get("limit", settings.TRENDING_TOP_K)
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer."})
+        return Response(trending_board.get(max(limit, 0)))
+
+
+class VoteCreateView(PollShardMixin, ReadReplicaMixin, generics.CreateAPIView):
     """
     API endpoint for casting votes.
     """
 
     serializer_class = VoteSerializer
 
+    def get_shard_poll_id(self):
+        return self.request.data.get("poll")
+
     @swagger_auto_schema(
         operation_summary="Cast a vote for a poll option",
-        operation_description="Allows an authenticated user to cast a vote for a specific option in a poll. Prevents duplicate votes from the same user for the same poll.",
+        operation_description="Allows an authenticated user to cast a vote for a specific option in a poll. Prevents duplicate votes from the same user for the same poll. Send an 'Idempotency-Key' header to make retries safe.",
         request_body=VoteSerializer(
             help_text="Vote data: poll ID and option ID are required."
         ),
+        manual_parameters=[IDEMPOTENCY_KEY_PARAMETER],
         responses={
             201: VoteSerializer(help_text="Vote cast successfully."),
             400: "Bad Request - Invalid poll/option ID, or duplicate vote.",
             401: "Unauthorized - Authentication required.",
+            422: "Unprocessable Entity - Idempotency key reused for a different request.",
         },
     )
+    @idempotent
     def create(self, request, *args, **kwargs):
         poll_id = request.data.get("poll")
         option_id = request.data.get("option")
@@ -201,34 +643,166 @@ class VoteCreateView(generics.CreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        try:
+            poll_id, option_id = int(poll_id), int(option_id)
+        except (TypeError, ValueError):
+            return self.invalid_ids()
+
+        # Repeated votes are answered before the poll and option lookups;
+        # voters the filter has definitely not seen skip the check and
+        # are caught by the (user, poll) unique constraint instead.
+        if not voter_filters.enabled() or voter_filters.might_have_voted(
+            poll_id, user.id
+        ):
+            if Vote.objects.filter(poll_id=poll_id, user=user).exists():
+                return self.already_voted()
+
         try:
             poll = Poll.objects.get(pk=poll_id)
             option = Option.objects.get(pk=option_id, poll_id=poll_id)
         except (Poll.DoesNotExist, Option.DoesNotExist):
-            return Response(
-                {"error": "Invalid poll or option ID."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if Vote.objects.filter(poll=poll, user=user).exists():
-            return Response(
-                {"detail": "User has already voted in this poll."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return self.invalid_ids()
 
         request.data["user"] = user.id
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=user, poll=poll, option=option)
+            try:
+                with transaction.atomic(using=db_router.db_for_write(Vote)):
+                    vote = serializer.save(user=user, poll=poll, option=option)
+            except IntegrityError:
+                return self.already_voted()
+            # Run once the vote is committed, so a results read in between
+            # cannot cache pre-vote counts under the new version, and the
+            # trend row is not locked for the rest of the transaction.
+            if voter_filters.enabled():
+                transaction.on_commit(
+                    partial(voter_filters.add, poll.id, user.id),
+                    using=vote._state.db,
+                )
+            transaction.on_commit(
+                partial(bump_poll_version, poll.id), using=vote._state.db
+            )
+            transaction.on_commit(
+                partial(record_vote, poll.id), using=vote._state.db
+            )
+            if tallies.store_enabled():
+                transaction.on_commit(
+                    partial(tallies.count_vote, poll.id, option.id, vote.id),
+                    using=vote._state.db,
+                )
+            if votelog.log_enabled():
+                transaction.on_commit(
+                    partial(votelog.writer.append_vote, vote),
+                    using=vote._state.db,
+                )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def invalid_ids(self):
+        return Response(
+            {"error": "Invalid poll or option ID."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def already_voted(self):
+        return Response(
+            {"detail": "User has already voted in this poll."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class MyVotesView(ReadReplicaMixin, APIView):
+    """
+    API endpoint listing the requesting user's votes, newest first.
+    """
+
+    replica_actions = ("retrieve",)
 
-class PollResultsView(generics.RetrieveAPIView):
+    @swagger_auto_schema(
+        operation_summary="List my votes",
+        operation_description="Returns the requesting user's votes, newest first, with the poll title and option text. Paginated with an opaque cursor: pass the returned 'next' value as 'cursor' to read the following page.",
+        manual_parameters=[
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Cursor returned as 'next' by the previous page.",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Page size.",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+        responses={
+            200: "The user's votes and the cursor of the next page.",
+            400: "Bad Request - Invalid cursor.",
+        },
+    )
+    def get(self, request):
+        limit = get_page_size(request)
+        after = decode_cursor(request.query_params.get("cursor"), 2)
+        if after is not None:
+            created_at = parse_datetime(str(after[0]))
+            if created_at is None or not isinstance(after[1], int):
+                raise ValidationError({"cursor": "Invalid cursor."})
+            after = (created_at, after[1])
+
+        if sharding_enabled():
+            aliases = settings.POLL_SHARDS
+        else:
+            aliases = [db_router.db_for_read(Vote)]
+        rows = heapq.merge(
+            *(self.get_votes(alias, after, limit + 1) for alias in aliases),
+            key=itemgetter("created_at", "id"),
+            reverse=True,
+        )
+        votes = list(islice(rows, limit + 1))
+
+        next_cursor = None
+        if len(votes) > limit:
+            votes = votes[:limit]
+            last = votes[-1]
+            next_cursor = encode_cursor(
+                [last["created_at"].isoformat(), last["id"]]
+            )
+        for vote in votes:
+            vote["created_at"] = CONVERTERS["created_at"](vote["created_at"])
+        return Response({"results": votes, "next": next_cursor})
+
+    def get_votes(self, alias, after, limit):
+        """
+        Returns one page of the user's votes on one database, newest first,
+        strictly after the ``(created_at, id)`` keyset ``after``.
+        """
+        votes = Vote.objects.using(alias).filter(user_id=self.request.user.pk)
+        if after is not None:
+            created_at, vote_id = after
+            votes = votes.filter(
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, id__lt=vote_id)
+            )
+        return list(
+            votes.order_by("-created_at", "-id").values(
+                "id",
+                "poll",
+                "option",
+                "created_at",
+                poll_title=F("poll__title"),
+                option_text=F("option__option_text"),
+            )[:limit]
+        )
+
+
+class PollResultsView(
+    PollShardMixin, ReadReplicaMixin, generics.RetrieveAPIView
+):
     """
     API endpoint to view poll results in API format.
     """
 
+    replica_actions = ("retrieve",)
     serializer_class = PollResultsSerializer
     queryset = Poll.objects.all()
     lookup_field = "pk"
@@ -245,26 +819,376 @@ class PollResultsView(generics.RetrieveAPIView):
     )
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        results_data = self.get_poll_results(instance.id)
+        results_data = None
+        if tallies.store_enabled() and instance.rendered_json:
+            results_data = tallies.poll_results(
+                instance, json.loads(instance.rendered_json)
+            )
+        if results_data is None:
+            results_data = self.get_poll_results(instance.id)
         return Response(results_data)
 
     def get_poll_results(self, poll_id):
         """
-        Vote count aggregation logic.
+        Vote count aggregation logic, cached per poll version.
+
+        Users who did not just vote may get results a few seconds stale
+        while they are recomputed.
         """
-        options_with_counts = (
+        allow_stale = not is_pinned_to_primary(self.request)
+        return get_results([poll_id], allow_stale=allow_stale)[poll_id]
+
+
+class PollBatchResultsView(ReadReplicaMixin, APIView):
+    """
+    API endpoint to view the results of many polls in one request.
+    """
+
+    replica_actions = ("retrieve",)
+
+    @swagger_auto_schema(
+        operation_summary="Retrieve results of several polls",
+        operation_description="Retrieves the vote counts of up to RESULTS_BATCH_MAX_IDS polls, in the order requested. Every poll entry has a 'status': 'ok' (with 'results'), 'not_found', 'deleted' or 'forbidden'.",
+        manual_parameters=[
+            openapi.Parameter(
+                "ids",
+                openapi.IN_QUERY,
+                description="Comma-separated poll IDs, e.g. '1,2,3'.",
+                type=openapi.TYPE_STRING,
+                required=True,
+            )
+        ],
+        responses={
+            200: "Per-poll results or error status.",
+            400: "Bad Request - Missing, malformed or too many IDs.",
+        },
+    )
+    def get(self, request):
+        poll_ids = self.get_poll_ids()
+        statuses = {}
+        readable = {}
+        for alias, polls in self.get_polls(poll_ids).items():
+            for poll in polls:
+                if poll.is_deleted:
+                    statuses[poll.id] = "deleted"
+                    continue
+                try:
+                    self.check_object_permissions(request, poll)
+                except (PermissionDenied, NotAuthenticated):
+                    statuses[poll.id] = "forbidden"
+                    continue
+                readable.setdefault(alias, []).append(poll.id)
+
+        results = {}
+        allow_stale = not is_pinned_to_primary(request)
+        for alias, ids in readable.items():
+            results.update(
+                get_results(ids, using=alias, allow_stale=allow_stale)
+            )
+
+        entries = []
+        for poll_id in poll_ids:
+            if poll_id in results:
+                entries.append({**results[poll_id], "status": "ok"})
+            else:
+                entries.append(
+                    {
+                        "poll_id": poll_id,
+                        "status": statuses.get(poll_id, "not_found"),
+                    }
+                )
+        return Response({"results": entries})
+
+    def get_poll_ids(self):
+        """
+        Parses ``?ids=`` into a de-duplicated list of poll ids.
+        """
+        raw = self.request.query_params.get("ids", "")
+        try:
+            poll_ids = [int(part) for part in raw.split(",") if part.strip()]
+        except ValueError:
+            raise ValidationError({"ids": "Must be comma-separated integers."})
+        poll_ids = list(dict.fromkeys(poll_ids))
+        if not poll_ids:
+            raise ValidationError({"ids": "At least one poll id is required."})
+        if len(poll_ids) > settings.RESULTS_BATCH_MAX_IDS:
+            raise ValidationError(
+                {
+                    "ids": f"At most {settings.RESULTS_BATCH_MAX_IDS} poll ids "
+                    "per request."
+                }
+            )
+        return poll_ids
+
+    def get_polls(self, poll_ids):
+        """
+        Loads the requested polls, grouped by the database that owns them.
+        """
+        if sharding_enabled():
+            by_alias = {}
+            for poll_id in poll_ids:
+                by_alias.setdefault(shard_for_poll(poll_id), []).append(
+                    poll_id
+                )
+        else:
+            by_alias = {db_router.db_for_read(Poll): poll_ids}
+        return {
+            alias: Poll.objects.using(alias)
+            .filter(id__in=ids)
+            .only("id", "user_id", "is_deleted")
+            for alias, ids in by_alias.items()
+        }
+
+
+class PollResultsBreakdownView(
+    PollShardMixin, ReadReplicaMixin, generics.RetrieveAPIView
+):
+    """
+    API endpoint to view poll results sliced by a voter attribute.
+    """
+
+    replica_actions = ("retrieve",)
+    serializer_class = PollResultsBreakdownSerializer
+    queryset = Poll.objects.all()
+    lookup_field = "pk"
+
+    # Maps each supported ``by`` dimension to an expression over the voter.
+    dimensions = {
+        "cohort": TruncMonth("votes__user__created_at"),
+        "segment": F("votes__user__segment"),
+    }
+
+    @swagger_auto_schema(
+        operation_summary="Retrieve poll results by voter segment",
+        operation_description="Retrieves the option x segment vote matrix of a poll. Cells below the minimum cell size are suppressed (null).",
+        manual_parameters=[
+            openapi.Parameter(
+                "by",
+                openapi.IN_QUERY,
+                description="Dimension to break results down by.",
+                type=openapi.TYPE_STRING,
+                enum=["cohort", "segment"],
+                required=True,
+            )
+        ],
+        responses={
+            200: PollResultsBreakdownSerializer(
+                help_text="Poll results broken down by segment."
+            ),
+            400: "Bad Request - Unknown dimension.",
+            404: "Not Found - Poll not found.",
+        },
+    )
+    def retrieve(self, request, *args, **kwargs):
+        dimension = request.query_params.get("by")
+        if dimension not in self.dimensions:
+            return Response(
+                {
+                    "error": f"'by' must be one of: {', '.join(self.dimensions)}."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        instance = self.get_object()
+
+        cache_key = poll_cache_key("breakdown", instance.id, dimension)
+        breakdown = cache.get(cache_key)
+        if breakdown is None:
+            breakdown = self.get_breakdown(instance.id, dimension)
+            cache.set(cache_key, breakdown, settings.RESULTS_CACHE_TIMEOUT)
+        return Response(self.suppress(breakdown))
+
+    def get_breakdown(self, poll_id, dimension):
+        """
+        Computes the full option x segment matrix in a single grouped query.
+        """
+        rows = (
             Option.objects.filter(poll_id=poll_id)
+            .annotate(segment=self.dimensions[dimension])
+            .values("id", "option_text", "option_order", "segment")
             .annotate(vote_count=Count("votes"))
-            .order_by("option_order")
+            .order_by("option_order", "id", "segment")
         )
 
-        results = []
-        for option in options_with_counts:
-            results.append(
+        results = {}
+        segments = set()
+        for row in rows:
+            result = results.setdefault(
+                row["id"],
                 {
-                    "option_id": option.id,
-                    "option_text": option.option_text,
-                    "vote_count": option.vote_count,
-                }
+                    "option_id": row["id"],
+                    "option_text": row["option_text"],
+                    "counts": {},
+                },
+            )
+            if row["vote_count"]:
+                segment = self.segment_label(row["segment"])
+                segments.add(segment)
+                # Empty and missing segments share the "unknown" label.
+                result["counts"][segment] = (
+                    result["counts"].get(segment, 0) + row["vote_count"]
+                )
+
+        segments = sorted(segments)
+        for result in results.values():
+            result["counts"] = {
+                segment: result["counts"].get(segment, 0)
+                for segment in segments
+            }
+        return {
+            "poll_id": poll_id,
+            "by": dimension,
+            "segments": segments,
+            "results": list(results.values()),
+        }
+
+    def segment_label(self, value):
+        """
+        Converts a raw segment value into its string label.
+        """
+        if value is None or value == "":
+            return "unknown"
+        if hasattr(value, "strftime"):
+            return value.strftime("%Y-%m")
+        return str(value)
+
+    def suppress(self, breakdown):
+        """
+        Replaces counts below the minimum cell size with null.
+        """
+        min_cell_size = settings.BREAKDOWN_MIN_CELL_SIZE
+        results = []
+        for result in breakdown["results"]:
+            counts = {
+                segment: (None if 0 < count < min_cell_size else count)
+                for segment, count in result["counts"].items()
+            }
+            results.append({**result, "counts": counts})
+        return {
+            **breakdown,
+            "min_cell_size": min_cell_size,
+            "results": results,
+        }
+
+
+class PollCrosstabView(ReadReplicaMixin, APIView):
+    """
+    API endpoint to cross-tabulate the votes of two polls.
+    """
+
+    replica_actions = ("retrieve",)
+
+    @swagger_auto_schema(
+        operation_summary="Cross-tabulate two polls",
+        operation_description="Retrieves the option x option matrix of how the voters of a poll voted on another poll: counts[i][j] is the number of voters who chose options[i] and other_options[j]. Cells below the minimum cell size are suppressed (null).",
+        responses={
+            200: PollCrosstabSerializer(
+                help_text="Option x option vote matrix of the two polls."
+            ),
+            404: "Not Found - Poll not found.",
+        },
+    )
+    def get(self, request, pk, other_pk):
+        poll, alias = self.get_poll(pk)
+        other_poll, other_alias = self.get_poll(other_pk)
+
+        cache_key = poll_cache_key(
+            "crosstab", poll.id, other_poll.id, get_poll_version(other_poll.id)
+        )
+        crosstab = cache.get(cache_key)
+        if crosstab is None:
+            crosstab = {
+                "poll_id": poll.id,
+                "other_poll_id": other_poll.id,
+                **compute_crosstab(poll.id, alias, other_poll.id, other_alias),
+            }
+            cache.set(cache_key, crosstab, settings.RESULTS_CACHE_TIMEOUT)
+        return Response(self.suppress(crosstab))
+
+    def get_poll(self, poll_id):
+        """
+        Returns a readable poll and the database alias to read its votes from.
+        """
+        if sharding_enabled():
+            alias = shard_for_poll(poll_id)
+        else:
+            alias = db_router.db_for_read(Poll)
+        try:
+            poll = (
+                Poll.objects.using(alias).only("id", "user_id").get(id=poll_id)
             )
-        return {"poll_id": poll_id, "results": results}
+        except Poll.DoesNotExist:
+            raise Http404("Poll not found.")
+        self.check_object_permissions(self.request, poll)
+        return poll, alias
+
+    def suppress(self, crosstab):
+        """
+        Replaces counts below the minimum cell size with null.
+        """
+        min_cell_size = settings.BREAKDOWN_MIN_CELL_SIZE
+        counts = [
+            [None if 0 < count < min_cell_size else count for count in row]
+            for row in crosstab["counts"]
+        ]
+        return {**crosstab, "min_cell_size": min_cell_size, "counts": counts}
+
+
+class JobStatusView(generics.RetrieveAPIView):
+    """
+    API endpoint to follow a background job.
+    """
+
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        """
+        Staff can follow any job, other users only the jobs they queued.
+        """
+        if getattr(self, "swagger_fake_view", False):
+            # Schema generation runs without a real user.
+            return Job.objects.none()
+        if self.request.user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(created_by=self.request.user)
+
+    @swagger_auto_schema(
+        operation_summary="Retrieve a background job",
+        operation_description="Returns the status, progress and result (or last error) of a background job queued by the requesting user.",
+        responses={
+            200: JobSerializer(help_text="Job status."),
+            404: "Not Found - Job not found.",
+        },
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class OpsStatsView(APIView):
+    """
+    API endpoint exposing runtime statistics of the serving worker.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Retrieve worker runtime statistics",
+        operation_description="Returns database connection pool statistics and cache fill counters (hits, misses, stale, coalesced, refreshes) of the worker process that served the request, the voter filters' size and skipped duplicate checks, and the occupancy of the host's shared tally store. Staff only.",
+        responses={
+            200: "Runtime statistics of the serving worker.",
+            403: "Forbidden - Staff only.",
+        },
+    )
+    def get(self, request):
+        return Response(
+            {
+                "pid": os.getpid(),
+                "database_pools": database_pool_stats(),
+                "cache": singleflight_stats(),
+                "voter_filters": voter_filters.stats(),
+                "tallies": (
+                    tallies.get_store().stats()
+                    if tallies.store_enabled()
+                    else None
+                ),
+            }
+        )
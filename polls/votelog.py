@@ -0,0 +1,293 @@
+"""
+Append-only binary log of cast votes.
+
+Every committed vote is appended to the log as one fixed-size 48-byte
+little-endian record::
+
+    magic u32 | checksum u32 | vote_id | poll_id | option_id | user_id |
+    created_at (int64 microseconds since the Unix epoch)
+
+Each process writes its own segment files (``<writer>-<n>.seg`` in
+``VOTE_LOG_DIR``), so workers never coordinate, and starts a new segment
+after ``VOTE_LOG_SEGMENT_RECORDS`` records or a restart. Records are
+written to the OS as they are appended and fsynced in batches: after
+``VOTE_LOG_FSYNC_RECORDS`` records or ``VOTE_LOG_FSYNC_INTERVAL`` seconds,
+whichever comes first.
+
+Readers memory-map segments with numpy and check every record's magic and
+checksum in one vectorised pass. A crash can leave a torn record at the end
+of a segment or, after a power loss, zeroed or garbled blocks; such records
+fail the check and are skipped and reported, the rest stay readable.
+"""
+
+import os
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+
+MAGIC = 0x31565050  # "PPV1"
+RECORD = struct.Struct("<IIqqqqq")
+RECORD_DTYPE = np.dtype(
+    [
+        ("magic", "<u4"),
+        ("checksum", "<u4"),
+        ("vote_id", "<i8"),
+        ("poll_id", "<i8"),
+        ("option_id", "<i8"),
+        ("user_id", "<i8"),
+        ("created_at", "<i8"),
+    ]
+)
+SEGMENT_SUFFIX = ".seg"
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Odd 64-bit multipliers of the record checksum, one per field.
+MULTIPLIERS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0xD6E8FEB86659FD93,
+    0xFF51AFD7ED558CCD,
+)
+MASK64 = 2**64 - 1
+
+
+def checksum(values):
+    """
+    Returns the checksum of a record's five int64 fields.
+    """
+    mixed = sum((value & MASK64) * m for value, m in zip(values, MULTIPLIERS))
+    mixed &= MASK64
+    return (mixed ^ (mixed >> 32)) & 0xFFFFFFFF
+
+
+def pack(vote_id, poll_id, option_id, user_id, created_at):
+    """
+    Packs one vote into a record; ``created_at`` is an aware datetime.
+    """
+    values = (
+        vote_id,
+        poll_id,
+        option_id,
+        user_id,
+        (created_at - UNIX_EPOCH) // timedelta(microseconds=1),
+    )
+    return RECORD.pack(MAGIC, checksum(values), *values)
+
+
+def valid_records(records):
+    """
+    Returns a boolean mask of the records whose magic and checksum match.
+    """
+    words = records.view("<u8").reshape(-1, 6)
+    mixed = (words[:, 1:] * np.array(MULTIPLIERS, np.uint64)).sum(
+        axis=1, dtype=np.uint64
+    )
+    expected = (mixed ^ (mixed >> np.uint64(32))) & np.uint64(0xFFFFFFFF)
+    return (records["magic"] == MAGIC) & (records["checksum"] == expected)
+
+
+class VoteLogWriter:
+    """
+    Appends vote records to this process's segments.
+
+    Opened lazily and reopened after a fork, so a module-level writer is
+    safe in preloaded Gunicorn workers.
+    """
+
+    def __init__(
+        self,
+        directory=None,
+        segment_records=None,
+        fsync_records=None,
+        fsync_interval=None,
+    ):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.fsync_records = fsync_records
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+
+    def _open(self):
+        self.directory = self.directory or settings.VOTE_LOG_DIR
+        self.segment_records = (
+            self.segment_records or settings.VOTE_LOG_SEGMENT_RECORDS
+        )
+        self.fsync_records = (
+            self.fsync_records or settings.VOTE_LOG_FSYNC_RECORDS
+        )
+        self.fsync_interval = (
+            self.fsync_interval or settings.VOTE_LOG_FSYNC_INTERVAL
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._writer_id = (
+            f"{socket.gethostname()}-{self._pid}-{time.time_ns() // 1000}"
+        )
+        self._segment = 0
+        self._fd = None
+        self._stop = threading.Event()
+        self._rotate()
+        threading.Thread(
+            target=self._sync_periodically, name="vote-log-sync", daemon=True
+        ).start()
+
+    def _rotate(self):
+        if self._fd is not None:
+            self._sync()
+            os.close(self._fd)
+        self._segment += 1
+        path = os.path.join(
+            self.directory,
+            f"{self._writer_id}-{self._segment:06d}{SEGMENT_SUFFIX}",
+        )
+        self._fd = os.open(
+            path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644
+        )
+        self._records = 0
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        # Make the new file's directory entry durable too.
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._fd)
+            self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def _sync_periodically(self):
+        while not self._stop.wait(self.fsync_interval):
+            with self._lock:
+                if self._fd is not None and self._pid == os.getpid():
+                    self._sync()
+
+    def append(self, records):
+        """
+        Appends packed records (bytes) to the log.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            for record in records:
+                if self._records >= self.segment_records:
+                    self._rotate()
+                os.write(self._fd, record)
+                self._records += 1
+                self._unsynced += 1
+            if (
+                self._unsynced >= self.fsync_records
+                or time.monotonic() - self._synced_at >= self.fsync_interval
+            ):
+                self._sync()
+
+    def append_vote(self, vote):
+        self.append(
+            [
+                pack(
+                    vote.id,
+                    vote.poll_id,
+                    vote.option_id,
+                    vote.user_id,
+                    vote.created_at,
+                )
+            ]
+        )
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                self._stop.set()
+                self._sync()
+                os.close(self._fd)
+            self._fd = None
+            self._pid = None
+
+
+writer = VoteLogWriter()
+
+
+def log_enabled():
+    return bool(settings.VOTE_LOG_DIR)
+
+
+def segment_paths(directory):
+    """
+    Returns the log's segment files in name order.
+    """
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def read_segment(path):
+    """
+    Maps a segment and returns ``(records, invalid, torn_bytes)``: the
+    valid records, the number of records failing their check and the size
+    of a trailing partial record.
+    """
+    size = os.path.getsize(path)
+    count, torn = divmod(size, RECORD_DTYPE.itemsize)
+    if not count:
+        return np.empty(0, RECORD_DTYPE), 0, torn
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+    valid = valid_records(records)
+    if valid.all():
+        return records, 0, torn
+    return records[valid], int(count - valid.sum()), torn
+
+
+def read_log(directory):
+    """
+    Yields ``(path, records, invalid, torn_bytes)`` for every segment.
+    """
+    for path in segment_paths(directory):
+        yield (path, *read_segment(path))
+
+
+def rebuild_tallies(directory, poll_ids=None):
+    """
+    Counts the logged votes per option: ``{poll_id: {option_id: votes}}``.
+    """
+    totals = {}
+    polls = {}
+    for _, records, _, _ in read_log(directory):
+        if poll_ids is not None:
+            records = records[np.isin(records["poll_id"], list(poll_ids))]
+        options, first, counts = np.unique(
+            records["option_id"], return_index=True, return_counts=True
+        )
+        for option_id, poll_id, count in zip(
+            options.tolist(),
+            records["poll_id"][first].tolist(),
+            counts.tolist(),
+        ):
+            totals[option_id] = totals.get(option_id, 0) + count
+            polls[option_id] = poll_id
+    tallies = {}
+    for option_id, count in totals.items():
+        tallies.setdefault(polls[option_id], {})[option_id] = count
+    return tallies
+
+
+def record_datetimes(records):
+    """
+    Converts the records' ``created_at`` into aware datetimes.
+    """
+    return [
+        UNIX_EPOCH + timedelta(microseconds=micros)
+        for micros in records["created_at"].tolist()
+    ]
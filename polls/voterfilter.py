@@ -0,0 +1,305 @@
+"""
+Per-poll Bloom filters of voter ids in front of the duplicate-vote check.
+
+During a spike most vote requests repeat a vote already cast. Each worker
+process keeps, per poll, a Bloom filter of the users who voted in it:
+
+* "definitely new" skips the ``exists()`` query; the vote is inserted and
+  the ``(user, poll)`` unique constraint still rejects a duplicate the
+  filter could not know about (e.g. one cast through another worker);
+* "maybe seen" checks the database as before.
+
+A poll's filter is seeded from its votes on a background thread the first
+time the poll is voted on in the process; until then every answer is
+"maybe seen". Seeding streams the poll's voter ids once per process and
+poll; the filter is sized from the first chunk read, so no separate
+``COUNT`` is issued. Votes cast by the process are added as they are
+inserted.
+Filters are scalable (a new, larger slice is added when one fills up) so
+the false-positive rate stays near ``VOTER_FILTER_ERROR_RATE`` however many
+voters a poll gets. All filters of a process share ``VOTER_FILTER_MAX_BYTES``
+and the least recently used are dropped beyond it. Nothing is persisted:
+filters are rebuilt after a restart.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+
+from .models import Vote
+from .sharding import shard_for_poll
+from .singleflight import run_in_background
+
+LN2 = math.log(2)
+# Each added slice holds twice as many keys at half the error rate, so the
+# total error rate stays below the configured one.
+GROWTH = 2
+TIGHTENING = 0.5
+# Voter ids read per round while seeding a filter.
+SEED_CHUNK_SIZE = 50000
+
+
+MASK64 = 2**64 - 1
+
+
+def _mix(keys):
+    """
+    The splitmix64 finaliser over an array of uint64 keys.
+    """
+    keys = keys + np.uint64(0x9E3779B97F4A7C15)
+    keys = (keys ^ (keys >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    keys = (keys ^ (keys >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return keys ^ (keys >> np.uint64(31))
+
+
+def _mix_int(key):
+    """
+    ``_mix`` of one key, without numpy's per-call overhead.
+    """
+    key = (key + 0x9E3779B97F4A7C15) & MASK64
+    key = ((key ^ (key >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & MASK64
+    return key ^ (key >> 31)
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter of integers, sized for ``capacity`` keys at
+    ``error_rate`` false positives.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = math.ceil(-capacity * math.log(error_rate) / LN2**2)
+        self.hashes = max(1, round(self.bits / capacity * LN2))
+        self.array = np.zeros((self.bits + 7) // 8, np.uint8)
+        self.count = 0
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+
+    def positions(self, keys):
+        """
+        Returns the bit positions of every key, one row per key (double
+        hashing).
+        """
+        first = _mix(keys)
+        second = _mix(first) | np.uint64(1)
+        rounds = np.arange(self.hashes, dtype=np.uint64)
+        return (first[:, None] + rounds * second[:, None]) % np.uint64(
+            self.bits
+        )
+
+    def add(self, keys):
+        positions = self.positions(keys).ravel()
+        np.bitwise_or.at(
+            self.array,
+            positions >> np.uint64(3),
+            np.left_shift(1, positions & np.uint64(7)).astype(np.uint8),
+        )
+        self.count += len(keys)
+
+    def contains_hashed(self, first, second):
+        """
+        Tests one key given its two hashes (see ``positions``).
+        """
+        array = self.array
+        for index in range(self.hashes):
+            position = ((first + index * second) & MASK64) % self.bits
+            if not array[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+    def contains(self, keys):
+        positions = self.positions(keys)
+        bits = self.array[positions >> np.uint64(3)] >> (
+            positions & np.uint64(7)
+        ).astype(np.uint8)
+        return (bits & 1).all(axis=1)
+
+
+class ScalableBloomFilter:
+    """
+    A list of Bloom filters that grows as keys are added.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.slices = [BloomFilter(capacity, error_rate * (1 - TIGHTENING))]
+
+    @property
+    def nbytes(self):
+        return sum(part.nbytes for part in self.slices)
+
+    def add(self, keys):
+        keys = np.asarray(keys, np.uint64)
+        while len(keys):
+            last = self.slices[-1]
+            room = last.capacity - last.count
+            if room <= 0:
+                self.slices.append(
+                    BloomFilter(
+                        last.capacity * GROWTH, last.error_rate * TIGHTENING
+                    )
+                )
+                continue
+            last.add(keys[:room])
+            keys = keys[room:]
+
+    def __contains__(self, key):
+        first = _mix_int(key)
+        second = _mix_int(first) | 1
+        return any(part.contains_hashed(first, second) for part in self.slices)
+
+
+class _Entry:
+    def __init__(self, poll_id):
+        self.poll_id = poll_id
+        self.voters = None
+        # Votes recorded before the filter is sized.
+        self.pending = []
+        self.ready = False
+
+
+class VoterFilters:
+    """
+    The voter filters of this process, least recently used first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._counts = {"skipped": 0, "checked": 0, "builds": 0}
+
+    def enabled(self):
+        return settings.VOTER_FILTER_MAX_BYTES > 0
+
+    def might_have_voted(self, poll_id, user_id):
+        """
+        Returns False when the user has definitely not voted in the poll
+        and True when the database must be asked.
+        """
+        created = None
+        with self._lock:
+            entry = self._entries.get(poll_id)
+            if entry is None:
+                created = self._entries[poll_id] = _Entry(poll_id)
+                self._counts["builds"] += 1
+            else:
+                self._entries.move_to_end(poll_id)
+            seen = entry is None or not entry.ready or user_id in entry.voters
+            self._counts["checked" if seen else "skipped"] += 1
+        if created is not None:
+            self._start_build(poll_id, created)
+        return seen
+
+    def add(self, poll_id, user_id):
+        """
+        Records a vote inserted by this process.
+        """
+        with self._lock:
+            entry = self._entries.get(poll_id)
+            if entry is None:
+                return
+            if entry.voters is None:
+                entry.pending.append(user_id)
+                return
+            before = entry.voters.nbytes
+            entry.voters.add([user_id])
+            self._resize(entry, before)
+
+    def _start_build(self, poll_id, entry):
+        alias = shard_for_poll(poll_id)
+        votes = Vote.objects.using(alias).filter(poll_id=poll_id)
+
+        def build():
+            try:
+                user_ids = votes.values_list("user_id", flat=True).iterator(
+                    chunk_size=SEED_CHUNK_SIZE
+                )
+                chunk = list(islice(user_ids, SEED_CHUNK_SIZE))
+                # Larger polls grow the filter by slices while seeding.
+                capacity = max(
+                    len(chunk) * GROWTH, settings.VOTER_FILTER_MIN_CAPACITY
+                )
+                voters = ScalableBloomFilter(
+                    capacity, settings.VOTER_FILTER_ERROR_RATE
+                )
+                with self._lock:
+                    voters.add(entry.pending)
+                    entry.voters = voters
+                    self._resize(entry, 0)
+                while chunk:
+                    if not self._seed(entry, chunk):
+                        return
+                    chunk = list(islice(user_ids, SEED_CHUNK_SIZE))
+                entry.ready = True
+            except BaseException:
+                with self._lock:
+                    self._forget(poll_id, entry)
+                raise
+
+        run_in_background(build)
+
+    def _seed(self, entry, user_ids):
+        """
+        Adds seeded voters; returns False once the entry has been dropped.
+        """
+        with self._lock:
+            if not self._tracked(entry):
+                return False
+            before = entry.voters.nbytes
+            entry.voters.add(user_ids)
+            self._resize(entry, before)
+            return self._tracked(entry)
+
+    def _tracked(self, entry):
+        return self._entries.get(entry.poll_id) is entry
+
+    def _resize(self, entry, before):
+        """
+        Accounts for an entry's growth and drops the least recently used
+        entries beyond the memory budget, the growing entry only if it
+        alone exceeds it. Entries already dropped are not accounted for.
+        Callers hold the lock.
+        """
+        if not self._tracked(entry):
+            return
+        self._bytes += entry.voters.nbytes - before
+        while self._bytes > settings.VOTER_FILTER_MAX_BYTES:
+            others = (
+                item for item in self._entries.items() if item[1] is not entry
+            )
+            poll_id, oldest = next(others, (entry.poll_id, entry))
+            self._forget(poll_id, oldest)
+            if oldest is entry:
+                break
+
+    def _forget(self, poll_id, entry):
+        if self._entries.get(poll_id) is entry:
+            del self._entries[poll_id]
+            if entry.voters is not None:
+                self._bytes -= entry.voters.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._counts = dict.fromkeys(self._counts, 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "polls": len(self._entries),
+                "bytes": self._bytes,
+                **self._counts,
+            }
+
+
+voter_filters = VoterFilters()